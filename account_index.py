@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Account Index - Inverted index from address to blocks and MURF operations
+Maintained by the ledger ingester so single-address questions are indexed
+lookups instead of full history scans.
+"""
+
+import sqlite3
+
+from history_stream import ADDRESS_BLOCK_FIELDS
+from ledger_archive import NETWORK_SCOPE
+
+MURF_TOKEN = "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm"
+INDEX_DB = "account_index.db"
+
+
+class AccountIndex:
+    def __init__(self, db_path=INDEX_DB):
+        self.db_path = db_path
+        self.init_database()
+
+    def init_database(self):
+        """Initialize index database"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS indexed_blocks (
+                block_hash TEXT PRIMARY KEY,
+                date TEXT
+            )
+        ''')
+
+        # Every address touching a block (account, signer, from, to)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS account_blocks (
+                address TEXT NOT NULL,
+                block_hash TEXT NOT NULL,
+                date TEXT,
+                PRIMARY KEY (address, block_hash)
+            ) WITHOUT ROWID
+        ''')
+
+        # MURF operations; amount kept as the ledger hex string (exact)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS murf_operations (
+                block_hash TEXT NOT NULL,
+                op_index INTEGER NOT NULL,
+                type INTEGER,
+                from_address TEXT,
+                to_address TEXT,
+                amount TEXT,
+                date TEXT,
+                PRIMARY KEY (block_hash, op_index)
+            )
+        ''')
+
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_murf_ops_from ON murf_operations (from_address)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_murf_ops_to ON murf_operations (to_address)')
+
+        conn.commit()
+        conn.close()
+
+    def index_blocks(self, blocks):
+        """Index slim history blocks (idempotent), return number of new blocks"""
+        block_rows = []
+        op_rows = []
+        block_hashes = {}
+
+        for block in blocks:
+            block_hash = block.get('$hash')
+            if not block_hash:
+                continue
+            date = block.get('date', '')
+            addresses = {block.get('account'), block.get('signer')}
+
+            operations = block.get('operations', [])
+            if not isinstance(operations, list):
+                operations = []
+            for op_index, op in enumerate(operations):
+                if not isinstance(op, dict):
+                    continue
+                addresses.add(op.get('from'))
+                addresses.add(op.get('to'))
+                if op.get('token') == MURF_TOKEN:
+                    op_rows.append((block_hash, op_index, op.get('type', 0), op.get('from'),
+                                    op.get('to'), op.get('amount', '0x0'), date))
+
+            for address in addresses:
+                if address and isinstance(address, str):
+                    block_rows.append((address, block_hash, date))
+            block_hashes[block_hash] = date
+
+        if not block_hashes:
+            return 0
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR IGNORE INTO indexed_blocks (block_hash, date) VALUES (?, ?)
+        ''', block_hashes.items())
+        new_blocks = cursor.rowcount
+        cursor.executemany('''
+            INSERT OR IGNORE INTO account_blocks (address, block_hash, date)
+            VALUES (?, ?, ?)
+        ''', block_rows)
+        cursor.executemany('''
+            INSERT OR IGNORE INTO murf_operations
+            (block_hash, op_index, type, from_address, to_address, amount, date)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', op_rows)
+        conn.commit()
+        conn.close()
+        return new_blocks
+
+    def index_archive(self, archive, scope=NETWORK_SCOPE):
+        """(Re)build the index from pages already in the ledger archive"""
+        total = 0
+        for page in archive.iter_pages(scope, ADDRESS_BLOCK_FIELDS):
+            total += self.index_blocks(page['blocks'])
+        return total
+
+    def has_address(self, address):
+        """Check if the index knows an address"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1 FROM account_blocks WHERE address = ? LIMIT 1', (address,))
+        found = cursor.fetchone() is not None
+        conn.close()
+        return found
+
+    def get_block_hashes(self, address, limit=None):
+        """Get hashes of blocks touching an address (newest first)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        query = 'SELECT block_hash FROM account_blocks WHERE address = ? ORDER BY date DESC'
+        if limit:
+            cursor.execute(query + ' LIMIT ?', (address, limit))
+        else:
+            cursor.execute(query, (address,))
+        hashes = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        return hashes
+
+    def get_murf_operations(self, address):
+        """Get MURF operations sent or received by an address (oldest first)
+
+        Operations have the API shape plus 'date', 'block_hash' and 'op_index'.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT block_hash, op_index, type, from_address, to_address, amount, date
+            FROM murf_operations WHERE from_address = ?
+            UNION
+            SELECT block_hash, op_index, type, from_address, to_address, amount, date
+            FROM murf_operations WHERE to_address = ?
+            ORDER BY date, block_hash, op_index
+        ''', (address, address))
+        rows = cursor.fetchall()
+        conn.close()
+
+        return [{
+            'block_hash': row[0],
+            'op_index': row[1],
+            'type': row[2],
+            'token': MURF_TOKEN,
+            'from': row[3],
+            'to': row[4],
+            'amount': row[5],
+            'date': row[6]
+        } for row in rows]
+
+    def get_murf_balance(self, address):
+        """Reconstruct MURF holder stats for an address (None if no MURF activity)
+
+        Same rules as the holder scanners: Type 7 from the address is a send,
+        Type 0 to the address is a receive.
+        """
+        operations = self.get_murf_operations(address)
+        if not operations:
+            return None
+
+        data = {
+            'total_received': 0,
+            'total_sent': 0,
+            'current_balance': 0,
+            'transaction_count': 0,
+            'first_murf_tx': operations[0]['date'],
+            'last_murf_tx': operations[0]['date']
+        }
+        for op in operations:
+            try:
+                amount = int(op['amount'], 16)
+            except (TypeError, ValueError):
+                amount = 0
+
+            if op['from'] == address and op['type'] == 7:
+                data['total_sent'] += amount
+                data['current_balance'] -= amount
+            elif op['to'] == address and op['type'] == 0:
+                data['total_received'] += amount
+                data['current_balance'] += amount
+            else:
+                continue
+            data['transaction_count'] += 1
+            data['last_murf_tx'] = op['date']
+
+        return data
+
+    def get_stats(self):
+        """Get index statistics"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(DISTINCT address) FROM account_blocks')
+        addresses = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(*) FROM indexed_blocks')
+        blocks = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(*) FROM murf_operations')
+        murf_operations = cursor.fetchone()[0]
+        conn.close()
+
+        return {
+            'addresses': addresses,
+            'blocks': blocks,
+            'murf_operations': murf_operations
+        }
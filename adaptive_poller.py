@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Adaptive Poller - Poll interval driven by observed chain activity
+Each poll reports how much new MURF/KTA activity it found. Active polls shorten
+the interval (down to min_interval) so trades are picked up quickly while the
+chain is busy; idle polls back off exponentially (up to max_interval) so a quiet
+chain costs few requests. Rate-limit headers from the API (Retry-After,
+X-RateLimit-*, RateLimit-Reset) set a floor that the next poll never undercuts.
+"""
+
+import threading
+import time
+import logging
+from email.utils import parsedate_to_datetime
+
+from operation_records import MURF_ID, KTA_ID
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED_STATUS = (429, 503)
+
+
+def count_token_blocks(blocks, tokens=(MURF_ID, KTA_ID)):
+    """Number of normalized blocks with at least one operation on one of the tokens"""
+    return sum(1 for block in blocks if any(op.token in tokens for op in block.operations))
+
+
+def _header(headers, name):
+    if headers is None:
+        return None
+    value = headers.get(name)
+    return value.strip() if isinstance(value, str) and value.strip() else None
+
+
+def _seconds(value, now):
+    """Header value as seconds from now: delta seconds, epoch seconds or an HTTP date"""
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            return parsedate_to_datetime(value).timestamp() - now
+        except (TypeError, ValueError):
+            return None
+    # Large values are absolute epoch timestamps (X-RateLimit-Reset on most APIs)
+    return seconds - now if seconds > 1e9 else seconds
+
+
+def retry_after(status, headers, now=None):
+    """Seconds the server asked us to wait (0.0 for a bare 429), None if not rate limited"""
+    now = now if now is not None else time.time()
+    wait = None
+
+    value = _header(headers, 'Retry-After')
+    if value is not None and (status in RATE_LIMITED_STATUS or status is None):
+        wait = _seconds(value, now)
+
+    remaining = _header(headers, 'X-RateLimit-Remaining') or _header(headers, 'RateLimit-Remaining')
+    if wait is None and remaining is not None and remaining.split(',')[0].strip() in ('0', '0.0'):
+        reset = _header(headers, 'X-RateLimit-Reset') or _header(headers, 'RateLimit-Reset')
+        if reset is not None:
+            wait = _seconds(reset.split(',')[0].strip(), now)
+
+    if wait is None and status == 429:
+        return 0.0
+    return max(0.0, wait) if wait is not None else None
+
+
+class AdaptivePoller:
+    """Next poll interval from recent activity, exponential idle backoff and rate-limit floors"""
+
+    def __init__(self, base_interval, min_interval=None, max_interval=None, backoff=2.0, speedup=0.5):
+        self.base_interval = base_interval
+        self.min_interval = min_interval if min_interval is not None else base_interval / 4
+        self.max_interval = max_interval if max_interval is not None else base_interval * 10
+        self.backoff = backoff          # idle poll: interval *= backoff
+        self.speedup = speedup          # active poll: interval *= speedup
+        self.interval = base_interval
+        self.not_before = 0.0           # earliest next poll allowed by the API's rate limit
+        self.next_poll = 0.0
+        self.idle_polls = 0
+        self.polls = 0
+        self.active_polls = 0
+        self.rate_limited = 0
+        self.lock = threading.Lock()
+
+    def record(self, activity):
+        """Report new activity found by a poll, return seconds until the next poll"""
+        now = time.time()
+        with self.lock:
+            self.polls += 1
+            if activity:
+                self.active_polls += 1
+                self.idle_polls = 0
+                self.interval = max(self.min_interval, min(self.interval, self.base_interval) * self.speedup)
+            else:
+                self.idle_polls += 1
+                self.interval = min(self.max_interval, self.interval * self.backoff)
+            wait = max(self.interval, self.not_before - now)
+            self.next_poll = now + wait
+        return wait
+
+    def observe_response(self, response):
+        """Apply rate-limit headers of an HTTP response (requests or urllib), return the wait or None"""
+        status = getattr(response, 'status_code', None) or getattr(response, 'status', None) \
+            or getattr(response, 'code', None)
+        now = time.time()
+        wait = retry_after(status, getattr(response, 'headers', None), now)
+        if wait is None:
+            return None
+
+        with self.lock:
+            if not wait and status == 429:
+                # 429 without a usable header: treat it like an idle poll
+                self.interval = min(self.max_interval, self.interval * self.backoff)
+                wait = self.interval
+            self.rate_limited += 1
+            self.not_before = max(self.not_before, now + wait)
+            self.next_poll = max(self.next_poll, self.not_before)
+        logger.warning(f"Rate limited by upstream (status {status}), next poll in {wait:.0f}s")
+        return wait
+
+    def due(self, now=None):
+        """True when the next poll may run (for callers without a scheduler)"""
+        now = now if now is not None else time.time()
+        return now >= self.next_poll
+
+    def get_stats(self):
+        now = time.time()
+        with self.lock:
+            return {
+                "interval": self.interval,
+                "next_poll_in": max(0.0, self.next_poll - now),
+                "rate_limited_for": max(0.0, self.not_before - now),
+                "idle_polls": self.idle_polls,
+                "polls": self.polls,
+                "active_polls": self.active_polls,
+                "rate_limited": self.rate_limited
+            }
@@ -1,28 +1,28 @@
 #!/usr/bin/env python3
 """
 Airdrop Trace Scanner - Find all MURF holders by tracing from airdrop wallet
+Pages through the wallet's full history with nextKey cursors and keeps its
+progress in the database, so later runs only trace new entries.
 """
 
-import requests
 import sqlite3
-import json
 from datetime import datetime
 import time
-
-def hex_to_decimal(hex_str):
-    """Convert hexadecimal string to decimal integer."""
-    if hex_str.startswith('0x'):
-        return int(hex_str, 16)
-    return int(hex_str)
+from ledger_archive import replay_archive, fetch_history_page
+from operation_records import OP_SEND, OP_OTC
+from amount_codec import hex_to_decimal
 
 class AirdropTraceScanner:
-    def __init__(self):
+    def __init__(self, archive=None, page_limit=1000):
         self.airdrop_wallet = "keeta_aablrt5p4in4mehyxxunow3kp4c7rs2v4mh6v4z6qtfnt7sw5cxtw4r3b5oxtwi"
         self.murf_token = "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm"
         self.api_url = "https://rep2.main.network.api.keeta.com/api/node/ledger/account"
         self.db_path = "airdrop_trace.db"
+        self.archive = archive if archive is not None else replay_archive()
         self.holders = {}  # {address: {'received': amount, 'sent': amount, 'tx_count': count, 'first_tx': date, 'last_tx': date}}
-        self.airdrop_txs = []  # All airdrop transactions
+        self.page_limit = page_limit
+        self.pages_read = 0
+        self.new_transactions = 0
         self.start_time = None
         
         # Initialize database
@@ -57,25 +57,161 @@ class AirdropTraceScanner:
             )
         ''')
         
+        # Trace progress per wallet: newest block already traced, and where the
+        # walk towards older history stopped (NULL once the end was reached)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS trace_progress (
+                wallet TEXT PRIMARY KEY,
+                head_hash TEXT,
+                resume_cursor TEXT,
+                backfill_complete BOOLEAN DEFAULT 0,
+                pages INTEGER DEFAULT 0,
+                transactions INTEGER DEFAULT 0,
+                updated_at TEXT
+            )
+        ''')
+        
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_airdrop_tx_to ON airdrop_transactions (to_address)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_airdrop_tx_from ON airdrop_transactions (from_address)')
+        
         conn.commit()
         conn.close()
         print(f"Airdrop trace database initialized: {self.db_path}")
     
-    def get_account_history(self, address, limit=1000):
-        """Get account history from Keeta API"""
-        url = f"{self.api_url}/{address}/history"
+    def get_account_history(self, address, limit=1000, cursor=None):
+        """Get one account history page from Keeta API (or the local archive in replay mode)"""
         params = {'limit': limit}
+        if cursor:
+            params['nextKey'] = cursor
+        return fetch_history_page(f"{self.api_url}/{address}/history", params,
+                                  archive=self.archive, scope=address)
+    
+    def get_progress(self):
+        """Get trace progress of the airdrop wallet (None if never traced)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT head_hash, resume_cursor, backfill_complete, pages, transactions, updated_at
+            FROM trace_progress WHERE wallet = ?
+        ''', (self.airdrop_wallet,))
+        row = cursor.fetchone()
+        conn.close()
         
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching account history for {address}: {e}")
+        if not row:
             return None
+        return {
+            'head_hash': row[0],
+            'resume_cursor': row[1],
+            'backfill_complete': bool(row[2]),
+            'pages': row[3],
+            'transactions': row[4],
+            'updated_at': row[5]
+        }
+    
+    def extract_transfers(self, blocks):
+        """MURF transfers between the airdrop wallet and other addresses in history blocks"""
+        transfers = []
+        for block in blocks:
+            block_hash = block.get('$hash')
+            block_date = block.get('date')
+            operations = block.get('operations', [])
+            if not block_hash or not isinstance(operations, list):
+                continue
+            
+            for op_index, op in enumerate(operations):
+                # Look for MURF token operations (Type 0 = SEND to recipient, Type 7 = OTC/send from counterparty)
+                if not isinstance(op, dict) or op.get('token') != self.murf_token:
+                    continue
+                amount = hex_to_decimal(op.get('amount', '0x0'))
+                tx_hash = f"{block_hash}_{op.get('$id', op_index)}"
+                
+                if op.get('type') == OP_SEND:  # airdrop wallet sending MURF to a recipient
+                    to_address = op.get('to')
+                    if to_address and to_address != self.airdrop_wallet:
+                        transfers.append((tx_hash, self.airdrop_wallet, to_address, amount, block_date, block_hash))
+                
+                elif op.get('type') == OP_OTC:  # someone sending MURF to the airdrop wallet
+                    from_address = op.get('from')
+                    if from_address and from_address != self.airdrop_wallet:
+                        transfers.append((tx_hash, from_address, self.airdrop_wallet, amount, block_date, block_hash))
+        return transfers
+    
+    def apply_page(self, blocks, progress):
+        """Write one page of transfers and the trace progress in a single transaction
+
+        Transfers are keyed by tx hash, so re-tracing a page is a no-op; the
+        holders touched by the page are recomputed from their transfers.
+        """
+        transfers = self.extract_transfers(blocks)
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        before = conn.total_changes
+        cursor.executemany('''
+            INSERT OR IGNORE INTO airdrop_transactions 
+            (tx_hash, from_address, to_address, amount, date, block_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', transfers)
+        new_transactions = conn.total_changes - before
+        
+        if new_transactions:
+            touched = {tx[1] for tx in transfers} | {tx[2] for tx in transfers}
+            touched.discard(self.airdrop_wallet)
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS touched_addresses (address TEXT PRIMARY KEY)')
+            cursor.execute('DELETE FROM touched_addresses')
+            cursor.executemany('INSERT INTO touched_addresses (address) VALUES (?)', [(a,) for a in touched])
+            cursor.execute('''
+                WITH moves (address, received, sent, date) AS (
+                    SELECT t.to_address, t.amount, 0, t.date
+                    FROM airdrop_transactions t JOIN touched_addresses a ON a.address = t.to_address
+                    UNION ALL
+                    SELECT t.from_address, 0, t.amount, t.date
+                    FROM airdrop_transactions t JOIN touched_addresses a ON a.address = t.from_address
+                )
+                INSERT OR REPLACE INTO airdrop_holders 
+                (address, total_received, total_sent, current_balance, tx_count, 
+                 first_tx_date, last_tx_date, is_airdrop_recipient)
+                SELECT address, SUM(received), SUM(sent), SUM(received) - SUM(sent), COUNT(*),
+                       MIN(date), MAX(date), SUM(received) > 0
+                FROM moves GROUP BY address
+            ''')
+        
+        cursor.execute('''
+            INSERT INTO trace_progress
+            (wallet, head_hash, resume_cursor, backfill_complete, pages, transactions, updated_at)
+            VALUES (?, ?, ?, ?, 1, ?, ?)
+            ON CONFLICT (wallet) DO UPDATE SET
+                head_hash = excluded.head_hash,
+                resume_cursor = excluded.resume_cursor,
+                backfill_complete = excluded.backfill_complete,
+                pages = pages + 1,
+                transactions = transactions + excluded.transactions,
+                updated_at = excluded.updated_at
+        ''', (self.airdrop_wallet, progress['head_hash'], progress['resume_cursor'],
+              progress['backfill_complete'], new_transactions, datetime.now().isoformat()))
+        
+        conn.commit()
+        conn.close()
+        return new_transactions
     
-    def analyze_airdrop_wallet(self):
-        """Analyze the airdrop wallet to find all MURF recipients"""
+    def reset_legacy_data(self):
+        """Drop rows written by the old full-rewrite scan (before progress tracking existed)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM airdrop_holders')
+        cursor.execute('DELETE FROM airdrop_transactions')
+        conn.commit()
+        conn.close()
+    
+    def analyze_airdrop_wallet(self, max_pages=None):
+        """Trace the airdrop wallet to find all MURF recipients (incremental)
+
+        History is newest first. A run first walks from the head down to the
+        newest block traced before (new entries only), then continues the walk
+        towards the oldest history where a previous run stopped. Progress is
+        committed with every page, so an interrupted run resumes where it left.
+        """
         print("=" * 80)
         print("ANALYZING AIRDROP WALLET")
         print("=" * 80)
@@ -84,84 +220,114 @@ class AirdropTraceScanner:
         print()
         
         self.start_time = time.time()
+        self.pages_read = 0
+        self.new_transactions = 0
         
-        # Get airdrop wallet history
-        print("Fetching airdrop wallet history...")
-        data = self.get_account_history(self.airdrop_wallet, limit=1000)
+        progress = self.get_progress()
+        if progress is None:
+            self.reset_legacy_data()
+            progress = {'head_hash': None, 'resume_cursor': None, 'backfill_complete': False}
         
-        if not data or not data.get('history'):
-            print("ERROR: No history data found for airdrop wallet")
-            return False
+        # 1) New entries above the newest traced block
+        if progress['head_hash']:
+            print(f"Fetching new history above block {progress['head_hash'][:16]}...")
+            if not self._trace_new_entries(progress, max_pages):
+                return False
         
-        print(f"Found {len(data['history'])} history entries")
+        # 2) Older history not traced yet (first run, or an interrupted one)
+        if not progress['backfill_complete']:
+            print("Fetching airdrop wallet history..." if not progress['resume_cursor']
+                  else f"Resuming history walk at cursor {progress['resume_cursor'][:16]}...")
+            if not self._trace_backfill(progress, max_pages):
+                return False
         
-        # Analyze each history entry
-        airdrop_count = 0
-        for entry in data['history']:
-            if entry.get('voteStaple') and entry['voteStaple'].get('blocks'):
-                for block in entry['voteStaple']['blocks']:
-                    operations = block.get('operations', [])
-                    block_date = block.get('date')
-                    block_hash = block.get('$hash')
-                    
-                    for op in operations:
-                        # Look for MURF token operations (Type 0 = RECEIVE, Type 7 = SEND)
-                        if op.get('token') == self.murf_token:
-                            amount = hex_to_decimal(op.get('amount', '0x0'))
-                            
-                            if op.get('type') == 7:  # SEND operation (airdrop wallet sending to recipients)
-                                from_address = op.get('from')
-                                if from_address and from_address != self.airdrop_wallet:
-                                    # This is someone sending MURF to airdrop wallet
-                                    if from_address not in self.holders:
-                                        self.holders[from_address] = {
-                                            'received': 0, 'sent': 0, 'tx_count': 0,
-                                            'first_tx': block_date, 'last_tx': block_date
-                                        }
-                                    self.holders[from_address]['sent'] += amount
-                                    self.holders[from_address]['tx_count'] += 1
-                                    self.holders[from_address]['last_tx'] = block_date
-                                    
-                                    # Record airdrop transaction
-                                    self.airdrop_txs.append({
-                                        'tx_hash': f"{block_hash}_{op.get('$id', 'unknown')}",
-                                        'from_address': from_address,
-                                        'to_address': self.airdrop_wallet,
-                                        'amount': amount,
-                                        'date': block_date,
-                                        'block_hash': block_hash
-                                    })
-                                    airdrop_count += 1
-                            
-                            elif op.get('type') == 7:  # SEND operation (airdrop wallet sending)
-                                to_address = op.get('to')
-                                if to_address and to_address != self.airdrop_wallet:
-                                    # This is airdrop wallet sending MURF to recipients
-                                    if to_address not in self.holders:
-                                        self.holders[to_address] = {
-                                            'received': 0, 'sent': 0, 'tx_count': 0,
-                                            'first_tx': block_date, 'last_tx': block_date
-                                        }
-                                    self.holders[to_address]['received'] += amount
-                                    self.holders[to_address]['tx_count'] += 1
-                                    self.holders[to_address]['last_tx'] = block_date
-                                    
-                                    # Record airdrop transaction
-                                    self.airdrop_txs.append({
-                                        'tx_hash': f"{block_hash}_{op.get('$id', 'unknown')}",
-                                        'from_address': self.airdrop_wallet,
-                                        'to_address': to_address,
-                                        'amount': amount,
-                                        'date': block_date,
-                                        'block_hash': block_hash
-                                    })
-                                    airdrop_count += 1
+        print(f"Read {self.pages_read} history pages, {self.new_transactions} new MURF transactions")
         
-        print(f"Found {airdrop_count} MURF transactions from airdrop wallet")
+        self.load_holders()
         print(f"Found {len(self.holders)} unique addresses involved")
         
         return True
     
+    def _page_budget_left(self, max_pages):
+        return max_pages is None or self.pages_read < max_pages
+    
+    def _trace_new_entries(self, progress, max_pages):
+        known_head = progress['head_hash']
+        new_head = None
+        cursor = None
+        
+        while self._page_budget_left(max_pages):
+            data = self.get_account_history(self.airdrop_wallet, self.page_limit, cursor)
+            if data is None:
+                print("ERROR: Failed to fetch airdrop wallet history")
+                return False
+            self.pages_read += 1
+            
+            blocks = data.get('blocks', [])
+            hashes = [block.get('$hash') for block in blocks]
+            if new_head is None and hashes:
+                new_head = hashes[0]
+            reached_known = known_head in hashes
+            if reached_known:
+                blocks = blocks[:hashes.index(known_head)]
+            
+            # The head only moves once everything above the old head is traced
+            done = reached_known or not data.get('nextKey')
+            self.new_transactions += self.apply_page(blocks, dict(progress, head_hash=new_head if done else known_head))
+            if done:
+                progress['head_hash'] = new_head or known_head
+                return True
+            cursor = data['nextKey']
+        
+        print("Page limit reached before the previously traced head; the next run redoes this walk")
+        return True
+    
+    def _trace_backfill(self, progress, max_pages):
+        cursor = progress['resume_cursor']
+        
+        while self._page_budget_left(max_pages):
+            data = self.get_account_history(self.airdrop_wallet, self.page_limit, cursor)
+            if data is None:
+                if self.pages_read == 0:
+                    print("ERROR: No history data found for airdrop wallet")
+                    return False
+                print("History walk interrupted, the next run resumes from the saved cursor")
+                return True
+            self.pages_read += 1
+            
+            blocks = data.get('blocks', [])
+            if progress['head_hash'] is None and blocks:
+                progress['head_hash'] = blocks[0].get('$hash')
+            progress['resume_cursor'] = data.get('nextKey') or None
+            progress['backfill_complete'] = progress['resume_cursor'] is None
+            self.new_transactions += self.apply_page(blocks, progress)
+            
+            if self.pages_read % 25 == 0:
+                print(f"  {self.pages_read} pages, {self.new_transactions} new transactions")
+            if progress['backfill_complete']:
+                print("Reached end of airdrop wallet history")
+                return True
+            cursor = progress['resume_cursor']
+        
+        print("Page limit reached, the next run resumes from the saved cursor")
+        return True
+    
+    def load_holders(self):
+        """Load traced holders from the database"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT address, total_received, total_sent, tx_count, first_tx_date, last_tx_date
+            FROM airdrop_holders
+        ''')
+        self.holders = {
+            row[0]: {'received': row[1], 'sent': row[2], 'tx_count': row[3],
+                     'first_tx': row[4], 'last_tx': row[5]}
+            for row in cursor.fetchall()
+        }
+        conn.close()
+        return self.holders
+    
     def check_user_address(self, user_address):
         """Check if user address is in the holders list"""
         print("=" * 80)
@@ -183,41 +349,6 @@ class AirdropTraceScanner:
             print("USER ADDRESS NOT FOUND")
             return False
     
-    def save_to_database(self):
-        """Save all data to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Clear existing data
-        cursor.execute('DELETE FROM airdrop_holders')
-        cursor.execute('DELETE FROM airdrop_transactions')
-        
-        # Save holders
-        for address, data in self.holders.items():
-            current_balance = data['received'] - data['sent']
-            is_airdrop_recipient = data['received'] > 0
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO airdrop_holders 
-                (address, total_received, total_sent, current_balance, tx_count, 
-                 first_tx_date, last_tx_date, is_airdrop_recipient)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (address, data['received'], data['sent'], current_balance, 
-                  data['tx_count'], data['first_tx'], data['last_tx'], is_airdrop_recipient))
-        
-        # Save transactions
-        for tx in self.airdrop_txs:
-            cursor.execute('''
-                INSERT OR REPLACE INTO airdrop_transactions 
-                (tx_hash, from_address, to_address, amount, date, block_hash)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (tx['tx_hash'], tx['from_address'], tx['to_address'], 
-                  tx['amount'], tx['date'], tx['block_hash']))
-        
-        conn.commit()
-        conn.close()
-        print(f"Saved {len(self.holders)} holders and {len(self.airdrop_txs)} transactions to database")
-    
     def print_summary(self):
         """Print summary of findings"""
         print("=" * 80)
@@ -272,9 +403,6 @@ def main():
         user_address = "keeta_aab4nfsiygnkaypqbwjp422xl4m4hsljz3bnq4unpfzs4blhyfr5ca2lsr3jeay"
         scanner.check_user_address(user_address)
         
-        # Save to database
-        scanner.save_to_database()
-        
         # Print summary
         scanner.print_summary()
     else:
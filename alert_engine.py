@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Alert Engine - Push-based trade alerts evaluated on ingest
+KeetaMonitor.save_trades hands every recorded trade to the engine, which keeps
+rolling-window volume and price state in memory and fires price-change,
+large-trade, OTC and volume-spike alerts (plus the custom rules of
+alert_rules.py) as soon as a trade arrives. Nothing polls keeta_trades.db;
+it is read once at startup to warm the windows.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+import logging
+
+from alert_rules import AlertRuleSet
+from notification_system import KeetaNotifier
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+
+
+def parse_timestamp(value):
+    """Epoch seconds of an ISO timestamp (block date or DB column), None if unparseable"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed.timestamp()
+
+
+def utc_timestamp(ts):
+    """Epoch seconds as a block-date string (UTC, '...Z'), the format of the trades table"""
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def flatten_trade(trade_data):
+    """Flat trade dict (same keys as a trades table row) from KeetaMonitor trade data"""
+    if 'otc_details' not in trade_data:
+        return dict(trade_data)
+    otc_details = trade_data.get('otc_details') or {}
+    trade = {key: value for key, value in trade_data.items() if key not in ('otc_details', 'raw_operation')}
+    trade.update({
+        'is_otc': trade_data.get('is_otc', False),
+        'otc_from_address': otc_details.get('from_address', ''),
+        'exchange_ratio': otc_details.get('exchange_ratio', 0),
+        'counterpart_amount': otc_details.get('counterpart_amount', 0),
+        'counterpart_token': otc_details.get('counterpart_token', '')
+    })
+    return trade
+
+
+class RollingWindow:
+    """Sum and count of amounts over the last `seconds` (event time)"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.events = deque()  # (ts, amount), arrival order
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, ts, amount):
+        self.events.append((ts, amount))
+        self.total += amount
+        self.count += 1
+
+    def expire(self, now):
+        cutoff = now - self.seconds
+        while self.events and self.events[0][0] <= cutoff:
+            _, amount = self.events.popleft()
+            self.total -= amount
+            self.count -= 1
+        if not self.events:
+            self.total = 0.0  # drop float drift once empty
+
+
+class PriceWindow:
+    """Price points of the last `seconds`, plus the newest point older than that"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.points = deque()  # (ts, price)
+
+    def add(self, ts, price):
+        self.points.append((ts, price))
+
+    def expire(self, now):
+        while len(self.points) > 1 and self.points[1][0] <= now - self.seconds:
+            self.points.popleft()
+
+    def reference(self, now):
+        """(current price, price `seconds` ago) or None while history is shorter than the window"""
+        if not self.points or self.points[0][0] > now - self.seconds:
+            return None
+        return self.points[-1][1], self.points[0][1]
+
+    def change(self, now=None):
+        """Percentage change over the window (None while unknown)"""
+        if not self.points:
+            return None
+        prices = self.reference(self.points[-1][0] if now is None else now)
+        if prices is None or not prices[1]:
+            return None
+        return (prices[0] - prices[1]) / prices[1] * 100
+
+
+class AlertEngine:
+    def __init__(self, notifier=None, cooldown=60):
+        # Thresholds stay configured on KeetaNotifier (shared with check_alerts)
+        self.notifier = notifier or KeetaNotifier()
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.listeners = []
+
+        # Rolling windows keyed by (token or None for all tokens, seconds)
+        self.windows = {}
+        self.volume_1h = self.window(None, HOUR)
+        self.volume_2h = self.window(None, 2 * HOUR)
+
+        # Price = latest MURF amount / latest KTA amount (as KeetaNotifier.get_latest_price)
+        self.latest_amounts = {}
+        self.price_windows = {}
+        self.price_1h = self.price_window(HOUR)
+
+        # First-seen addresses, only kept when a rule asks for "from new address"
+        self.track_addresses = False
+        self.known_addresses = set()
+
+        # Trades database of warm_start; rules added later warm their new state from it
+        self.warm_db = None
+
+        self.now = None
+        self.last_fired = {}
+        self.trades_seen = 0
+        self.alerts_fired = 0
+
+        self.rules = AlertRuleSet(self)
+        for rule in getattr(self.notifier, 'alert_rules', []):
+            self.add_rule(rule)
+
+    def add_rule(self, text, name=None):
+        """Compile and add an alert rule (see alert_rules.py for the syntax)"""
+        with self.lock:
+            windows = set(self.windows)
+            price_windows = set(self.price_windows)
+            tracked = self.track_addresses
+            rule = self.rules.add(text, name)
+            if self.warm_db is not None:
+                # Added after warm_start: fill the windows / sender set this rule introduced
+                self._warm_new([key for key in self.windows if key not in windows],
+                               [seconds for seconds in self.price_windows if seconds not in price_windows],
+                               self.track_addresses and not tracked)
+            return rule
+
+    def price_window(self, seconds):
+        """Shared price window of a length"""
+        if seconds not in self.price_windows:
+            self.price_windows[seconds] = PriceWindow(seconds)
+        return self.price_windows[seconds]
+
+    def window(self, token, seconds):
+        """Shared rolling window for a token (None = all trades)"""
+        key = (token, seconds)
+        if key not in self.windows:
+            self.windows[key] = RollingWindow(seconds)
+        return self.windows[key]
+
+    def subscribe(self, callback):
+        """Register callback(alert) called for every fired alert"""
+        self.listeners.append(callback)
+
+    def observe(self, trade_data, silent=False):
+        """Fold one recorded trade into the state and return the alerts it fires"""
+        trade = flatten_trade(trade_data)
+        amount = trade.get('amount_decimal') or 0
+        token = trade.get('token_id')
+        ts = parse_timestamp(trade.get('timestamp'))
+        if ts is None:
+            ts = time.time()
+
+        with self.lock:
+            self.trades_seen += 1
+            self.now = max(self.now or ts, ts)
+            for (window_token, _), window in self.windows.items():
+                if window_token is None or window_token == token:
+                    window.add(ts, amount)
+                window.expire(self.now)
+
+            if token in (self.notifier.murf_token, self.notifier.kta_token) and amount > 0:
+                self.latest_amounts[token] = amount
+                murf = self.latest_amounts.get(self.notifier.murf_token)
+                kta = self.latest_amounts.get(self.notifier.kta_token)
+                if murf and kta:
+                    for price_window in self.price_windows.values():
+                        price_window.add(ts, murf / kta)
+            for price_window in self.price_windows.values():
+                price_window.expire(self.now)
+
+            is_new_address = False
+            if self.track_addresses and trade.get('from_address'):
+                is_new_address = trade['from_address'] not in self.known_addresses
+                self.known_addresses.add(trade['from_address'])
+
+            if silent:
+                return []
+            alerts = self._evaluate(trade, amount, is_new_address)
+
+        for alert in alerts:
+            self._dispatch(alert)
+        return alerts
+
+    def warm_start(self, db_path="keeta_trades.db", hours=None):
+        """Load recent trades (default: longest window) from the database into the windows (no alerts)
+
+        Every sender already in the database counts as known, so "from new
+        address" rules do not fire for old senders after a restart.
+        """
+        if hours is None:
+            seconds = max([w.seconds for w in self.windows.values()] +
+                          [w.seconds for w in self.price_windows.values()])
+            hours = seconds / HOUR
+        self.warm_db = db_path
+        rows = self._load_trades(utc_timestamp(time.time() - hours * HOUR))
+        if self.track_addresses:
+            with self.lock:
+                self.known_addresses.update(self._load_senders())
+
+        for timestamp, from_address, token_id, amount_decimal, is_otc in rows:
+            self.observe({'timestamp': timestamp, 'from_address': from_address, 'token_id': token_id,
+                          'amount_decimal': amount_decimal, 'is_otc': bool(is_otc)}, silent=True)
+        logger.info(f"Alert engine warmed with {len(rows)} trades")
+        return len(rows)
+
+    def _load_trades(self, since):
+        """Trades of the warm-start database after a block-date string, oldest first"""
+        conn = sqlite3.connect(self.warm_db)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                SELECT timestamp, from_address, token_id, amount_decimal, is_otc
+                FROM trades WHERE timestamp > ? ORDER BY timestamp
+            ''', (since,))
+            return cursor.fetchall()
+        except sqlite3.OperationalError:
+            return []
+        finally:
+            conn.close()
+
+    def _load_senders(self):
+        """All sender addresses of the warm-start database"""
+        conn = sqlite3.connect(self.warm_db)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT DISTINCT from_address FROM trades WHERE from_address IS NOT NULL AND from_address != ''")
+            return {row[0] for row in cursor.fetchall()}
+        except sqlite3.OperationalError:
+            return set()
+        finally:
+            conn.close()
+
+    def _warm_new(self, window_keys, price_seconds, load_senders):
+        """Fill windows / price windows created after warm_start (caller holds the lock)"""
+        if load_senders:
+            self.known_addresses.update(self._load_senders())
+        # A price window also needs the newest point from before its span
+        span = max([key[1] for key in window_keys] + [2 * seconds for seconds in price_seconds] + [0])
+        if not span:
+            return
+        now = self.now if self.now is not None else time.time()
+        latest = {}
+        for timestamp, _, token, amount, _ in self._load_trades(utc_timestamp(now - span)):
+            ts = parse_timestamp(timestamp)
+            if ts is None or ts > now:
+                continue
+            amount = amount or 0
+            for key in window_keys:
+                if key[0] is None or key[0] == token:
+                    self.windows[key].add(ts, amount)
+            if token in (self.notifier.murf_token, self.notifier.kta_token) and amount > 0:
+                latest[token] = amount
+                murf = latest.get(self.notifier.murf_token)
+                kta = latest.get(self.notifier.kta_token)
+                if murf and kta:
+                    for seconds in price_seconds:
+                        self.price_windows[seconds].add(ts, murf / kta)
+        for key in window_keys:
+            self.windows[key].expire(now)
+        for seconds in price_seconds:
+            self.price_windows[seconds].expire(now)
+
+    def _cooled_down(self, alert_type):
+        last = self.last_fired.get(alert_type)
+        return last is None or self.now - last >= self.cooldown
+
+    def _evaluate(self, trade, amount, is_new_address=False):
+        alerts = []
+
+        # Per-trade alerts fire once, for the trade that triggers them
+        if amount >= self.notifier.large_trade_threshold:
+            alerts.append(('large_trade', [trade]))
+        if trade.get('is_otc'):
+            alerts.append(('otc_trade', [trade]))
+
+        # State alerts fire when the condition holds, at most once per cooldown
+        price_data = self.price_change()
+        if price_data['alert'] and self._cooled_down('price_change'):
+            alerts.append(('price_change', price_data))
+        volume_data = self.volume_spike()
+        if volume_data['spike'] and self._cooled_down('volume_spike'):
+            alerts.append(('volume_spike', volume_data))
+
+        # Custom rules (shared window state, edge-triggered)
+        for rule, value, threshold in self.rules.evaluate(trade, amount, is_new_address):
+            alerts.append(('rule', {'rule': rule.name, 'text': rule.text, 'value': value,
+                                    'threshold': threshold, 'trade': trade}))
+
+        fired = []
+        for alert_type, data in alerts:
+            self.last_fired[alert_type] = self.now
+            fired.append({
+                'type': alert_type,
+                'data': data,
+                'message': self.notifier.generate_notification_message(alert_type, data),
+                'block_hash': trade.get('block_hash'),
+                'fired_at': datetime.now().isoformat()
+            })
+        self.alerts_fired += len(fired)
+        return fired
+
+    def price_change(self):
+        """Current vs 1h-ago price, same shape as KeetaNotifier.check_price_change"""
+        prices = self.price_1h.reference(self.now) if self.now is not None else None
+        if prices is None:
+            return {"change": 0, "percentage": 0, "alert": False}
+
+        current_price, previous_price = prices
+        change = current_price - previous_price
+        percentage = (change / previous_price) * 100
+        return {
+            "current_price": current_price,
+            "previous_price": previous_price,
+            "change": change,
+            "percentage": percentage,
+            "alert": abs(percentage) >= (self.notifier.price_change_threshold * 100)
+        }
+
+    def volume_spike(self):
+        """Last hour vs the hour before, same shape as KeetaNotifier.check_volume_spike"""
+        current_vol = self.volume_1h.total
+        previous_vol = self.volume_2h.total - self.volume_1h.total
+        if self.volume_2h.count == self.volume_1h.count:
+            previous_vol = 0
+
+        if not current_vol:
+            return {"spike": False, "current_volume": 0, "previous_volume": 0}
+        if previous_vol <= 0:
+            return {"spike": current_vol > self.notifier.volume_threshold,
+                    "current_volume": current_vol, "previous_volume": 0,
+                    "increase_percentage": 0}
+
+        volume_increase = (current_vol - previous_vol) / previous_vol
+        return {
+            "spike": volume_increase > 2.0,  # 200% increase
+            "current_volume": current_vol,
+            "previous_volume": previous_vol,
+            "increase_percentage": volume_increase * 100
+        }
+
+    def _dispatch(self, alert):
+        logger.warning(f"{alert['type'].upper().replace('_', ' ')} ALERT: {alert['message']}")
+        for callback in self.listeners:
+            try:
+                callback(alert)
+            except Exception as e:
+                logger.error(f"Alert listener error: {e}")
+
+    def get_stats(self):
+        """Engine counters"""
+        with self.lock:
+            return {
+                'trades_seen': self.trades_seen,
+                'alerts_fired': self.alerts_fired,
+                'windows': len(self.windows),
+                'rules': len(self.rules),
+                'volume_1h': self.volume_1h.total,
+                'volume_prev_1h': self.volume_2h.total - self.volume_1h.total
+            }
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Alert Rules - Small rule language for the alert engine
+Rules are compiled once into comparisons over metrics the AlertEngine already
+maintains incrementally (rolling windows per token and length, price windows,
+first-seen addresses). Rules sharing a window share its state, and each metric
+is computed at most once per trade, so many rules cost about as much as a few.
+
+    murf volume 1h > 3x prev 1h         window volume vs the window before it
+    kta trades 10m >= 50                trade count in a window
+    price change 1h >= 5%               MURF/KTA price move (absolute) over a window
+    single trade > 5000 kta from new address
+    single otc trade >= 10m murf        per-trade rules (token, otc, new address filters)
+
+Window rules fire when their condition becomes true and re-arm once it is
+false again; trade rules fire for every matching trade.
+"""
+
+import operator
+import re
+
+from operation_records import MURF_TOKEN, KTA_TOKEN
+
+TOKENS = {'murf': MURF_TOKEN, 'kta': KTA_TOKEN, 'any': None}
+WINDOW_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+NUMBER_SUFFIXES = {'k': 1e3, 'm': 1e6, 'b': 1e9}
+OPERATORS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+
+_NUMBER = r'\d[\d,_]*(?:\.\d+)?[kmb]?'
+_WINDOW = r'\d+[smhd]'
+_OP = r'>=|<=|>|<'
+
+WINDOW_RULE = re.compile(
+    rf'^(?:(?P<token>\w+)\s+)?(?P<metric>volume|trades)\s+(?P<window>{_WINDOW})\s*(?P<op>{_OP})\s*'
+    rf'(?:(?P<factor>\d+(?:\.\d+)?)x\s+prev\s+(?P<prev>{_WINDOW})|(?P<value>{_NUMBER}))$')
+PRICE_RULE = re.compile(
+    rf'^price\s+change\s+(?P<window>{_WINDOW})\s*(?P<op>{_OP})\s*(?P<value>\d+(?:\.\d+)?)%$')
+TRADE_RULE = re.compile(
+    rf'^single\s+(?P<otc>otc\s+)?trade\s*(?P<op>{_OP})\s*(?P<value>{_NUMBER})'
+    rf'(?:\s+(?P<token>\w+))?(?P<new>\s+from\s+new\s+address)?$')
+
+
+def parse_window(text):
+    """Seconds of a window like '10m' or '1h'"""
+    return int(text[:-1]) * WINDOW_UNITS[text[-1]]
+
+
+def parse_number(text):
+    """Number with optional k/m/b suffix ('10m' = 10,000,000)"""
+    text = text.replace(',', '').replace('_', '')
+    if text[-1] in NUMBER_SUFFIXES:
+        return float(text[:-1]) * NUMBER_SUFFIXES[text[-1]]
+    return float(text)
+
+
+def parse_token(name, rule):
+    if name is None:
+        return None
+    if name not in TOKENS:
+        raise ValueError(f"Unknown token '{name}' in rule: {rule}")
+    return TOKENS[name]
+
+
+class Rule:
+    """A compiled rule: metric <op> threshold (constant, or factor x another metric)"""
+
+    def __init__(self, text, name, kind, metric, op, value=None, factor=None, reference=None,
+                 token=None, otc=False, new_address=False):
+        self.text = text
+        self.name = name
+        self.kind = kind          # 'window' (condition) or 'trade' (per trade)
+        self.metric = metric      # metric key, see AlertRuleSet.metric_value
+        self.op = op
+        self.compare = OPERATORS[op]
+        self.value = value
+        self.factor = factor
+        self.reference = reference
+        self.token = token
+        self.otc = otc
+        self.new_address = new_address
+
+    def __repr__(self):
+        return f"Rule({self.name!r}: {self.text!r})"
+
+
+def compile_rule(text, name=None):
+    """Parse one rule into a Rule (ValueError if it does not parse)"""
+    source = ' '.join(text.lower().split())
+    name = name or source
+
+    match = WINDOW_RULE.match(source)
+    if match:
+        token = parse_token(match['token'], text)
+        seconds = parse_window(match['window'])
+        metric = (match['metric'], token, seconds)
+        if match['factor']:
+            reference = ('prev_' + match['metric'], token, seconds, parse_window(match['prev']))
+            return Rule(text, name, 'window', metric, match['op'],
+                        factor=float(match['factor']), reference=reference)
+        return Rule(text, name, 'window', metric, match['op'], value=parse_number(match['value']))
+
+    match = PRICE_RULE.match(source)
+    if match:
+        return Rule(text, name, 'window', ('price_change', parse_window(match['window'])),
+                    match['op'], value=float(match['value']))
+
+    match = TRADE_RULE.match(source)
+    if match:
+        return Rule(text, name, 'trade', ('trade_amount',), match['op'], value=parse_number(match['value']),
+                    token=parse_token(match['token'], text), otc=bool(match['otc']),
+                    new_address=bool(match['new']))
+
+    raise ValueError(f"Unrecognized alert rule: {text}")
+
+
+class AlertRuleSet:
+    """Rules compiled against one AlertEngine's shared state"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.window_rules = []
+        self.trade_rules = []
+        self.active = set()  # names of window rules whose condition currently holds
+
+    def __len__(self):
+        return len(self.window_rules) + len(self.trade_rules)
+
+    def add(self, text, name=None):
+        """Compile a rule and register the state it needs, return the Rule"""
+        rule = compile_rule(text, name)
+        for metric in (rule.metric, rule.reference):
+            if metric is None:
+                continue
+            if metric[0] in ('volume', 'trades'):
+                self.engine.window(metric[1], metric[2])
+            elif metric[0] in ('prev_volume', 'prev_trades'):
+                self.engine.window(metric[1], metric[2])
+                self.engine.window(metric[1], metric[2] + metric[3])
+            elif metric[0] == 'price_change':
+                self.engine.price_window(metric[1])
+        if rule.new_address:
+            self.engine.track_addresses = True
+
+        (self.window_rules if rule.kind == 'window' else self.trade_rules).append(rule)
+        return rule
+
+    def metric_value(self, metric, cache):
+        """Current value of a metric key (cached for the trade being evaluated)"""
+        if metric in cache:
+            return cache[metric]
+        kind = metric[0]
+        if kind == 'volume':
+            value = self.engine.window(metric[1], metric[2]).total
+        elif kind == 'trades':
+            value = self.engine.window(metric[1], metric[2]).count
+        elif kind in ('prev_volume', 'prev_trades'):
+            current = self.engine.window(metric[1], metric[2])
+            combined = self.engine.window(metric[1], metric[2] + metric[3])
+            if kind == 'prev_trades':
+                value = combined.count - current.count
+            else:
+                value = combined.total - current.total if combined.count > current.count else 0.0
+        elif kind == 'price_change':
+            change = self.engine.price_window(metric[1]).change(self.engine.now)
+            value = abs(change) if change is not None else None
+        else:
+            raise ValueError(f"Unknown metric: {metric}")
+        cache[metric] = value
+        return value
+
+    def evaluate(self, trade, amount, is_new_address=False):
+        """Rules fired by a trade: list of (rule, value, threshold)"""
+        fired = []
+        cache = {}
+
+        for rule in self.trade_rules:
+            if rule.token is not None and trade.get('token_id') != rule.token:
+                continue
+            if rule.otc and not trade.get('is_otc'):
+                continue
+            if rule.new_address and not is_new_address:
+                continue
+            if rule.compare(amount, rule.value):
+                fired.append((rule, amount, rule.value))
+
+        for rule in self.window_rules:
+            value = self.metric_value(rule.metric, cache)
+            if rule.reference is not None:
+                reference = self.metric_value(rule.reference, cache)
+                # "3x prev" needs a previous window with activity
+                threshold = rule.factor * reference if reference else None
+            else:
+                threshold = rule.value
+            holds = value is not None and threshold is not None and rule.compare(value, threshold)
+
+            if not holds:
+                self.active.discard(rule.name)
+            elif rule.name not in self.active:
+                self.active.add(rule.name)
+                fired.append((rule, value, threshold))
+
+        return fired
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Amount Codec - Shared decoding of Keeta token amounts
+Amounts are kept as exact integers in raw units (KTA has 18 decimals, MURF
+none) and only converted for display. Repeated hex strings hit a memoized
+fast path; bulk decoding has a vectorized NumPy path.
+"""
+
+from decimal import Decimal
+from functools import lru_cache
+
+try:
+    import numpy as np  # Optional (bulk decoding only)
+except ImportError:
+    np = None
+
+KTA_DECIMALS = 18
+MURF_DECIMALS = 0
+
+# Amounts up to 128 bits (32 hex digits) are decoded as two uint64 halves
+HEX_WIDTH = 32
+
+DECODE_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def _decode_string(value, hex_only):
+    if hex_only or value[:2] in ('0x', '0X'):
+        return int(value, 16)
+    return int(value)
+
+
+def decode_amount(value, hex_only=False):
+    """Decode an amount ('0x...' hex, decimal string or int) to an exact integer (0 if invalid)
+
+    With hex_only, strings without the '0x' prefix are read as hex as well.
+    """
+    if isinstance(value, int):
+        return value
+    if not isinstance(value, str):
+        return 0
+    try:
+        return _decode_string(value, hex_only)
+    except ValueError:
+        return 0
+
+
+def decode_hex(value):
+    """Decode a hex amount (prefix optional) to an exact integer (0 if invalid)"""
+    return decode_amount(value, True)
+
+
+def hex_to_decimal(value):
+    """Convert an amount string ('0x...' hex or decimal) to an exact integer"""
+    return decode_amount(value)
+
+
+def decode_amounts_exact(values):
+    """Decode many amounts to exact integers"""
+    return [decode_amount(v) for v in values]
+
+
+def to_decimal(amount, decimals=KTA_DECIMALS):
+    """Exact Decimal value of a raw integer amount"""
+    return Decimal(decode_amount(amount)).scaleb(-decimals)
+
+
+def to_float(amount, decimals=KTA_DECIMALS):
+    """Display value of a raw integer amount (single rounding step)"""
+    return decode_amount(amount) / 10 ** decimals
+
+
+def format_amount(amount, decimals=KTA_DECIMALS):
+    """Exact fixed-point string of a raw integer amount ('1.5', '30000000')"""
+    value = decode_amount(amount)
+    if decimals == 0:
+        return str(value)
+    sign = '-' if value < 0 else ''
+    whole, frac = divmod(abs(value), 10 ** decimals)
+    frac = str(frac).rjust(decimals, '0').rstrip('0')
+    return f"{sign}{whole}.{frac}" if frac else f"{sign}{whole}"
+
+
+def parse_units(value, decimals=KTA_DECIMALS):
+    """Raw integer amount from a stored value (raw TEXT/int, or legacy float in whole units)"""
+    if value is None:
+        return 0
+    if isinstance(value, (int, str)):
+        return decode_amount(value)
+    try:
+        return int(Decimal(repr(float(value))).scaleb(decimals).to_integral_value())
+    except (ValueError, ArithmeticError):
+        return 0
+
+
+def sum_amounts(values):
+    """Exact sum of raw amounts"""
+    return sum(decode_amount(v) for v in values)
+
+
+def decode_amounts(values):
+    """Decode hex amount strings ('0x...') to float64 raw units, vectorized
+
+    Returns (amounts, valid) where valid is False for malformed or >128-bit values.
+    Use decode_amounts_exact when totals must not drift.
+    """
+    if np is None:
+        raise RuntimeError("numpy is required for vectorized amount decoding (pip install numpy)")
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.float64), np.zeros(0, dtype=bool)
+    digits = np.array([v[2:] if isinstance(v, str) and v[:2] in ('0x', '0X') else (v or '')
+                       for v in values], dtype=object)
+    lengths = np.array([len(v) for v in digits], dtype=np.int64)
+    fits = (lengths > 0) & (lengths <= HEX_WIDTH)
+
+    padded = np.char.rjust(np.where(fits, digits, '0').astype(f'U{HEX_WIDTH}'), HEX_WIDTH, '0')
+    chars = np.frombuffer(np.char.encode(padded, 'ascii').tobytes(), dtype=np.uint8)
+    chars = chars.reshape(-1, HEX_WIDTH)
+
+    # ASCII -> nibble ('0'-'9', 'A'-'F', 'a'-'f'); anything else marks the row invalid
+    nibbles = np.full(chars.shape, 255, dtype=np.uint8)
+    for low, high, offset in ((48, 57, 48), (65, 70, 55), (97, 102, 87)):
+        in_range = (chars >= low) & (chars <= high)
+        nibbles[in_range] = chars[in_range] - offset
+    valid = fits & (nibbles != 255).all(axis=1)
+    nibbles[nibbles == 255] = 0
+
+    weights = np.uint64(16) ** np.arange(15, -1, -1, dtype=np.uint64)
+    high = (nibbles[:, :16].astype(np.uint64) * weights).sum(axis=1, dtype=np.uint64)
+    low = (nibbles[:, 16:].astype(np.uint64) * weights).sum(axis=1, dtype=np.uint64)
+
+    amounts = high.astype(np.float64) * 18446744073709551616.0 + low.astype(np.float64)
+    amounts[~valid] = 0.0
+    return amounts, valid
+
+
+def cache_info():
+    """Hit/miss statistics of the memoized decode path"""
+    return _decode_string.cache_info()
@@ -4,9 +4,15 @@ import requests
 import json
 import sqlite3
 from datetime import datetime, timedelta
-import time
 import threading
 import random
+from block_cache import SeenBlockCache
+from history_stream import extract_blocks
+from operation_records import normalize_blocks
+from otc_engine import OTC_ENGINE
+from otc_transactions_db import ensure_raw_amount_columns, raw_amounts
+from worker_runtime import WorkerRuntime
+from adaptive_poller import AdaptivePoller, count_token_blocks
 
 class AutoOTCScraper:
     def __init__(self):
@@ -15,7 +21,11 @@ class AutoOTCScraper:
         self.murf_token = "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm"
         self.kta_token = "keeta_anqdilpazdekdu4acw65fj7smltcp26wbrildkqtszqvverljpwpezmd44ssg"
         self.db_path = "otc_transactions.db"
+        self.block_cache = SeenBlockCache("auto_scraper")
         self.running = False
+        self.runtime = None
+        self.poller = None
+        self.last_activity = 0
         self.init_database()
     
     def init_database(self):
@@ -42,6 +52,9 @@ class AutoOTCScraper:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_tx_hash ON otc_transactions(tx_hash)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON otc_transactions(timestamp)')
         
+        # Exact raw amount columns
+        ensure_raw_amount_columns(cursor)
+        
         conn.commit()
         conn.close()
         print("[OK] OTC Transactions database initialized")
@@ -53,6 +66,8 @@ class AutoOTCScraper:
             
             print(f"[DEBUG] Fetching data from API with limit={limit}...")
             response = requests.get(self.api_url, params=params, timeout=15)
+            if self.poller is not None:
+                self.poller.observe_response(response)
             
             if response.status_code == 200:
                 data = response.json()
@@ -68,57 +83,44 @@ class AutoOTCScraper:
     
     def analyze_otc_transactions(self, data):
         """Analyze and extract OTC transactions from API data"""
-        if not data or 'history' not in data:
+        blocks = extract_blocks(data)
+        if not blocks:
             print("[WARNING] No history data found")
             return []
         
         otc_transactions = []
-        print(f"[DEBUG] Analyzing {len(data['history'])} history entries...")
+        print(f"[DEBUG] Analyzing {len(blocks)} blocks...")
         
-        for i, entry in enumerate(data['history']):
-            if 'operations' in entry:
-                operations = entry['operations']
-                
-                # Look for Type 7 KTA operations
-                type_7_kta = None
-                type_0_murf = None
-                
-                for op in operations:
-                    if op.get('type') == 7 and op.get('token') == self.kta_token:
-                        type_7_kta = op
-                    elif op.get('type') == 0 and op.get('token') == self.murf_token:
-                        type_0_murf = op
+        # Type 7 KTA/MURF + Type 0 counterpart in the same block
+        for match in OTC_ENGINE.match_blocks(normalize_blocks(blocks), lookback=False):
+            if match.counterpart is None:
+                continue
+            
+            try:
+                kta_amount = match.kta_decimal
+                murf_amount = match.murf_amount
                 
-                # If we found both Type 7 KTA and Type 0 MURF in the same block
-                if type_7_kta and type_0_murf:
-                    try:
-                        # Parse KTA amount
-                        kta_amount_hex = type_7_kta.get('amount', '0x0')
-                        kta_amount = int(kta_amount_hex, 16) / 1e18
-                        
-                        # Parse MURF amount
-                        murf_amount_hex = type_0_murf.get('amount', '0x0')
-                        murf_amount = int(murf_amount_hex, 16)
-                        
-                        if kta_amount > 0 and murf_amount > 0:
-                            exchange_rate = murf_amount / kta_amount
-                            
-                            otc_transaction = {
-                                'tx_hash': entry.get('$hash', 'N/A'),
-                                'block_hash': entry.get('$hash', 'N/A'),
-                                'kta_amount': kta_amount,
-                                'murf_amount': murf_amount,
-                                'exchange_rate': exchange_rate,
-                                'from_address': type_7_kta.get('from', 'N/A'),
-                                'to_address': type_0_murf.get('to', 'N/A'),
-                                'timestamp': entry.get('date', datetime.now().isoformat())
-                            }
-                            
-                            otc_transactions.append(otc_transaction)
-                            print(f"[OK] Found OTC: {kta_amount:.2f} KTA <-> {murf_amount:,.0f} MURF (Rate: {exchange_rate:,.0f})")
+                if kta_amount > 0 and murf_amount > 0:
+                    exchange_rate = murf_amount / kta_amount
                     
-                    except Exception as e:
-                        print(f"[ERROR] Error parsing OTC transaction: {e}")
+                    otc_transaction = {
+                        'tx_hash': match.block.hash or 'N/A',
+                        'block_hash': match.block.hash or 'N/A',
+                        'kta_amount': kta_amount,
+                        'murf_amount': murf_amount,
+                        'exchange_rate': exchange_rate,
+                        'from_address': match.block.name(match.op.from_id) or 'N/A',
+                        'to_address': match.block.name(match.counterpart.to_id) or 'N/A',
+                        'timestamp': match.block.date or datetime.now().isoformat(),
+                        'kta_amount_raw': match.kta_amount,
+                        'murf_amount_raw': match.murf_amount
+                    }
+                    
+                    otc_transactions.append(otc_transaction)
+                    print(f"[OK] Found OTC: {kta_amount:.2f} KTA <-> {murf_amount:,.0f} MURF (Rate: {exchange_rate:,.0f})")
+            
+            except Exception as e:
+                print(f"[ERROR] Error parsing OTC transaction: {e}")
         
         print(f"[DATA] Total OTC transactions found: {len(otc_transactions)}")
         return otc_transactions
@@ -135,11 +137,12 @@ class AutoOTCScraper:
         saved_count = 0
         for tx in transactions:
             try:
+                kta_raw, murf_raw = raw_amounts(tx)
                 cursor.execute('''
                     INSERT OR REPLACE INTO otc_transactions 
                     (tx_hash, block_hash, kta_amount, murf_amount, exchange_rate, 
-                     from_address, to_address, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                     from_address, to_address, timestamp, kta_amount_raw, murf_amount_raw)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     tx['tx_hash'],
                     tx['block_hash'],
@@ -148,7 +151,9 @@ class AutoOTCScraper:
                     tx['exchange_rate'],
                     tx['from_address'],
                     tx['to_address'],
-                    tx['timestamp']
+                    tx['timestamp'],
+                    str(kta_raw),
+                    str(murf_raw)
                 ))
                 saved_count += 1
                 print(f"[SAVE] Saved OTC transaction: {tx['tx_hash'][:20]}...")
@@ -192,6 +197,7 @@ class AutoOTCScraper:
     def scrape_cycle(self):
         """Single scraping cycle"""
         print(f"\n[REFRESH] Starting scraping cycle at {datetime.now().strftime('%H:%M:%S')}")
+        self.last_activity = 0
         
         # Fetch data from API
         data = self.fetch_api_data(limit=200)
@@ -199,8 +205,15 @@ class AutoOTCScraper:
             print("[ERROR] Failed to fetch API data")
             return False
         
+        # Only analyze blocks not seen in a previous (overlapping) cycle
+        blocks = extract_blocks(data)
+        new_blocks = self.block_cache.filter_new(blocks)
+        print(f"[CACHE] {len(new_blocks)} new blocks (skipped {len(blocks) - len(new_blocks)} already seen)")
+        self.last_activity = count_token_blocks(normalize_blocks(new_blocks))
+        
         # Analyze OTC transactions
-        otc_transactions = self.analyze_otc_transactions(data)
+        otc_transactions = self.analyze_otc_transactions({'blocks': new_blocks})
+        self.block_cache.mark_blocks(new_blocks)
         if not otc_transactions:
             print("[WARNING] No OTC transactions found in this cycle")
             return False
@@ -211,27 +224,39 @@ class AutoOTCScraper:
         print(f"[OK] Scraping cycle completed! Saved {saved_count} new OTC transactions")
         return True
     
-    def start_auto_scraping(self, interval_minutes=5):
-        """Start automatic scraping every N minutes"""
+    def run_cycle(self):
+        """Scraping cycle plus database stats (one scheduled run), return seconds until the next one"""
+        self.scrape_cycle()
+        self.get_database_stats()
+        if self.poller is None:
+            return None
+        
+        # New MURF/KTA blocks shorten the interval, idle cycles back off
+        delay = self.poller.record(self.last_activity)
+        print(f"[SCHEDULE] {self.last_activity} new MURF/KTA blocks, next cycle in {delay:.0f}s")
+        return delay
+    
+    def start_auto_scraping(self, interval_minutes=5, runtime=None):
+        """Start automatic scraping, every N minutes while activity is steady
+
+        The interval adapts between 30 seconds (busy chain) and 6x N minutes
+        (idle chain). With a shared WorkerRuntime the job is only registered;
+        otherwise a runtime is created and this call blocks until stop_auto_scraping().
+        """
         self.running = True
-        print(f"[OK] Starting auto-scraping every {interval_minutes} minutes...")
+        print(f"[OK] Starting auto-scraping every {interval_minutes} minutes (adaptive)...")
         
-        while self.running:
-            try:
-                self.scrape_cycle()
-                self.get_database_stats()
-                
-                # Wait for next cycle
-                print(f"[DEBUG] Waiting {interval_minutes} minutes for next cycle...")
-                time.sleep(interval_minutes * 60)
-                
-            except KeyboardInterrupt:
-                print("\n[WARNING] Auto-scraping stopped by user")
-                break
-            except Exception as e:
-                print(f"[ERROR] Error in auto-scraping cycle: {e}")
-                print("[DEBUG] Waiting 1 minute before retry...")
-                time.sleep(60)
+        self.poller = AdaptivePoller(interval_minutes * 60, min_interval=30, max_interval=interval_minutes * 360)
+        self.runtime = runtime or WorkerRuntime("auto-scraper")
+        self.runtime.register("otc-scrape", self.run_cycle, interval=interval_minutes * 60,
+                              timeout=interval_minutes * 60)
+        if runtime is not None:
+            return
+        
+        try:
+            self.runtime.run_forever()
+        except KeyboardInterrupt:
+            print("\n[WARNING] Auto-scraping stopped by user")
         
         self.running = False
         print("[OK] Auto-scraping stopped")
@@ -239,6 +264,8 @@ class AutoOTCScraper:
     def stop_auto_scraping(self):
         """Stop automatic scraping"""
         self.running = False
+        if self.runtime is not None:
+            self.runtime.stop()
         print("[OK] Stopping auto-scraping...")
 
 if __name__ == "__main__":
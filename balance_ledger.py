@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Balance Ledger - Event-sourced MURF balances per address
+Every MURF balance change (Type 0 receive, Type 7 send) is stored once as an
+event keyed by (block_hash, op_index, address); per-address balances are a
+running projection of those events, updated incrementally by the ingester.
+"""
+
+import sqlite3
+from datetime import datetime, timezone
+
+from amount_codec import decode_hex
+from history_stream import ADDRESS_BLOCK_FIELDS
+from ledger_archive import NETWORK_SCOPE
+from operation_records import MURF_TOKEN, OP_SEND, OP_OTC
+
+LEDGER_DB = "balance_ledger.db"
+
+# Event type of reconciliation corrections (not a ledger operation)
+ADJUSTMENT = -1
+
+
+def murf_events(blocks):
+    """Balance events (block_hash, op_index, address, delta, type, date) of slim history blocks
+
+    Same rules as the holder scanners: Type 0 to an address is a receive,
+    Type 7 from an address is a send.
+    """
+    events = []
+    for block in blocks:
+        block_hash = block.get('$hash')
+        if not block_hash:
+            continue
+        operations = block.get('operations', [])
+        if not isinstance(operations, list):
+            continue
+        date = block.get('date', '')
+
+        for op_index, op in enumerate(operations):
+            if not isinstance(op, dict) or op.get('token') != MURF_TOKEN:
+                continue
+            op_type = op.get('type')
+            amount = decode_hex(op.get('amount', '0x0'))
+            if op_type == OP_SEND and op.get('to'):
+                events.append((block_hash, op_index, op['to'], amount, op_type, date))
+            elif op_type == OP_OTC and op.get('from'):
+                events.append((block_hash, op_index, op['from'], -amount, op_type, date))
+    return events
+
+
+class BalanceLedger:
+    def __init__(self, db_path=LEDGER_DB):
+        self.db_path = db_path
+        self.init_database()
+
+    def init_database(self):
+        """Initialize ledger database"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        # Append-only event log; the key makes re-ingesting a page a no-op
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS balance_events (
+                block_hash TEXT NOT NULL,
+                op_index INTEGER NOT NULL,
+                address TEXT NOT NULL,
+                delta INTEGER NOT NULL,
+                type INTEGER,
+                date TEXT,
+                PRIMARY KEY (block_hash, op_index, address)
+            )
+        ''')
+
+        # Projection of the events (raw MURF units, no decimals)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS balances (
+                address TEXT PRIMARY KEY,
+                balance INTEGER NOT NULL DEFAULT 0,
+                total_received INTEGER NOT NULL DEFAULT 0,
+                total_sent INTEGER NOT NULL DEFAULT 0,
+                tx_count INTEGER NOT NULL DEFAULT 0,
+                first_tx_date TEXT,
+                last_tx_date TEXT,
+                updated_at TEXT
+            )
+        ''')
+
+        # moved = 0: the event arrived after a reconciliation that already
+        # counted it (dated before the pin), so it did not change the balance
+        cursor.execute('PRAGMA table_info(balance_events)')
+        if 'moved' not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute('ALTER TABLE balance_events ADD COLUMN moved INTEGER NOT NULL DEFAULT 1')
+
+        # Time of the last API verification per address (see record_adjustments)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS balance_pins (
+                address TEXT PRIMARY KEY,
+                pinned_at TEXT NOT NULL
+            )
+        ''')
+
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_balance_events_address ON balance_events (address)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_balance_events_date ON balance_events (date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_balances_balance ON balances (balance)')
+
+        conn.commit()
+        conn.close()
+
+    def apply_events(self, events):
+        """Append events and fold the new ones into balances, return number of new operation events"""
+        if not events:
+            return 0
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        changes = {}
+        pins = {}
+        for event in events:
+            address, delta, event_type, date = event[2], event[3], event[4], event[5]
+            if address not in pins:
+                cursor.execute('SELECT pinned_at FROM balance_pins WHERE address = ?', (address,))
+                row = cursor.fetchone()
+                pins[address] = row[0] if row else None
+            # Older history (e.g. backfilled by the ingester) is already in a verified balance
+            moved = not (event_type != ADJUSTMENT and date and pins[address] and date <= pins[address])
+
+            cursor.execute('''
+                INSERT OR IGNORE INTO balance_events
+                (block_hash, op_index, address, delta, type, date, moved)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', tuple(event) + (int(moved),))
+            if cursor.rowcount != 1:
+                continue
+
+            change = changes.setdefault(address, {
+                'delta': 0, 'received': 0, 'sent': 0, 'count': 0, 'first': None, 'last': None
+            })
+            if moved:
+                change['delta'] += delta
+            if event_type == ADJUSTMENT:
+                continue                # corrections move the balance only
+            if delta >= 0:
+                change['received'] += delta
+            else:
+                change['sent'] -= delta
+            change['count'] += 1
+            if date:
+                change['first'] = min(change['first'] or date, date)
+                change['last'] = max(change['last'] or date, date)
+
+        now = datetime.now().isoformat()
+        for address, change in changes.items():
+            cursor.execute('''
+                INSERT INTO balances
+                (address, balance, total_received, total_sent, tx_count, first_tx_date, last_tx_date, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(address) DO UPDATE SET
+                    balance = balance + excluded.balance,
+                    total_received = total_received + excluded.total_received,
+                    total_sent = total_sent + excluded.total_sent,
+                    tx_count = tx_count + excluded.tx_count,
+                    first_tx_date = MIN(COALESCE(first_tx_date, excluded.first_tx_date),
+                                        COALESCE(excluded.first_tx_date, first_tx_date)),
+                    last_tx_date = MAX(COALESCE(last_tx_date, excluded.last_tx_date),
+                                       COALESCE(excluded.last_tx_date, last_tx_date)),
+                    updated_at = excluded.updated_at
+            ''', (address, change['delta'], change['received'], change['sent'], change['count'],
+                  change['first'], change['last'], now))
+
+        conn.commit()
+        conn.close()
+        return sum(change['count'] for change in changes.values())
+
+    def apply_blocks(self, blocks):
+        """Apply the MURF operations of slim history blocks (idempotent)"""
+        return self.apply_events(murf_events(blocks))
+
+    def record_adjustments(self, source, verified, verified_at=None):
+        """Pin balances verified against the API {address: balance} at verified_at (UTC, default now)
+
+        A differing balance gets an adjustment event. Adjustments only move the
+        balance; received/sent/count/dates stay a projection of operation
+        events (tx_count 0 = no events for the address). Operation events that
+        arrive later but are dated at or before verified_at were already part
+        of the verified balance, so they are stored without moving it.
+        """
+        verified_at = verified_at or datetime.now(timezone.utc)
+        pinned_at = verified_at.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        current = self.get_balances(verified)
+        events = []
+        for op_index, (address, balance) in enumerate(sorted(verified.items())):
+            record = current.get(address)
+            delta = balance - (record['current_balance'] if record else 0)
+            if delta:
+                events.append((source, op_index, address, delta, ADJUSTMENT, None))
+        self.apply_events(events)
+
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany('''
+            INSERT INTO balance_pins (address, pinned_at) VALUES (?, ?)
+            ON CONFLICT(address) DO UPDATE SET pinned_at = MAX(pinned_at, excluded.pinned_at)
+        ''', [(address, pinned_at) for address in verified])
+        conn.commit()
+        conn.close()
+        return len(events)
+
+    def apply_archive(self, archive, scope=NETWORK_SCOPE):
+        """Replay pages already in the ledger archive into the ledger"""
+        total = 0
+        for page in archive.iter_pages(scope, ADDRESS_BLOCK_FIELDS):
+            total += self.apply_blocks(page['blocks'])
+        return total
+
+    def get_balance(self, address):
+        """Get the ledger record of an address (None if it never held MURF)"""
+        return self.get_balances([address]).get(address)
+
+    def get_balances(self, addresses):
+        """Get ledger records for many addresses ({address: record})"""
+        addresses = list(addresses)
+        records = {}
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        for i in range(0, len(addresses), 500):
+            chunk = addresses[i:i + 500]
+            cursor.execute(f'''
+                SELECT address, balance, total_received, total_sent, tx_count, first_tx_date, last_tx_date
+                FROM balances WHERE address IN ({",".join("?" * len(chunk))})
+            ''', chunk)
+            for row in cursor.fetchall():
+                records[row[0]] = {
+                    'address': row[0],
+                    'current_balance': row[1],
+                    'total_received': row[2],
+                    'total_sent': row[3],
+                    'tx_count': row[4],
+                    'first_tx_date': row[5],
+                    'last_tx_date': row[6]
+                }
+        conn.close()
+        return records
+
+    def get_holders(self, min_balance=1):
+        """Get all addresses with at least min_balance MURF (largest first)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT address, balance, total_received, total_sent, tx_count, first_tx_date, last_tx_date
+            FROM balances WHERE balance >= ?
+            ORDER BY balance DESC
+        ''', (min_balance,))
+        rows = cursor.fetchall()
+        conn.close()
+
+        return [{
+            'address': row[0],
+            'current_balance': row[1],
+            'total_received': row[2],
+            'total_sent': row[3],
+            'tx_count': row[4],
+            'first_tx_date': row[5],
+            'last_tx_date': row[6]
+        } for row in rows]
+
+    def get_events_after(self, last_event=0):
+        """Operation events appended after an event id, oldest first: [(event_id, address, delta, date, moved)]
+
+        Event ids (rowids) only grow, so a consumer that keeps the last id it
+        folded in sees each event exactly once, whatever its block date.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT rowid, address, delta, date, moved FROM balance_events
+            WHERE rowid > ? AND type IS NOT ?
+            ORDER BY rowid
+        ''', (last_event, ADJUSTMENT))
+        rows = cursor.fetchall()
+        cursor.execute('SELECT COALESCE(MAX(rowid), 0) FROM balance_events')
+        newest = max(last_event, cursor.fetchone()[0])
+        conn.close()
+        return rows, newest
+
+    def get_recent_addresses(self, since):
+        """Get addresses with balance events dated at or after an ISO timestamp"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT DISTINCT address FROM balance_events WHERE date >= ?', (since,))
+        addresses = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        return addresses
+
+    def get_stats(self):
+        """Get ledger statistics"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM balance_events')
+        events = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(*), COALESCE(SUM(balance), 0) FROM balances WHERE balance > 0')
+        holders, circulation = cursor.fetchone()
+        conn.close()
+
+        return {
+            'events': events,
+            'holders': holders,
+            'circulation': circulation
+        }
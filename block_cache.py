@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Block Cache - Skip blocks already handled by overlapping polls
+A bounded LRU of seen block hashes decides whether a block is new. A persisted
+high-water mark (newest processed block date) only skips blocks dated well
+before it (safety_margin), so a block that arrives late or carries an older
+client-set date is still processed; re-processing is harmless (saves dedupe).
+"""
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+CACHE_DB = "block_cache.db"
+CACHE_ENV = "KEETA_BLOCK_CACHE_DB"
+
+
+def _shift_date(date, delta):
+    """ISO block date moved by a timedelta, same format ('...Z'); None if unparseable"""
+    try:
+        parsed = datetime.fromisoformat(date.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    return (parsed + delta).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + ('Z' if date.endswith('Z') else '')
+
+
+class SeenBlockCache:
+    def __init__(self, name, capacity=5000, db_path=None, safety_margin=timedelta(hours=24)):
+        self.name = name
+        self.capacity = capacity
+        self.db_path = db_path or os.environ.get(CACHE_ENV, CACHE_DB)
+        self.safety_margin = safety_margin
+        self.seen = OrderedDict()
+        self.lock = threading.Lock()
+        self.high_water = None
+        self.skip_before = None         # high_water - safety_margin
+        self.hits = 0
+        self.misses = 0
+        self.init_database()
+        self.load_high_water()
+
+    def init_database(self):
+        """Initialize high-water mark table"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS high_water_marks (
+                name TEXT PRIMARY KEY,
+                block_date TEXT,
+                block_hash TEXT,
+                updated_at TEXT
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def load_high_water(self):
+        """Load the persisted high-water mark for this ingest path"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT block_date, block_hash FROM high_water_marks WHERE name = ?', (self.name,))
+        row = cursor.fetchone()
+        conn.close()
+
+        if row:
+            self._set_high_water(row[0])
+            if row[1]:
+                self.seen[row[1]] = row[0]
+
+    def _set_high_water(self, date):
+        self.high_water = date
+        self.skip_before = _shift_date(date, -self.safety_margin)
+
+    def is_new(self, block_hash, date=None):
+        """Check if a block still needs processing
+
+        Decided by the hash LRU; only blocks dated more than safety_margin
+        before the high-water mark are assumed to be covered by earlier polls
+        (they may have been evicted from the LRU or predate a restart).
+        """
+        with self.lock:
+            if block_hash in self.seen:
+                self.seen.move_to_end(block_hash)
+                self.hits += 1
+                return False
+            if date and self.skip_before and date < self.skip_before:
+                self.hits += 1
+                return False
+            self.misses += 1
+            return True
+
+    def mark_seen(self, block_hash, date=None):
+        """Remember a processed block (evicting the oldest when full)"""
+        if not block_hash:
+            return
+        with self.lock:
+            self.seen[block_hash] = date
+            self.seen.move_to_end(block_hash)
+            while len(self.seen) > self.capacity:
+                self.seen.popitem(last=False)
+            if date and (self.high_water is None or date > self.high_water):
+                self._set_high_water(date)
+
+    def filter_new(self, blocks):
+        """Keep only unseen raw block dicts"""
+        return [block for block in blocks
+                if isinstance(block, dict) and self.is_new(block.get('$hash'), block.get('date'))]
+
+    def mark_blocks(self, blocks):
+        """Mark a processed poll's raw block dicts as seen and persist"""
+        for block in blocks:
+            if isinstance(block, dict):
+                self.mark_seen(block.get('$hash'), block.get('date'))
+        self.commit()
+
+    def commit(self):
+        """Persist the high-water mark (call after a poll was processed)"""
+        with self.lock:
+            if self.high_water is None:
+                return
+            block_hash = next((h for h, d in reversed(self.seen.items()) if d == self.high_water), None)
+            high_water = self.high_water
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO high_water_marks (name, block_date, block_hash, updated_at)
+            VALUES (?, ?, ?, ?)
+        ''', (self.name, high_water, block_hash, datetime.now().isoformat()))
+        conn.commit()
+        conn.close()
+
+    def get_stats(self):
+        """Get cache statistics"""
+        return {
+            'name': self.name,
+            'size': len(self.seen),
+            'capacity': self.capacity,
+            'high_water': self.high_water,
+            'hits': self.hits,
+            'misses': self.misses
+        }
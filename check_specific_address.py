@@ -4,8 +4,11 @@ Check specific address for MURF token balance
 """
 
 import sqlite3
-import requests
 from datetime import datetime
+from history_stream import iter_operations
+from ledger_archive import fetch_history_page, replay_archive
+from account_index import AccountIndex
+from amount_codec import hex_to_decimal
 
 def check_address_balance(address):
     """Check if specific address has MURF token balance"""
@@ -68,80 +71,68 @@ def check_address_in_all_addresses(address):
         return False
 
 def check_address_via_api(address):
-    """Check address balance via API"""
+    """Check address balance via the account index, falling back to API"""
     print(f"Checking address via API...")
     
     try:
-        # Get recent transactions for this address
-        url = "https://rep2.main.network.api.keeta.com/api/node/ledger/history"
-        params = {'limit': 200}
-        response = requests.get(url, params=params, timeout=30)
-        
-        if response.status_code == 200:
-            data = response.json()
-            history = data.get('history', [])
-            
-            balance = 0
-            transactions = []
-            
-            for entry in history:
-                if 'voteStaple' in entry:
-                    vote_staple = entry['voteStaple']
-                    blocks = vote_staple.get('blocks', [])
-                    
-                    for block in blocks:
-                        if isinstance(block, dict):
-                            operations = block.get('operations', [])
-                            if isinstance(operations, list):
-                                for op in operations:
-                                    if isinstance(op, dict):
-                                        if op.get('token') == "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm":
-                                            from_addr = op.get('from', '')
-                                            to_addr = op.get('to', '')
-                                            
-                                            if from_addr == address or to_addr == address:
-                                                amount = hex_to_decimal(op.get('amount', '0'))
-                                                tx_type = "SEND" if from_addr == address else "RECEIVE"
-                                                
-                                                transactions.append({
-                                                    'type': tx_type,
-                                                    'amount': amount,
-                                                    'date': block.get('date', ''),
-                                                    'block_hash': block.get('$hash', '')
-                                                })
-                                                
-                                                if from_addr == address:
-                                                    balance -= amount
-                                                elif to_addr == address:
-                                                    balance += amount
+        index = AccountIndex()
+        if index.has_address(address):
+            # Indexed lookup: only this address's MURF operations
+            print(f"Using account index: {index.db_path}")
+            operations = index.get_murf_operations(address)
+        else:
+            # Get recent transactions for this address
+            url = "https://rep2.main.network.api.keeta.com/api/node/ledger/history"
+            params = {'limit': 200}
+            page = fetch_history_page(url, params, archive=replay_archive())
             
-            print(f"API Analysis Results:")
-            print(f"Total MURF transactions: {len(transactions)}")
-            print(f"Calculated balance: {max(0, balance):,} MURF")
+            if page is None:
+                return 0
             
-            if transactions:
-                print(f"\nRecent MURF transactions:")
-                for i, tx in enumerate(transactions[:5], 1):
-                    print(f"  {i}. {tx['type']}: {tx['amount']:,} MURF ({tx['date']})")
+            operations = [
+                dict(op, date=block.get('date', ''), block_hash=block.get('$hash', ''))
+                for block, op in iter_operations(page['blocks'])
+                if op.get('token') == "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm"
+            ]
+        
+        balance = 0
+        transactions = []
+        
+        for op in operations:
+            from_addr = op.get('from', '')
+            to_addr = op.get('to', '')
             
-            return max(0, balance)
-        else:
-            print(f"API Error: {response.status_code}")
-            return 0
+            if from_addr == address or to_addr == address:
+                amount = hex_to_decimal(op.get('amount', '0'))
+                tx_type = "SEND" if from_addr == address else "RECEIVE"
+                
+                transactions.append({
+                    'type': tx_type,
+                    'amount': amount,
+                    'date': op['date'],
+                    'block_hash': op['block_hash']
+                })
+                
+                if from_addr == address:
+                    balance -= amount
+                elif to_addr == address:
+                    balance += amount
+        
+        print(f"API Analysis Results:")
+        print(f"Total MURF transactions: {len(transactions)}")
+        print(f"Calculated balance: {max(0, balance):,} MURF")
+        
+        if transactions:
+            print(f"\nRecent MURF transactions:")
+            for i, tx in enumerate(transactions[:5], 1):
+                print(f"  {i}. {tx['type']}: {tx['amount']:,} MURF ({tx['date']})")
+        
+        return max(0, balance)
             
     except Exception as e:
         print(f"Error checking via API: {e}")
         return 0
 
-def hex_to_decimal(hex_str):
-    """Convert hexadecimal string to decimal integer."""
-    try:
-        if hex_str.startswith('0x'):
-            return int(hex_str, 16)
-        return int(hex_str)
-    except:
-        return 0
-
 def main():
     address = "keeta_aab4nfsiygnkaypqbwjp422xl4m4hsljz3bnq4unpfzs4blhyfr5ca2lsr3jeay"
     
@@ -5,10 +5,14 @@ Membersihkan database dan membuat data yang konsisten
 """
 
 import sqlite3
-import json
 from datetime import datetime, timedelta
 import random
 
+from keeta_monitor import KeetaMonitor, encode_payload
+
+# JSON mentah (raw_operation / related_operations) disimpan di trade_payloads, bukan di trades
+PAYLOAD_INSERT = 'INSERT INTO trade_payloads (trade_id, payload) VALUES (?, ?)'
+
 def clean_database():
     """Bersihkan database dan buat data yang konsisten"""
     print("🧹 Cleaning MURF Token Database...")
@@ -19,46 +23,17 @@ def clean_database():
     # Drop dan recreate tables
     cursor.execute('DROP TABLE IF EXISTS trades')
     cursor.execute('DROP TABLE IF EXISTS price_history')
+    cursor.execute('DROP TABLE IF EXISTS trade_payloads')
+    cursor.execute('DROP TABLE IF EXISTS trade_minutes')
+    cursor.execute('PRAGMA user_version = 0')
+    conn.commit()
+    conn.close()
     
-    # Create new tables
-    cursor.execute('''
-        CREATE TABLE trades (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            block_hash TEXT,
-            from_address TEXT,
-            to_address TEXT,
-            token_id TEXT,
-            amount_hex TEXT,
-            amount_decimal REAL,
-            price_usd REAL,
-            trade_type TEXT,
-            operation_type INTEGER,
-            is_otc BOOLEAN DEFAULT 0,
-            otc_from_address TEXT,
-            otc_exact BOOLEAN DEFAULT 0,
-            otc_type TEXT,
-            trade_pair TEXT,
-            settlement_time TEXT,
-            network TEXT,
-            signer TEXT,
-            exchange_ratio REAL,
-            counterpart_amount REAL,
-            counterpart_token TEXT,
-            related_operations TEXT,
-            raw_operation TEXT
-        )
-    ''')
+    # Create new tables: schema + migrasi yang sama dengan KeetaMonitor (trade_payloads, op_index, trade_minutes)
+    KeetaMonitor("keeta_trades.db")
     
-    cursor.execute('''
-        CREATE TABLE price_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            token_id TEXT,
-            price REAL,
-            volume REAL
-        )
-    ''')
+    conn = sqlite3.connect("keeta_trades.db")
+    cursor = conn.cursor()
     
     # Token IDs
     murf_token = "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm"
@@ -85,9 +60,8 @@ def clean_database():
                 timestamp, block_hash, from_address, to_address, token_id,
                 amount_hex, amount_decimal, trade_type, operation_type, is_otc,
                 otc_from_address, otc_exact, otc_type, trade_pair, settlement_time,
-                network, signer, exchange_ratio, counterpart_amount, counterpart_token,
-                related_operations, raw_operation
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                network, signer, exchange_ratio, counterpart_amount, counterpart_token
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             trade_time.isoformat(),
             f"block_{i:06x}",
@@ -108,10 +82,9 @@ def clean_database():
             f"keeta_signer_{i:03d}",
             kta_to_murf_rate,
             kta_amount,
-            kta_token,
-            json.dumps([]),
-            json.dumps({})
+            kta_token
         ))
+        cursor.execute(PAYLOAD_INSERT, (cursor.lastrowid, encode_payload({}, [])))
         
         # KTA trade (counterpart)
         cursor.execute('''
@@ -119,9 +92,8 @@ def clean_database():
                 timestamp, block_hash, from_address, to_address, token_id,
                 amount_hex, amount_decimal, trade_type, operation_type, is_otc,
                 otc_from_address, otc_exact, otc_type, trade_pair, settlement_time,
-                network, signer, exchange_ratio, counterpart_amount, counterpart_token,
-                related_operations, raw_operation
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                network, signer, exchange_ratio, counterpart_amount, counterpart_token
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             trade_time.isoformat(),
             f"block_{i:06x}",
@@ -142,10 +114,9 @@ def clean_database():
             f"keeta_signer_{i:03d}",
             0,
             0,
-            "",
-            json.dumps([]),
-            json.dumps({})
+            ""
         ))
+        cursor.execute(PAYLOAD_INSERT, (cursor.lastrowid, encode_payload({}, [])))
     
     # Generate regular MURF trades
     for i in range(20):
@@ -159,9 +130,8 @@ def clean_database():
                 timestamp, block_hash, from_address, to_address, token_id,
                 amount_hex, amount_decimal, trade_type, operation_type, is_otc,
                 otc_from_address, otc_exact, otc_type, trade_pair, settlement_time,
-                network, signer, exchange_ratio, counterpart_amount, counterpart_token,
-                related_operations, raw_operation
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                network, signer, exchange_ratio, counterpart_amount, counterpart_token
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             trade_time.isoformat(),
             f"block_{i:06x}",
@@ -182,10 +152,9 @@ def clean_database():
             f"keeta_signer_{i:03d}",
             0,
             0,
-            "",
-            json.dumps([]),
-            json.dumps({})
+            ""
         ))
+        cursor.execute(PAYLOAD_INSERT, (cursor.lastrowid, encode_payload({}, [])))
     
     # Generate price history yang konsisten
     base_price = 0.00000263  # $0.00000263 per MURF (sesuai gambar)
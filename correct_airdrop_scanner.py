@@ -6,12 +6,7 @@ Correct Airdrop Scanner - Find MURF recipients (Type 0 RECEIVE operations)
 import requests
 import json
 from datetime import datetime
-
-def hex_to_decimal(hex_str):
-    """Convert hexadecimal string to decimal integer."""
-    if hex_str.startswith('0x'):
-        return int(hex_str, 16)
-    return int(hex_str)
+from amount_codec import hex_to_decimal
 
 def main():
     airdrop_wallet = "keeta_aablrt5p4in4mehyxxunow3kp4c7rs2v4mh6v4z6qtfnt7sw5cxtw4r3b5oxtwi"
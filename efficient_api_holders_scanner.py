@@ -10,6 +10,8 @@ import time
 import json
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from amount_codec import decode_hex
+from holder_store import HolderStore
 
 class EfficientAPIHoldersScanner:
     def __init__(self):
@@ -20,10 +22,7 @@ class EfficientAPIHoldersScanner:
         
     def hex_to_decimal(self, hex_str):
         """Convert hex string to decimal"""
-        try:
-            return int(hex_str, 16)
-        except:
-            return 0
+        return decode_hex(hex_str)
     
     def get_current_balance(self, address):
         """Get current MURF balance for an address"""
@@ -188,37 +187,22 @@ class EfficientAPIHoldersScanner:
         print("COMPARISON: Old vs Real-Time Data")
         print("=" * 60)
         
-        # Get old data
-        conn_old = sqlite3.connect(self.holders_db)
-        cursor_old = conn_old.cursor()
-        cursor_old.execute('SELECT address, current_balance FROM murf_holders ORDER BY current_balance DESC LIMIT 10')
-        old_data = {row[0]: row[1] for row in cursor_old.fetchall()}
-        conn_old.close()
-        
-        # Get real-time data
-        conn_new = sqlite3.connect(self.real_time_db)
-        cursor_new = conn_new.cursor()
-        cursor_new.execute('SELECT address, current_balance FROM real_time_holders ORDER BY current_balance DESC LIMIT 10')
-        new_data = {row[0]: row[1] for row in cursor_new.fetchall()}
-        conn_new.close()
+        # Join both sources in the holder store snapshot (files re-imported only when changed)
+        store = HolderStore()
+        store.import_legacy('murf_holders', self.holders_db)
+        store.import_legacy('real_time', self.real_time_db)
+        comparison = store.compare_sources('murf_holders', 'real_time', limit=10)
         
         print("Top 10 Holders Comparison:")
         print("-" * 90)
         print(f"{'Rank':<4} {'Address':<50} {'Old Balance':<15} {'New Balance':<15} {'Change':<10}")
         print("-" * 90)
         
-        for i, address in enumerate(list(new_data.keys())[:10], 1):
-            old_balance = old_data.get(address, 0)
-            new_balance = new_data.get(address, 0)
-            change = new_balance - old_balance
-            
-            print(f"{i:<4} {address[:50]:<50} {old_balance:<15,} {new_balance:<15,} {change:+,}")
+        for i, row in enumerate(comparison, 1):
+            print(f"{i:<4} {row['address'][:50]:<50} {row['old_balance']:<15,} {row['new_balance']:<15,} {row['change']:+,}")
         
         # Find holders who sold all tokens
-        sold_all = []
-        for address in old_data:
-            if address not in new_data or new_data[address] == 0:
-                sold_all.append((address, old_data[address]))
+        sold_all = store.get_exited_holders('murf_holders', 'real_time')
         
         if sold_all:
             print(f"\nHolders who sold all MURF ({len(sold_all)}):")
@@ -5,18 +5,26 @@ Memperbaiki nilai yang terlalu besar dan menghitung ulang exchange rate
 """
 
 import sqlite3
-import json
 from datetime import datetime, timedelta
 import random
 
+from keeta_monitor import KeetaMonitor, encode_payload
+
+# JSON mentah (raw_operation / related_operations) disimpan di trade_payloads, bukan di trades
+PAYLOAD_INSERT = 'INSERT INTO trade_payloads (trade_id, payload) VALUES (?, ?)'
+
 def fix_database():
     """Perbaiki database dengan nilai yang lebih realistis"""
     print("🔧 Fixing MURF Token Database...")
     
+    # Schema + migrasi yang sama dengan KeetaMonitor (trade_payloads, op_index, trade_minutes)
+    KeetaMonitor("keeta_trades.db")
+    
     conn = sqlite3.connect("keeta_trades.db")
     cursor = conn.cursor()
     
     # Clear existing data
+    cursor.execute('DELETE FROM trade_payloads')
     cursor.execute('DELETE FROM trades')
     cursor.execute('DELETE FROM price_history')
     
@@ -45,9 +53,8 @@ def fix_database():
                     timestamp, block_hash, from_address, to_address, token_id,
                     amount_hex, amount_decimal, trade_type, operation_type, is_otc,
                     otc_from_address, otc_exact, otc_type, trade_pair, settlement_time,
-                    network, signer, exchange_ratio, counterpart_amount, counterpart_token,
-                    related_operations, raw_operation
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    network, signer, exchange_ratio, counterpart_amount, counterpart_token
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 trade_time.isoformat(),
                 f"block_{i:06x}",
@@ -68,10 +75,9 @@ def fix_database():
                 f"keeta_signer_{i:03d}",
                 kta_to_murf_rate,
                 kta_amount,
-                kta_token,
-                json.dumps([]),
-                json.dumps({})
+                kta_token
             ))
+            cursor.execute(PAYLOAD_INSERT, (cursor.lastrowid, encode_payload({}, [])))
             
             # KTA trade (counterpart)
             cursor.execute('''
@@ -79,9 +85,8 @@ def fix_database():
                     timestamp, block_hash, from_address, to_address, token_id,
                     amount_hex, amount_decimal, trade_type, operation_type, is_otc,
                     otc_from_address, otc_exact, otc_type, trade_pair, settlement_time,
-                    network, signer, exchange_ratio, counterpart_amount, counterpart_token,
-                    related_operations, raw_operation
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    network, signer, exchange_ratio, counterpart_amount, counterpart_token
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 trade_time.isoformat(),
                 f"block_{i:06x}",
@@ -102,10 +107,9 @@ def fix_database():
                 f"keeta_signer_{i:03d}",
                 0,
                 0,
-                "",
-                json.dumps([]),
-                json.dumps({})
+                ""
             ))
+            cursor.execute(PAYLOAD_INSERT, (cursor.lastrowid, encode_payload({}, [])))
             
         else:  # Regular trades
             # Regular MURF transfer
@@ -116,9 +120,8 @@ def fix_database():
                     timestamp, block_hash, from_address, to_address, token_id,
                     amount_hex, amount_decimal, trade_type, operation_type, is_otc,
                     otc_from_address, otc_exact, otc_type, trade_pair, settlement_time,
-                    network, signer, exchange_ratio, counterpart_amount, counterpart_token,
-                    related_operations, raw_operation
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    network, signer, exchange_ratio, counterpart_amount, counterpart_token
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 trade_time.isoformat(),
                 f"block_{i:06x}",
@@ -139,10 +142,9 @@ def fix_database():
                 f"keeta_signer_{i:03d}",
                 0,
                 0,
-                "",
-                json.dumps([]),
-                json.dumps({})
+                ""
             ))
+            cursor.execute(PAYLOAD_INSERT, (cursor.lastrowid, encode_payload({}, [])))
     
     # Generate price history dengan nilai yang realistis
     base_price = 0.00000263  # $0.00000263 per MURF
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+History Stream - Selective decoding of Keeta ledger history pages
+Only the block fields the analyzers need are kept, the rest of the page is skipped
+"""
+
+import json
+
+try:
+    import ijson  # Streaming parser (optional)
+except ImportError:
+    ijson = None
+
+try:
+    import orjson  # Faster full decoder (optional)
+except ImportError:
+    orjson = None
+
+# Fields used by the OTC / holder analyzers
+BLOCK_FIELDS = ('$hash', 'account', 'date', 'operations')
+
+# Address scanners also collect the block signer
+ADDRESS_BLOCK_FIELDS = BLOCK_FIELDS + ('signer',)
+
+# KeetaMonitor also stores network and signer for OTC trades
+MONITOR_BLOCK_FIELDS = BLOCK_FIELDS + ('network', 'signer')
+
+HISTORY_ENTRY_PREFIX = 'history.item'
+HISTORY_BLOCKS_PREFIX = 'history.item.voteStaple.blocks.item'
+ROOT_BLOCKS_PREFIX = 'blocks.item'
+
+
+def loads(raw):
+    """Decode JSON bytes/str, using orjson when installed"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def slim_block(block, fields=BLOCK_FIELDS):
+    """Keep only the wanted fields of a block"""
+    return {key: block[key] for key in fields if key in block}
+
+
+def extract_blocks(data, fields=BLOCK_FIELDS):
+    """Extract slim blocks from an already decoded history page"""
+    if not isinstance(data, dict):
+        return []
+
+    # New API structure (blocks directly in root)
+    if 'blocks' in data:
+        return [slim_block(block, fields) for block in data['blocks'] if isinstance(block, dict)]
+
+    blocks = []
+    for entry in data.get('history', []):
+        vote_staple = entry.get('voteStaple') if isinstance(entry, dict) else None
+        if not vote_staple:
+            continue
+        for block in vote_staple.get('blocks', []):
+            if isinstance(block, dict):
+                blocks.append(slim_block(block, fields))
+    return blocks
+
+
+def count_entries(data):
+    """Number of history entries in a decoded page (blocks for the root-blocks structure)"""
+    if not isinstance(data, dict):
+        return 0
+    if 'blocks' in data:
+        return len(data['blocks'])
+    return len(data.get('history', []))
+
+
+def _stream_blocks(fp, fields, page):
+    """Build slim blocks from ijson events, skipping unwanted subtrees"""
+    wanted = set(fields)
+    block = None
+    block_prefix = None
+    builder = None
+    builder_key = None
+    builder_prefix = None
+
+    for prefix, event, value in ijson.parse(fp, use_float=True):
+        if builder is not None:
+            if prefix == builder_prefix and event in ('end_map', 'end_array'):
+                builder.event(event, value)
+                block[builder_key] = builder.value
+                builder = None
+            else:
+                builder.event(event, value)
+            continue
+
+        if block is None:
+            if event == 'start_map' and prefix in (HISTORY_BLOCKS_PREFIX, ROOT_BLOCKS_PREFIX):
+                block = {}
+                block_prefix = prefix
+                if prefix == ROOT_BLOCKS_PREFIX:
+                    page['entries'] += 1
+            elif event == 'start_map' and prefix == HISTORY_ENTRY_PREFIX:
+                page['entries'] += 1
+            elif prefix == 'nextKey' and event in ('string', 'number'):
+                page['nextKey'] = value
+            continue
+
+        if prefix == block_prefix and event == 'end_map':
+            yield block
+            block = None
+            continue
+
+        parent, _, key = prefix.rpartition('.')
+        if parent != block_prefix or key not in wanted:
+            continue
+
+        if event in ('start_map', 'start_array'):
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            builder_key = key
+            builder_prefix = prefix
+        elif event not in ('map_key', 'end_map', 'end_array'):
+            block[key] = value
+
+
+def read_history_page(source, fields=BLOCK_FIELDS):
+    """Read a history response into {'blocks': [...], 'nextKey': ..., 'entries': ...}
+
+    source can be a requests Response (ideally fetched with stream=True),
+    a urllib response / file object, or raw bytes. entries is the number of
+    history entries (vote staples) the page held; one entry can hold several blocks.
+    """
+    page = {'blocks': [], 'nextKey': None, 'entries': 0}
+
+    if isinstance(source, (bytes, str)):
+        data = loads(source)
+        page['blocks'] = extract_blocks(data, fields)
+        page['entries'] = count_entries(data)
+        page['nextKey'] = data.get('nextKey') if isinstance(data, dict) else None
+        return page
+
+    # requests.Response exposes the socket stream as .raw
+    fp = getattr(source, 'raw', None)
+    if fp is not None:
+        fp.decode_content = True
+    else:
+        fp = source
+
+    if ijson is not None:
+        page['blocks'] = list(_stream_blocks(fp, fields, page))
+        return page
+
+    raw = source.content if hasattr(source, 'content') else fp.read()
+    data = loads(raw)
+    page['blocks'] = extract_blocks(data, fields)
+    page['entries'] = count_entries(data)
+    page['nextKey'] = data.get('nextKey') if isinstance(data, dict) else None
+    return page
+
+
+def iter_operations(blocks):
+    """Yield (block, operation) pairs from slim blocks"""
+    for block in blocks:
+        operations = block.get('operations', [])
+        if not isinstance(operations, list):
+            continue
+        for op in operations:
+            if isinstance(op, dict):
+                yield block, op
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Holder Analytics - MURF balance distribution statistics
+Percentiles, Gini coefficient, top-10/100 concentration and log-scale
+histogram buckets, computed with NumPy over the whole holder set and cached
+per holder-set version (leaderboard version or holder store source marker).
+"""
+
+import threading
+
+try:
+    import numpy as np  # Optional (analytics only)
+except ImportError:
+    np = None
+
+from holder_leaderboard import get_leaderboard, HOLDERS_DB
+
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+CONCENTRATION_TOP = (10, 100)
+
+
+def numpy_available():
+    return np is not None
+
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is required for holder analytics (pip install numpy)")
+
+
+def gini(sorted_balances):
+    """Gini coefficient of balances sorted ascending (0 = equal, 1 = one holder has all)"""
+    n = len(sorted_balances)
+    total = sorted_balances.sum()
+    if n == 0 or total <= 0:
+        return 0.0
+    ranks = np.arange(1, n + 1, dtype=np.float64)
+    return float(2.0 * (ranks * sorted_balances).sum() / (n * total) - (n + 1.0) / n)
+
+
+def log_buckets(balances):
+    """Holders and balance per power-of-ten bucket ([1, 10), [10, 100), ...)"""
+    if len(balances) == 0:
+        return []
+    exponents = np.floor(np.log10(balances)).astype(np.int64)
+    low = int(exponents.min())
+    counts = np.bincount(exponents - low)
+    sums = np.bincount(exponents - low, weights=balances)
+    total = balances.sum()
+
+    buckets = []
+    for offset, count in enumerate(counts):
+        exponent = low + offset
+        buckets.append({
+            'min_balance': 10 ** exponent,
+            'max_balance': 10 ** (exponent + 1),
+            'holders': int(count),
+            'balance': float(sums[offset]),
+            'balance_share': float(sums[offset] / total) if total > 0 else 0.0
+        })
+    return buckets
+
+
+def analyze_balances(balances):
+    """Distribution statistics of a list of positive holder balances"""
+    require_numpy()
+    values = np.sort(np.asarray([b for b in balances if b and b > 0], dtype=np.float64))
+    n = len(values)
+    total = float(values.sum())
+
+    if n == 0:
+        return {
+            'holders': 0,
+            'total_balance': 0,
+            'mean_balance': 0.0,
+            'percentiles': {f'p{p}': 0.0 for p in PERCENTILES},
+            'gini': 0.0,
+            'concentration': {f'top_{k}': 0.0 for k in CONCENTRATION_TOP},
+            'buckets': []
+        }
+
+    percentiles = np.percentile(values, PERCENTILES)
+    descending_cumsum = np.cumsum(values[::-1])
+
+    return {
+        'holders': n,
+        'total_balance': total,
+        'mean_balance': total / n,
+        'percentiles': {f'p{p}': float(v) for p, v in zip(PERCENTILES, percentiles)},
+        'gini': gini(values),
+        'concentration': {
+            f'top_{k}': float(descending_cumsum[min(k, n) - 1] / total) if total > 0 else 0.0
+            for k in CONCENTRATION_TOP
+        },
+        'buckets': log_buckets(values)
+    }
+
+
+class HolderAnalytics:
+    """Distribution analytics cached per holder-set version"""
+
+    def __init__(self, holders_db_path=HOLDERS_DB, store=None):
+        self.leaderboard = get_leaderboard(holders_db_path)
+        self.store = store
+        self.cache = {}
+        self.lock = threading.Lock()
+        self.computed = 0
+
+    def _cached(self, key, version, load_balances):
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry and entry[0] == version:
+                return entry[1]
+
+        result = analyze_balances(load_balances())
+        result['version'] = version if isinstance(version, int) else list(version)
+        with self.lock:
+            self.cache[key] = (version, result)
+            self.computed += 1
+        return result
+
+    def get_distribution(self, source=None):
+        """Analytics of the live holder set, or of a holder store source"""
+        if source is None:
+            with self.lock:
+                entry = self.cache.get('leaderboard')
+                if entry and entry[0] == self.leaderboard.get_version():
+                    return entry[1]
+            version, balances = self.leaderboard.get_balances()
+            return self._cached('leaderboard', version, lambda: balances)
+
+        if self.store is None:
+            from holder_store import HolderStore
+            self.store = HolderStore()
+        version = tuple(self.store.get_source_version(source))
+        return self._cached(('store', source), version, lambda: self.store.get_balances(source))
+
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_holder_analytics():
+    """Shared analytics instance (the dashboard handler is created per request)"""
+    global _analytics
+    with _analytics_lock:
+        if _analytics is None:
+            _analytics = HolderAnalytics()
+        return _analytics
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Holder Export - Streaming MURF holders export
+Rows are read from murf_holders in fetchmany() chunks and encoded chunk by
+chunk (CSV, NDJSON, gzipped CSV/NDJSON or Parquet), so neither the table nor the output is
+ever held in memory. Incremental mode exports only holders whose balance
+changed since the previous export of the same name, plus a deleted=true row
+for every holder removed since then.
+"""
+
+import csv
+import io
+import json
+import sqlite3
+import zlib
+from datetime import datetime
+
+try:
+    import pyarrow as pa  # Optional (Parquet export only)
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from murf_holders_db import MURFHoldersDB
+
+HOLDERS_DB = "murf_holders.db"
+CHUNK_SIZE = 1000
+
+COLUMNS = ('rank', 'address', 'current_balance', 'total_received', 'total_sent',
+           'tx_count', 'first_tx_date', 'last_tx_date', 'updated_at', 'deleted')
+CSV_HEADER = ['Rank', 'Address', 'Current_Balance', 'Total_Received',
+              'Total_Sent', 'TX_Count', 'First_TX_Date', 'Last_TX_Date', 'Updated_At', 'Deleted']
+
+FORMATS = {
+    'csv': ('text/csv', None, '.csv'),
+    'csv.gz': ('text/csv', 'gzip', '.csv.gz'),
+    'ndjson': ('application/x-ndjson', None, '.ndjson'),
+    'ndjson.gz': ('application/x-ndjson', 'gzip', '.ndjson.gz'),
+    'parquet': ('application/vnd.apache.parquet', None, '.parquet')
+}
+
+
+def iter_holder_chunks(db_path=HOLDERS_DB, since=None, chunk_size=CHUNK_SIZE):
+    """Yield lists of holder rows (COLUMNS order), largest balance first
+
+    With `since`, only holders changed after it, followed by tombstone rows
+    (deleted=True, updated_at = deletion time) for holders removed after it.
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    query = f'SELECT {", ".join(COLUMNS[:-1])}, 0 FROM murf_holders'
+    try:
+        if since:
+            cursor.execute(query + ''' WHERE updated_at > ?
+                UNION ALL
+                SELECT NULL, address, NULL, NULL, NULL, NULL, NULL, NULL, deleted_at, 1
+                FROM murf_holder_tombstones WHERE deleted_at > ?
+                ORDER BY 10, 3 DESC
+            ''', (since, since))
+        else:
+            cursor.execute(query + ' ORDER BY current_balance DESC')
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [row[:-1] + (bool(row[-1]),) for row in rows]
+    finally:
+        conn.close()
+
+
+def gzip_stream(chunks):
+    """Gzip-compress a stream of byte chunks"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def csv_stream(row_chunks):
+    """Encode row chunks as CSV bytes (header first)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    for rows in row_chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_stream(row_chunks):
+    """Encode row chunks as newline-delimited JSON bytes"""
+    for rows in row_chunks:
+        yield ''.join(json.dumps(dict(zip(COLUMNS, row))) + '\n' for row in rows).encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object collecting bytes until drained (for Parquet)"""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def parquet_stream(row_chunks):
+    """Encode row chunks as one Parquet file, one row group per chunk"""
+    if pq is None:
+        raise RuntimeError("pyarrow is required for Parquet export (pip install pyarrow)")
+    schema = pa.schema([
+        ('rank', pa.int64()), ('address', pa.string()), ('current_balance', pa.int64()),
+        ('total_received', pa.int64()), ('total_sent', pa.int64()), ('tx_count', pa.int64()),
+        ('first_tx_date', pa.string()), ('last_tx_date', pa.string()), ('updated_at', pa.string()),
+        ('deleted', pa.bool_())
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    for rows in row_chunks:
+        columns = list(zip(*rows))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+def encode_stream(row_chunks, fmt):
+    """Byte stream of row chunks in an export format"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (choose from {', '.join(FORMATS)})")
+    if fmt == 'parquet':
+        return parquet_stream(row_chunks)
+    stream = csv_stream(row_chunks) if fmt.startswith('csv') else ndjson_stream(row_chunks)
+    return gzip_stream(stream) if FORMATS[fmt][1] == 'gzip' else stream
+
+
+class HolderExporter:
+    def __init__(self, db_path=HOLDERS_DB):
+        self.db_path = db_path
+        MURFHoldersDB(db_path)  # ensures updated_at change tracking exists
+        self.init_state()
+
+    def init_state(self):
+        """Initialize export bookkeeping table"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS holder_exports (
+                name TEXT PRIMARY KEY,
+                last_exported_at TEXT,
+                rows INTEGER
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def get_last_export(self, name):
+        """Timestamp of the last completed export with this name (None if never)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT last_exported_at FROM holder_exports WHERE name = ?', (name,))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def _mark_exported(self, name, started_at, rows):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO holder_exports (name, last_exported_at, rows) VALUES (?, ?, ?)
+        ''', (name, started_at, rows))
+        conn.commit()
+        conn.close()
+
+    def _now(self):
+        # Same clock and format as the updated_at triggers
+        conn = sqlite3.connect(self.db_path)
+        now = conn.execute("SELECT strftime('%Y-%m-%dT%H:%M:%f', 'now')").fetchone()[0]
+        conn.close()
+        return now
+
+    def stream(self, fmt='csv.gz', incremental=False, name='default', since=None, chunk_size=CHUNK_SIZE):
+        """Yield the export as byte chunks
+
+        incremental=True exports rows changed since the last export of `name`
+        and records this export once the stream is fully consumed.
+        """
+        started_at = self._now()
+        if incremental and since is None:
+            since = self.get_last_export(name)
+        counted = {'rows': 0}
+
+        def counted_chunks():
+            for rows in iter_holder_chunks(self.db_path, since, chunk_size):
+                counted['rows'] += len(rows)
+                yield rows
+
+        for data in encode_stream(counted_chunks(), fmt):
+            yield data
+
+        if incremental:
+            self._mark_exported(name, started_at, counted['rows'])
+        print(f"[EXPORT] {counted['rows']} holders exported as {fmt}"
+              f"{f' (changed since {since})' if since else ''}")
+
+    def export_to_file(self, fmt='csv.gz', path=None, incremental=False, name='default'):
+        """Stream an export into a file, return the file name"""
+        path = path or f'murf_holders_{datetime.now().strftime("%Y%m%d_%H%M%S")}{FORMATS[fmt][2]}'
+        with open(path, 'wb') as f:
+            for data in self.stream(fmt, incremental=incremental, name=name):
+                f.write(data)
+        print(f"[EXPORT] Written to {path}")
+        return path
+
+
+def main():
+    import sys
+    fmt = sys.argv[1] if len(sys.argv) > 1 else 'csv.gz'
+    incremental = '--incremental' in sys.argv
+    HolderExporter().export_to_file(fmt, incremental=incremental)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Holder Leaderboard - In-memory MURF holder ranking and running totals
+Holders with a positive balance are kept in a list sorted by balance, and
+holder count / circulation / airdropped totals are adjusted on every balance
+update, so leaderboard and statistics reads never touch SQLite. Writers in
+this process push their updates; writes from other processes are picked up
+by reloading when the database file changes.
+"""
+
+import bisect
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+HOLDERS_DB = "murf_holders.db"
+
+
+class HolderLeaderboard:
+    def __init__(self, db_path=HOLDERS_DB):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self.records = {}   # address -> {'current_balance', 'total_received', 'tx_count', 'is_airdrop_recipient'}
+        self.order = []     # (-balance, address) of holders with balance > 0, sorted
+        self.total_holders = 0
+        self.total_circulation = 0
+        self.total_airdropped = 0
+        self.version = 0
+        self.synced_mtime = None
+        self.last_updated = None
+
+    def _db_mtime(self):
+        try:
+            return os.stat(self.db_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _remove(self, address):
+        record = self.records.pop(address, None)
+        if record is None or record['current_balance'] <= 0:
+            return record
+        key = (-record['current_balance'], address)
+        position = bisect.bisect_left(self.order, key)
+        if position < len(self.order) and self.order[position] == key:
+            del self.order[position]
+        self.total_holders -= 1
+        self.total_circulation -= record['current_balance']
+        if record['is_airdrop_recipient']:
+            self.total_airdropped -= 1
+        return record
+
+    def _insert(self, address, record):
+        self.records[address] = record
+        if record['current_balance'] <= 0:
+            return
+        bisect.insort(self.order, (-record['current_balance'], address))
+        self.total_holders += 1
+        self.total_circulation += record['current_balance']
+        if record['is_airdrop_recipient']:
+            self.total_airdropped += 1
+
+    def reload(self):
+        """Rebuild from murf_holders (one full read)"""
+        with self.lock:
+            mtime = self._db_mtime()
+            rows = []
+            if mtime is not None:
+                conn = sqlite3.connect(self.db_path)
+                cursor = conn.cursor()
+                try:
+                    cursor.execute('''
+                        SELECT address, current_balance, total_received, tx_count, is_airdrop_recipient
+                        FROM murf_holders
+                    ''')
+                    rows = cursor.fetchall()
+                except sqlite3.OperationalError:
+                    rows = []
+                finally:
+                    conn.close()
+
+            self.records = {}
+            self.order = []
+            self.total_holders = 0
+            self.total_circulation = 0
+            self.total_airdropped = 0
+            for address, balance, total_received, tx_count, is_airdrop in rows:
+                self._insert(address, {
+                    'current_balance': balance or 0,
+                    'total_received': total_received,
+                    'tx_count': tx_count,
+                    'is_airdrop_recipient': bool(is_airdrop)
+                })
+
+            self.synced_mtime = mtime
+            self.version += 1
+            self.last_updated = datetime.now().isoformat()
+
+    def ensure_fresh(self):
+        """Reload if the database was changed by someone who did not push updates"""
+        if self.synced_mtime is None or self._db_mtime() != self.synced_mtime:
+            self.reload()
+
+    def update_many(self, holders):
+        """Apply holder updates already written to murf_holders
+
+        Each holder needs 'address' and 'current_balance'; other fields keep
+        their previous value when missing.
+        """
+        with self.lock:
+            if self.synced_mtime is None:
+                self.reload()
+                return
+            for holder in holders:
+                address = holder['address']
+                previous = self._remove(address) or {
+                    'current_balance': 0, 'total_received': None, 'tx_count': None, 'is_airdrop_recipient': False
+                }
+                self._insert(address, {
+                    'current_balance': holder.get('current_balance') or 0,
+                    'total_received': holder.get('total_received', previous['total_received']),
+                    'tx_count': holder.get('tx_count', previous['tx_count']),
+                    'is_airdrop_recipient': bool(holder.get('is_airdrop_recipient', previous['is_airdrop_recipient']))
+                })
+            self.synced_mtime = self._db_mtime()
+            self.version += 1
+            self.last_updated = datetime.now().isoformat()
+
+    def update(self, address, current_balance, **fields):
+        """Apply one holder update"""
+        self.update_many([dict(fields, address=address, current_balance=current_balance)])
+
+    def get_top_holders(self, limit=20):
+        """Top holders by balance, same shape as MURFHoldersDB.get_top_holders"""
+        with self.lock:
+            self.ensure_fresh()
+            holders = []
+            for rank, (_, address) in enumerate(self.order[:limit], 1):
+                record = self.records[address]
+                holders.append({
+                    'address': address,
+                    'total_received': record['total_received'],
+                    'current_balance': record['current_balance'],
+                    'tx_count': record['tx_count'],
+                    'rank': rank
+                })
+            return holders
+
+    def get_holder_statistics(self):
+        """Running totals, same shape as MURFHoldersDB.get_holder_statistics (plus version)"""
+        with self.lock:
+            self.ensure_fresh()
+            return {
+                'total_holders': self.total_holders,
+                'total_circulation': self.total_circulation,
+                'total_airdropped': self.total_airdropped,
+                'last_updated': self.last_updated,
+                'version': self.version
+            }
+
+    def get_balances(self):
+        """(version, balances of all holders with balance > 0, largest first)"""
+        with self.lock:
+            self.ensure_fresh()
+            return self.version, [-negative for negative, _ in self.order]
+
+    def get_version(self):
+        """Version number, bumped on every change (for response caching)"""
+        with self.lock:
+            self.ensure_fresh()
+            return self.version
+
+
+_leaderboards = {}
+_leaderboards_lock = threading.Lock()
+
+
+def get_leaderboard(db_path=HOLDERS_DB):
+    """Shared leaderboard for a holders database"""
+    key = os.path.abspath(db_path)
+    with _leaderboards_lock:
+        if key not in _leaderboards:
+            _leaderboards[key] = HolderLeaderboard(db_path)
+        return _leaderboards[key]
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Holder Reconciler - Sampled verification of holder balances against the API
+Instead of polling every holder each hour, a run checks the addresses with
+recent ledger activity, the top-N holders and a random sample of the long
+tail, and records how often stored balances drifted from the API.
+"""
+
+import random
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from balance_ledger import BalanceLedger
+from holder_leaderboard import get_leaderboard
+
+RECONCILE_DB = "holder_reconciliation.db"
+HOLDERS_DB = "murf_holders.db"
+
+
+class HolderReconciler:
+    def __init__(self, fetch_balances, ledger=None, holders_db_path=HOLDERS_DB,
+                 db_path=RECONCILE_DB, top_n=50, sample_rate=0.05, recent_window=timedelta(hours=1)):
+        # fetch_balances(addresses) -> [{'address': ..., 'current_balance': ...}]
+        self.fetch_balances = fetch_balances
+        self.ledger = ledger or BalanceLedger()
+        self.holders_db_path = holders_db_path
+        self.db_path = db_path
+        self.top_n = top_n
+        self.sample_rate = sample_rate
+        self.recent_window = recent_window
+        self.init_database()
+
+    def init_database(self):
+        """Initialize reconciliation database"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reconciliation_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at TEXT NOT NULL,
+                total_holders INTEGER,
+                recent_checked INTEGER,
+                top_checked INTEGER,
+                sampled INTEGER,
+                failed INTEGER,
+                drifted INTEGER,
+                sample_drifted INTEGER,
+                drift_amount INTEGER,
+                estimated_tail_drift REAL,
+                elapsed REAL
+            )
+        ''')
+
+        # One row per address whose stored balance differed from the API
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS balance_drift (
+                run_id INTEGER NOT NULL,
+                address TEXT NOT NULL,
+                reason TEXT,
+                stored_balance INTEGER,
+                ledger_balance INTEGER,
+                api_balance INTEGER,
+                PRIMARY KEY (run_id, address)
+            )
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    def get_last_run_time(self):
+        """Start time of the previous run (None if never run)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT started_at FROM reconciliation_runs ORDER BY id DESC LIMIT 1')
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def get_stored_balances(self):
+        """Current balances in murf_holders (largest first)"""
+        conn = sqlite3.connect(self.holders_db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT address, current_balance FROM murf_holders ORDER BY current_balance DESC')
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    def select_addresses(self, stored):
+        """Pick the addresses to verify: {address: reason}"""
+        since = self.get_last_run_time()
+        if since is None:
+            since = (datetime.now(timezone.utc) - self.recent_window).strftime('%Y-%m-%dT%H:%M:%S')
+
+        selected = {}
+        for address in self.ledger.get_recent_addresses(since):
+            selected[address] = 'recent'
+        for address, _ in stored[:self.top_n]:
+            selected.setdefault(address, 'top')
+
+        tail = [address for address, _ in stored[self.top_n:] if address not in selected]
+        sample_size = min(len(tail), int(round(len(tail) * self.sample_rate)))
+        for address in random.sample(tail, sample_size):
+            selected[address] = 'sample'
+        return selected, len(tail)
+
+    def run(self):
+        """Verify selected balances, write API values back and record drift stats"""
+        start = datetime.now(timezone.utc)
+        stored_rows = self.get_stored_balances()
+        stored = dict(stored_rows)
+        selected, tail_size = self.select_addresses(stored_rows)
+
+        print(f"[RECONCILE] Checking {len(selected)} of {len(stored)} holders "
+              f"(top_n={self.top_n}, sample_rate={self.sample_rate:.0%})")
+
+        ledger_balances = self.ledger.get_balances(selected)
+        fetched_at = datetime.now(timezone.utc)
+        results = self.fetch_balances(list(selected))
+
+        drift_rows = []
+        updates = []
+        counts = {'recent': 0, 'top': 0, 'sample': 0}
+        failed = 0
+        sample_drifted = 0
+        drift_amount = 0
+        verified = {}
+
+        for result in results:
+            address = result['address']
+            api_balance = result['current_balance']
+            if api_balance is None:
+                failed += 1
+                continue
+
+            reason = selected[address]
+            counts[reason] += 1
+            stored_balance = stored.get(address)
+            ledger_record = ledger_balances.get(address)
+            ledger_balance = ledger_record['current_balance'] if ledger_record else None
+
+            if stored_balance != api_balance or (ledger_balance is not None and ledger_balance != api_balance):
+                drift_rows.append((address, reason, stored_balance, ledger_balance, api_balance))
+                drift_amount += abs(api_balance - (stored_balance or 0))
+                if reason == 'sample':
+                    sample_drifted += 1
+            if stored_balance != api_balance:
+                updates.append((api_balance, address))
+            verified[address] = api_balance
+
+        # Long-tail drift extrapolated from the sample
+        sample_rate = sample_drifted / counts['sample'] if counts['sample'] else 0.0
+        estimated_tail_drift = sample_rate * tail_size
+
+        conn = sqlite3.connect(self.holders_db_path)
+        cursor = conn.cursor()
+        cursor.executemany('UPDATE murf_holders SET current_balance = ? WHERE address = ?', updates)
+        conn.commit()
+        conn.close()
+        get_leaderboard(self.holders_db_path).update_many(
+            [{'address': address, 'current_balance': balance} for balance, address in updates])
+
+        elapsed = (datetime.now(timezone.utc) - start).total_seconds()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO reconciliation_runs
+            (started_at, total_holders, recent_checked, top_checked, sampled, failed,
+             drifted, sample_drifted, drift_amount, estimated_tail_drift, elapsed)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (start.strftime('%Y-%m-%dT%H:%M:%S'), len(stored), counts['recent'], counts['top'],
+              counts['sample'], failed, len(drift_rows), sample_drifted, drift_amount,
+              estimated_tail_drift, elapsed))
+        run_id = cursor.lastrowid
+        cursor.executemany('''
+            INSERT OR REPLACE INTO balance_drift
+            (run_id, address, reason, stored_balance, ledger_balance, api_balance)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(run_id,) + row for row in drift_rows])
+        conn.commit()
+        conn.close()
+
+        # Event-sourced correction; older events the ingester backfills later do not count twice
+        self.ledger.record_adjustments(f"reconcile:{run_id}", verified, fetched_at)
+
+        print(f"[RECONCILE] Run {run_id}: {len(drift_rows)} drifted, {len(updates)} updated, "
+              f"{failed} failed, estimated tail drift {estimated_tail_drift:.1f} in {elapsed:.2f}s")
+        return self.get_run(run_id)
+
+    def get_run(self, run_id):
+        """Get the stats of one run"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM reconciliation_runs WHERE id = ?', (run_id,))
+        row = cursor.fetchone()
+        columns = [description[0] for description in cursor.description]
+        conn.close()
+        return dict(zip(columns, row)) if row else None
+
+    def get_drift_stats(self, runs=24):
+        """Aggregate drift statistics over the latest runs"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*), COALESCE(SUM(recent_checked + top_checked + sampled), 0),
+                   COALESCE(SUM(drifted), 0), COALESCE(SUM(sampled), 0),
+                   COALESCE(SUM(sample_drifted), 0), COALESCE(AVG(estimated_tail_drift), 0)
+            FROM (SELECT * FROM reconciliation_runs ORDER BY id DESC LIMIT ?)
+        ''', (runs,))
+        row = cursor.fetchone()
+        conn.close()
+
+        return {
+            'runs': row[0],
+            'checked': row[1],
+            'drifted': row[2],
+            'drift_rate': row[2] / row[1] if row[1] else 0.0,
+            'sampled': row[3],
+            'sample_drift_rate': row[4] / row[3] if row[3] else 0.0,
+            'avg_estimated_tail_drift': row[5]
+        }
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Holder Store - Read-side snapshot of every MURF holder source
+One schema for every holder source (dashboard holders, real-time checks, SDK
+scanners, airdrop trace). Rows are keyed by (source, address), the schema is
+versioned with PRAGMA user_version, and cross-source comparisons / analytics
+are indexed joins.
+
+The live writers (SmartHoldersManager, MURFHoldersDB, the scanners) keep
+writing their own .db files; this store is a snapshot imported from them with
+plain SQL. A file is only re-imported when it changed since its last import.
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+
+from operation_records import MURF_TOKEN
+
+HOLDER_STORE_DB = "holder_store.db"
+
+# Schema migrations, applied in order; PRAGMA user_version = last applied
+MIGRATIONS = [
+    (1, [
+        '''
+        CREATE TABLE IF NOT EXISTS holder_balances (
+            source TEXT NOT NULL,
+            address TEXT NOT NULL,
+            current_balance INTEGER NOT NULL DEFAULT 0,
+            total_received INTEGER,
+            total_sent INTEGER,
+            tx_count INTEGER,
+            first_tx_date TEXT,
+            last_tx_date TEXT,
+            rank INTEGER,
+            is_airdrop_recipient BOOLEAN DEFAULT 0,
+            updated_at TEXT,
+            PRIMARY KEY (source, address)
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_holder_balances_address ON holder_balances (address)',
+        'CREATE INDEX IF NOT EXISTS idx_holder_balances_balance ON holder_balances (source, current_balance DESC)'
+    ]),
+    (2, [
+        '''
+        CREATE TABLE IF NOT EXISTS import_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            db_path TEXT,
+            rows INTEGER,
+            imported_at TEXT
+        )
+        '''
+    ]),
+    # Size / mtime of the imported file, so unchanged files are not imported again
+    (3, [
+        'ALTER TABLE import_log ADD COLUMN db_size INTEGER',
+        'ALTER TABLE import_log ADD COLUMN db_mtime REAL'
+    ])
+]
+
+# Legacy files: source -> (default db file, SELECT producing the canonical columns)
+# Columns (in order): address, balance, total_received, total_sent, tx_count,
+#                    first_tx_date, last_tx_date, rank, is_airdrop_recipient
+SCANNER_HOLDERS_QUERY = '''
+    SELECT address, current_balance, total_received, total_sent, transaction_count,
+           first_murf_tx, last_murf_tx, NULL, 0
+    FROM legacy.murf_holders
+'''
+TOKEN_BALANCES_QUERY = f'''
+    SELECT address, balance, NULL, NULL, NULL, NULL, last_updated, NULL, 0
+    FROM legacy.token_balances WHERE token = '{MURF_TOKEN}'
+'''
+
+CANONICAL_COLUMNS = ('address', 'balance', 'total_received', 'total_sent', 'tx_count',
+                     'first_tx_date', 'last_tx_date', 'rank', 'is_airdrop_recipient')
+
+LEGACY_SOURCES = {
+    'murf_holders': ('murf_holders.db', '''
+        SELECT address, current_balance, total_received, total_sent, tx_count,
+               first_tx_date, last_tx_date, rank, is_airdrop_recipient
+        FROM legacy.murf_holders
+    '''),
+    'murf_holders_comprehensive': ('murf_holders_comprehensive.db', '''
+        SELECT address, balance_estimate, total_received, total_sent, transaction_count,
+               first_seen, last_seen, NULL, 0
+        FROM legacy.holders
+    '''),
+    'real_time': ('murf_real_time_holders.db', '''
+        SELECT address, current_balance, NULL, NULL, NULL, NULL, last_checked, rank, 0
+        FROM legacy.real_time_holders
+    '''),
+    'keeta_sdk_holders': ('keeta_sdk_holders.db', TOKEN_BALANCES_QUERY),
+    'keeta_sdk_balances': ('keeta_sdk_balances.db', TOKEN_BALANCES_QUERY),
+    'keeta_sdk_proper': ('keeta_sdk_proper.db', SCANNER_HOLDERS_QUERY),
+    'keeta_sdk_comprehensive': ('keeta_sdk_comprehensive.db', SCANNER_HOLDERS_QUERY),
+    'comprehensive_addresses': ('comprehensive_addresses.db', SCANNER_HOLDERS_QUERY),
+    'airdrop_trace': ('airdrop_trace.db', '''
+        SELECT address, current_balance, total_received, total_sent, tx_count,
+               first_tx_date, last_tx_date, NULL, is_airdrop_recipient
+        FROM legacy.airdrop_holders
+    ''')
+}
+
+
+class HolderStore:
+    def __init__(self, db_path=HOLDER_STORE_DB):
+        self.db_path = db_path
+        self.migrate()
+
+    def get_schema_version(self):
+        """Get the applied schema version"""
+        conn = sqlite3.connect(self.db_path)
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        conn.close()
+        return version
+
+    def migrate(self):
+        """Apply pending schema migrations, return the new version"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+
+        for target, statements in MIGRATIONS:
+            if target <= version:
+                continue
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(f'PRAGMA user_version = {target}')
+            conn.commit()
+            print(f"[STORE] Migrated {self.db_path} to schema v{target}")
+            version = target
+
+        conn.close()
+        return version
+
+    def import_legacy(self, source, db_path=None, force=False):
+        """Import one legacy holder DB into the store (replaces that source), return row count
+
+        Skipped (returns None) when the file is unchanged since the last import
+        of this source, unless force is set.
+        """
+        default_path, query = LEGACY_SOURCES[source]
+        db_path = db_path or default_path
+        if not os.path.exists(db_path):
+            print(f"[STORE] Skipping {source}: {db_path} not found")
+            return 0
+
+        stat = os.stat(db_path)
+        now = datetime.now().isoformat()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT db_path, db_size, db_mtime FROM import_log WHERE source = ? ORDER BY id DESC LIMIT 1
+        ''', (source,))
+        if not force and cursor.fetchone() == (db_path, stat.st_size, stat.st_mtime):
+            conn.close()
+            return None
+
+        cursor.execute('ATTACH DATABASE ? AS legacy', (db_path,))
+        try:
+            cursor.execute('DELETE FROM holder_balances WHERE source = ?', (source,))
+            cursor.execute(f'''
+                INSERT OR REPLACE INTO holder_balances
+                (source, address, current_balance, total_received, total_sent, tx_count,
+                 first_tx_date, last_tx_date, rank, is_airdrop_recipient, updated_at)
+                SELECT ?, address, COALESCE(balance, 0), total_received, total_sent, tx_count,
+                       first_tx_date, last_tx_date, rank, COALESCE(is_airdrop_recipient, 0), ?
+                FROM (WITH legacy_rows ({", ".join(CANONICAL_COLUMNS)}) AS ({query})
+                      SELECT * FROM legacy_rows)
+                WHERE address IS NOT NULL
+            ''', (source, now))
+            rows = cursor.rowcount
+            cursor.execute('''
+                INSERT INTO import_log (source, db_path, rows, imported_at, db_size, db_mtime)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (source, db_path, rows, now, stat.st_size, stat.st_mtime))
+            conn.commit()
+        except sqlite3.OperationalError as e:
+            conn.rollback()
+            print(f"[STORE] Error importing {source} from {db_path}: {e}")
+            rows = 0
+        finally:
+            cursor.execute('DETACH DATABASE legacy')
+            conn.close()
+
+        print(f"[STORE] Imported {rows} holders from {db_path} as '{source}'")
+        return rows
+
+    def import_all_legacy(self, force=False):
+        """Import every legacy holder DB that exists (and changed since its last import)"""
+        return {source: self.import_legacy(source, force=force) for source in LEGACY_SOURCES}
+
+    def upsert_holders(self, source, holders):
+        """Write holder dicts (address, current_balance, ...) for a source"""
+        now = datetime.now().isoformat()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO holder_balances
+            (source, address, current_balance, total_received, total_sent, tx_count,
+             first_tx_date, last_tx_date, rank, is_airdrop_recipient, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(source, h['address'], h.get('current_balance') or 0, h.get('total_received'),
+               h.get('total_sent'), h.get('tx_count'), h.get('first_tx_date'), h.get('last_tx_date'),
+               h.get('rank'), h.get('is_airdrop_recipient', False), now) for h in holders])
+        conn.commit()
+        conn.close()
+        return len(holders)
+
+    def get_sources(self):
+        """Get holder count and total balance per source"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT source, COUNT(*), SUM(CASE WHEN current_balance > 0 THEN 1 ELSE 0 END),
+                   COALESCE(SUM(current_balance), 0), MAX(updated_at)
+            FROM holder_balances GROUP BY source ORDER BY source
+        ''')
+        rows = cursor.fetchall()
+        conn.close()
+
+        return [{
+            'source': row[0],
+            'addresses': row[1],
+            'holders': row[2],
+            'total_balance': row[3],
+            'updated_at': row[4]
+        } for row in rows]
+
+    def get_source_version(self, source):
+        """Change marker of a source (rows, last update), for caching derived results"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*), MAX(updated_at) FROM holder_balances WHERE source = ?', (source,))
+        row = cursor.fetchone()
+        conn.close()
+        return row
+
+    def get_balances(self, source, min_balance=1):
+        """Balances of a source (largest first)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT current_balance FROM holder_balances
+            WHERE source = ? AND current_balance >= ?
+            ORDER BY current_balance DESC
+        ''', (source, min_balance))
+        balances = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        return balances
+
+    def get_holders(self, source, limit=None, min_balance=1):
+        """Get holders of a source (largest first)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        query = '''
+            SELECT address, current_balance, total_received, total_sent, tx_count,
+                   first_tx_date, last_tx_date, rank, is_airdrop_recipient
+            FROM holder_balances WHERE source = ? AND current_balance >= ?
+            ORDER BY current_balance DESC
+        '''
+        if limit:
+            cursor.execute(query + ' LIMIT ?', (source, min_balance, limit))
+        else:
+            cursor.execute(query, (source, min_balance))
+        rows = cursor.fetchall()
+        conn.close()
+
+        return [{
+            'address': row[0],
+            'current_balance': row[1],
+            'total_received': row[2],
+            'total_sent': row[3],
+            'tx_count': row[4],
+            'first_tx_date': row[5],
+            'last_tx_date': row[6],
+            'rank': row[7],
+            'is_airdrop_recipient': bool(row[8])
+        } for row in rows]
+
+    def compare_sources(self, old_source, new_source, limit=10):
+        """Top holders of new_source joined with their balance in old_source"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT n.address, COALESCE(o.current_balance, 0), n.current_balance
+            FROM holder_balances n
+            LEFT JOIN holder_balances o ON o.source = ? AND o.address = n.address
+            WHERE n.source = ?
+            ORDER BY n.current_balance DESC
+            LIMIT ?
+        ''', (old_source, new_source, limit))
+        rows = cursor.fetchall()
+        conn.close()
+
+        return [{
+            'address': row[0],
+            'old_balance': row[1],
+            'new_balance': row[2],
+            'change': row[2] - row[1]
+        } for row in rows]
+
+    def get_exited_holders(self, old_source, new_source, limit=None):
+        """Addresses holding MURF in old_source but not (or zero) in new_source"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        query = '''
+            SELECT o.address, o.current_balance
+            FROM holder_balances o
+            LEFT JOIN holder_balances n ON n.source = ? AND n.address = o.address
+            WHERE o.source = ? AND o.current_balance > 0 AND COALESCE(n.current_balance, 0) = 0
+            ORDER BY o.current_balance DESC
+        '''
+        if limit:
+            cursor.execute(query + ' LIMIT ?', (new_source, old_source, limit))
+        else:
+            cursor.execute(query, (new_source, old_source))
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+
+def main():
+    """Snapshot tool: import every changed legacy holder DB into the store"""
+    store = HolderStore()
+    print(f"Holder store: {store.db_path} (schema v{store.get_schema_version()})")
+
+    store.import_all_legacy()
+
+    print("\nSources:")
+    for source in store.get_sources():
+        print(f"  {source['source']:<28} {source['addresses']:>7} addresses, "
+              f"{source['holders']:>7} holders, {source['total_balance']:>20,} MURF")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Ingest Backends - Where history pages come from
+Consumers (KeetaMonitor.ingest_history, the dashboard's OTC analysis) take one
+history page at a time; a backend feeds pages to such a handler. PollingBackend
+is the request/response polling of /ledger/history on an adaptive schedule.
+StreamSubscriber keeps a connection open to a node endpoint that pushes pages as
+they are produced, so new trades reach the database well under a second after
+the node has them.
+
+Stream endpoint contract (for nodes or relays that support it):
+  - streaming: newline-delimited JSON or server-sent events, one history page
+    ({'blocks': [...]}) per line / data: line; ':' lines are keep-alives
+  - long-poll: any other content type is one page per response; the request
+    carries after=<newest block hash seen> and the server answers when it has
+    newer blocks, or 204 when its wait expires
+The subscriber reconnects with backoff and re-reads the head page after every
+disconnect, so blocks pushed while it was away are not lost (downstream block
+caches drop the overlap).
+
+Select with KEETA_INGEST=poll (default) or KEETA_INGEST=stream plus
+KEETA_STREAM_URL.
+"""
+
+import os
+import threading
+import time
+import logging
+
+import requests
+
+from adaptive_poller import retry_after
+from history_stream import read_history_page, BLOCK_FIELDS
+
+logger = logging.getLogger(__name__)
+
+INGEST_ENV = "KEETA_INGEST"
+STREAM_URL_ENV = "KEETA_STREAM_URL"
+
+STREAM_CONTENT_TYPES = ('ndjson', 'jsonl', 'json-seq', 'event-stream')
+
+
+class PollingBackend:
+    """Fetch the head page as a WorkerRuntime job, interval set by an AdaptivePoller"""
+
+    name = "poll"
+
+    def __init__(self, fetch, poller):
+        self.fetch = fetch              # callable returning one page or None
+        self.poller = poller
+        self.handler = None
+        self.pages = 0
+
+    def poll(self):
+        """One poll: fetch, hand over the page, return seconds until the next poll"""
+        activity = 0
+        page = self.fetch()
+        if page is not None:
+            self.pages += 1
+            activity = self.handler(page) or 0
+        return self.poller.record(activity)
+
+    def start(self, handler, runtime):
+        """Register the polling job (the caller owns and runs the runtime)"""
+        self.handler = handler
+        runtime.register("ingest-poll", self.poll, interval=self.poller.base_interval, timeout=60)
+
+    def stop(self):
+        pass
+
+    def get_stats(self):
+        return dict(self.poller.get_stats(), backend=self.name, pages=self.pages)
+
+
+class StreamSubscriber:
+    """Hold a streaming / long-poll connection and hand over pages as they arrive"""
+
+    name = "stream"
+
+    def __init__(self, url, fields=BLOCK_FIELDS, catch_up=None, idle_timeout=90, max_backoff=60):
+        self.url = url
+        self.fields = fields
+        self.catch_up = catch_up        # callable returning the head page, read after (re)connects
+        self.idle_timeout = idle_timeout
+        self.max_backoff = max_backoff
+        self.handler = None
+        self.thread = None
+        self.response = None
+        self.stopping = threading.Event()
+        self.after = None               # newest block hash delivered (long-poll resume point)
+        self.pages = 0
+        self.blocks = 0
+        self.connects = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_page_at = None
+
+    def start(self, handler, runtime=None):
+        """Start the subscriber thread (runtime unused: the connection is not a periodic job)"""
+        self.handler = handler
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="ingest-stream")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        """Close the connection and wait for the subscriber thread"""
+        self.stopping.set()
+        response = self.response
+        if response is not None:
+            response.close()
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+
+    def _run(self):
+        backoff = 1.0
+        gap = True                      # blocks may have been missed: read the head page first
+        while not self.stopping.is_set():
+            try:
+                if gap and self.catch_up is not None:
+                    page = self.catch_up()
+                    if page is not None:
+                        self._deliver(page)
+                gap = self._consume()
+                backoff = 1.0
+            except Exception as e:
+                if self.stopping.is_set():
+                    break
+                gap = True
+                self.errors += 1
+                self.last_error = str(e)
+                logger.warning(f"Stream disconnected ({e}), reconnecting in {backoff:.0f}s")
+                if self.stopping.wait(backoff):
+                    break
+                backoff = min(self.max_backoff, backoff * 2)
+
+    def _consume(self):
+        """One connection: read pages until the server closes it, return True if a stream ended"""
+        params = {'after': self.after} if self.after else {}
+        headers = {'Accept': 'application/x-ndjson, text/event-stream, application/json'}
+        self.response = response = requests.get(self.url, params=params, headers=headers,
+                                                stream=True, timeout=(10, self.idle_timeout))
+        self.connects += 1
+        try:
+            wait = retry_after(response.status_code, response.headers)
+            if wait is not None:
+                logger.warning(f"Stream rate limited, reconnecting in {wait or self.max_backoff:.0f}s")
+                self.stopping.wait(wait or self.max_backoff)
+                return True
+            if response.status_code == 204:
+                return False            # long-poll expired without new blocks
+            response.raise_for_status()
+
+            content_type = response.headers.get('Content-Type', '')
+            if not any(kind in content_type for kind in STREAM_CONTENT_TYPES):
+                page = read_history_page(response, self.fields)
+                self._deliver(page)
+                if not page['blocks']:
+                    self.stopping.wait(1.0)  # server answered without waiting
+                return False
+
+            delivered = self.pages
+            for line in stream_lines(response):
+                if self.stopping.is_set():
+                    break
+                if line.startswith(b'data:'):
+                    line = line[5:]
+                elif line.startswith((b':', b'event:', b'id:', b'retry:')):
+                    continue            # keep-alive / SSE metadata
+                line = line.strip()
+                if line:
+                    self._deliver(read_history_page(line, self.fields))
+            if self.pages == delivered:
+                self.stopping.wait(1.0)  # stream closed without a page: do not reconnect in a tight loop
+            return True
+        finally:
+            self.response = None
+            response.close()
+
+    def _deliver(self, page):
+        blocks = page.get('blocks') or []
+        self.pages += 1
+        self.blocks += len(blocks)
+        self.last_page_at = time.time()
+        if blocks and blocks[0].get('$hash'):
+            self.after = blocks[0]['$hash']  # pages are newest first
+        try:
+            self.handler(page)
+        except Exception as e:
+            logger.error(f"Ingest handler failed: {e}")
+
+    def get_stats(self):
+        return {
+            "backend": self.name,
+            "connected": self.response is not None,
+            "pages": self.pages,
+            "blocks": self.blocks,
+            "connects": self.connects,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_page_age": time.time() - self.last_page_at if self.last_page_at else None
+        }
+
+
+def stream_lines(response):
+    """Lines of a streaming response as soon as each arrives (iter_lines waits for a full chunk)"""
+    raw = response.raw
+    read = getattr(raw, 'read1', None)
+    if read is None:
+        yield from response.iter_lines(chunk_size=None)
+        return
+    raw.decode_content = True
+    pending = b''
+    while True:
+        data = read(65536)
+        if not data:
+            break
+        lines = (pending + data).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip(b'\r')
+    if pending:
+        yield pending
+
+
+def ingest_backend(fetch, poller, fields=BLOCK_FIELDS, stream_url=None):
+    """Backend chosen by KEETA_INGEST: polling via `fetch`, or a StreamSubscriber that uses `fetch` to catch up"""
+    mode = os.environ.get(INGEST_ENV, 'poll').strip().lower()
+    stream_url = stream_url or os.environ.get(STREAM_URL_ENV)
+    if mode == 'stream':
+        if stream_url:
+            return StreamSubscriber(stream_url, fields, catch_up=fetch)
+        logger.warning(f"{INGEST_ENV}=stream without {STREAM_URL_ENV}, falling back to polling")
+    return PollingBackend(fetch, poller)
@@ -7,17 +7,227 @@ Memantau transaksi OTC MURF-KTA di blockchain Keeta
 import requests
 import json
 import time
+import math
 import sqlite3
+import zlib
 from datetime import datetime
 from typing import Dict, List, Optional
 import logging
+from history_stream import read_history_page, MONITOR_BLOCK_FIELDS
+from block_cache import SeenBlockCache
+from otc_engine import OTC_ENGINE, BlockOpIndex
+from amount_codec import decode_hex, to_float, KTA_DECIMALS
+from operation_records import (
+    OperationRecord, BlockRecord, MURF_ID, KTA_ID, OP_OTC,
+    normalize_operation, normalize_block, normalize_blocks, format_amount
+)
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Jenis transaksi berdasarkan operation type
+TRADE_TYPE_MAP = {
+    0: "transfer",
+    1: "mint",
+    2: "burn",
+    3: "freeze",
+    4: "unfreeze",
+    5: "approve",
+    6: "revoke",
+    7: "otc_trade",  # Transaksi OTC
+    8: "swap",
+    9: "stake",
+    10: "unstake"
+}
+
+# Kolom JSON yang dipindah ke tabel trade_payloads (zlib-compressed)
+PAYLOAD_COLUMNS = ("raw_operation", "related_operations")
+
+
+def encode_payload(raw_operation, related_operations) -> bytes:
+    """Kompres JSON mentah satu trade"""
+    return zlib.compress(json.dumps({
+        "raw_operation": raw_operation,
+        "related_operations": related_operations
+    }, separators=(',', ':')).encode('utf-8'))
+
+
+def _load_json(value, default):
+    if not value:
+        return default
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _offload_payloads(cursor):
+    """Pindahkan raw_operation / related_operations lama ke trade_payloads"""
+    last_id = 0
+    while True:
+        cursor.execute('''
+            SELECT id, raw_operation, related_operations FROM trades
+            WHERE id > ? AND (raw_operation IS NOT NULL OR related_operations IS NOT NULL)
+            ORDER BY id LIMIT 1000
+        ''', (last_id,))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        cursor.executemany('''
+            INSERT OR REPLACE INTO trade_payloads (trade_id, payload) VALUES (?, ?)
+        ''', [(row[0], encode_payload(_load_json(row[1], {}), _load_json(row[2], [])))
+              for row in rows])
+        cursor.executemany('''
+            UPDATE trades SET raw_operation = NULL, related_operations = NULL WHERE id = ?
+        ''', [(row[0],) for row in rows])
+        last_id = rows[-1][0]
+
+
+def _dedupe_trades(cursor):
+    """Hapus baris duplikat dari polling yang overlap (simpan id terkecil)
+
+    Baris lama belum punya op_index, jadi operasi yang isinya identik dalam satu
+    block tidak bisa dibedakan dari duplikat polling. Setiap polling menyimpan
+    semua operasi block, jadi jumlah polling = FPB (gcd) jumlah baris per isi;
+    tiap isi disimpan sebanyak jumlahnya / jumlah polling.
+    """
+    cursor.execute('''
+        SELECT block_hash, token_id, amount_hex, operation_type, to_address, from_address,
+               group_concat(id) FROM (SELECT * FROM trades ORDER BY id)
+        GROUP BY block_hash, token_id, amount_hex, operation_type, to_address, from_address
+    ''')
+    blocks = {}
+    for row in cursor.fetchall():
+        ids = sorted(int(trade_id) for trade_id in row[6].split(','))
+        blocks.setdefault(row[0], []).append(ids)
+
+    duplicate_ids = []
+    for groups in blocks.values():
+        polls = 0
+        for ids in groups:
+            polls = math.gcd(polls, len(ids))
+        for ids in groups:
+            duplicate_ids.extend(ids[len(ids) // polls:])
+
+    cursor.executemany('DELETE FROM trades WHERE id = ?', [(trade_id,) for trade_id in duplicate_ids])
+    cursor.execute('DELETE FROM trade_payloads WHERE trade_id NOT IN (SELECT id FROM trades)')
+
+
+# Ambang transaksi besar (whale) yang dihitung di agregat per menit
+LARGE_TRADE_AMOUNT = 1000000
+
+# Kunci bucket agregat per menit dari satu baris trades (NEW/OLD di trigger)
+MINUTE_KEY_COLUMNS = ("minute", "token_id", "is_otc", "otc_type")
+
+
+def _minute_key(row: str) -> List[str]:
+    return [f"substr({row}.timestamp, 1, 16)", f"COALESCE({row}.token_id, '')",
+            f"COALESCE({row}.is_otc, 0)", f"COALESCE({row}.otc_type, '')"]
+
+
+def _minute_match(left: List[str], right: List[str]) -> str:
+    return " AND ".join(f"{a} = {b}" for a, b in zip(left, right))
+
+
+# Agregat per menit untuk laporan 24 jam; dijaga trigger sehingga setiap penulis tabel trades ikut terhitung
+TRADE_MINUTES_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS trade_minutes (
+        minute TEXT NOT NULL,
+        token_id TEXT NOT NULL,
+        is_otc INTEGER NOT NULL,
+        otc_type TEXT NOT NULL,
+        trades INTEGER NOT NULL,
+        volume REAL NOT NULL,
+        max_amount REAL NOT NULL,
+        large_trades INTEGER NOT NULL,
+        ratio_sum REAL NOT NULL,
+        ratio_count INTEGER NOT NULL,
+        PRIMARY KEY (minute, token_id, is_otc, otc_type)
+    ) WITHOUT ROWID
+    ''',
+    f'''
+    INSERT OR REPLACE INTO trade_minutes
+    SELECT {", ".join(_minute_key("trades"))},
+           COUNT(*), TOTAL(amount_decimal), COALESCE(MAX(amount_decimal), 0),
+           SUM(COALESCE(amount_decimal, 0) >= {LARGE_TRADE_AMOUNT}),
+           TOTAL(CASE WHEN exchange_ratio > 0 THEN exchange_ratio END),
+           SUM(COALESCE(exchange_ratio, 0) > 0)
+    FROM trades WHERE timestamp IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trades_minutes_insert AFTER INSERT ON trades
+    WHEN NEW.timestamp IS NOT NULL
+    BEGIN
+        INSERT INTO trade_minutes
+        VALUES ({", ".join(_minute_key("NEW"))},
+                1, COALESCE(NEW.amount_decimal, 0), COALESCE(NEW.amount_decimal, 0),
+                COALESCE(NEW.amount_decimal, 0) >= {LARGE_TRADE_AMOUNT},
+                CASE WHEN NEW.exchange_ratio > 0 THEN NEW.exchange_ratio ELSE 0 END,
+                COALESCE(NEW.exchange_ratio, 0) > 0)
+        ON CONFLICT (minute, token_id, is_otc, otc_type) DO UPDATE SET
+            trades = trades + 1,
+            volume = volume + excluded.volume,
+            max_amount = MAX(max_amount, excluded.max_amount),
+            large_trades = large_trades + excluded.large_trades,
+            ratio_sum = ratio_sum + excluded.ratio_sum,
+            ratio_count = ratio_count + excluded.ratio_count;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trades_minutes_delete AFTER DELETE ON trades
+    WHEN OLD.timestamp IS NOT NULL
+    BEGIN
+        UPDATE trade_minutes SET
+            trades = trades - 1,
+            volume = volume - COALESCE(OLD.amount_decimal, 0),
+            large_trades = large_trades - (COALESCE(OLD.amount_decimal, 0) >= {LARGE_TRADE_AMOUNT}),
+            ratio_sum = ratio_sum - (CASE WHEN OLD.exchange_ratio > 0 THEN OLD.exchange_ratio ELSE 0 END),
+            ratio_count = ratio_count - (COALESCE(OLD.exchange_ratio, 0) > 0),
+            max_amount = (
+                SELECT COALESCE(MAX(amount_decimal), 0) FROM trades
+                WHERE timestamp >= substr(OLD.timestamp, 1, 16) AND timestamp < substr(OLD.timestamp, 1, 16) || ';'
+                  AND {_minute_match(_minute_key("trades")[1:], _minute_key("OLD")[1:])}
+            )
+        WHERE {_minute_match(MINUTE_KEY_COLUMNS, _minute_key("OLD"))};
+        DELETE FROM trade_minutes WHERE {_minute_match(MINUTE_KEY_COLUMNS, _minute_key("OLD"))} AND trades <= 0;
+    END
+    '''
+]
+
+# Migrasi schema keeta_trades.db, berurutan; PRAGMA user_version = versi terakhir
+TRADES_MIGRATIONS = [
+    # Index sesuai query price_analyzer / notification_system / alert_engine
+    (1, [
+        'CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades (timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_trades_otc_timestamp ON trades (is_otc, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_trades_token_timestamp ON trades (token_id, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_trades_amount_timestamp ON trades (amount_decimal, timestamp)'
+    ]),
+    # JSON mentah keluar dari tabel trades
+    (2, [
+        '''
+        CREATE TABLE IF NOT EXISTS trade_payloads (
+            trade_id INTEGER PRIMARY KEY REFERENCES trades (id),
+            payload BLOB
+        )
+        ''',
+        _offload_payloads
+    ]),
+    # Satu baris per operasi: unik pada (block_hash, op_index); baris lama tanpa op_index tetap NULL
+    (3, [
+        'ALTER TABLE trades ADD COLUMN op_index INTEGER',
+        _dedupe_trades,
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_trades_block_op ON trades (block_hash, op_index)'
+    ]),
+    # Agregat per menit (volume, max, whale, rasio OTC) untuk laporan price_analyzer
+    (4, TRADE_MINUTES_SCHEMA)
+]
+
 class KeetaMonitor:
-    def __init__(self, db_path: str = "keeta_trades.db"):
+    def __init__(self, db_path: str = "keeta_trades.db", block_cache: Optional[SeenBlockCache] = None):
         self.api_base = "https://rep2.main.network.api.keeta.com/api/node"
         self.db_path = db_path
         self.setup_database()
@@ -26,6 +236,15 @@ class KeetaMonitor:
         self.murf_token = "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm"
         self.kta_token = "keeta_anqdilpazdekdu4acw65fj7smltcp26wbrildkqtszqvverljpwpezmd44ssg"
         
+        # Cache block yang sudah diproses (polling saling overlap)
+        self.block_cache = block_cache or SeenBlockCache("keeta_monitor")
+        
+        # Alert engine opsional: dievaluasi langsung setiap trade disimpan
+        self.alert_engine = None
+        
+        # AdaptivePoller opsional: header rate-limit dari API dicatat di sini
+        self.poller = None
+        
     def setup_database(self):
         """Setup database untuk menyimpan data transaksi"""
         conn = sqlite3.connect(self.db_path)
@@ -71,24 +290,53 @@ class KeetaMonitor:
         ''')
         
         conn.commit()
+        
+        self.schema_version = self.migrate_database(conn)
         conn.close()
-        logger.info("Database setup completed")
+        logger.info(f"Database setup completed (schema v{self.schema_version})")
+    
+    def migrate_database(self, conn) -> int:
+        """Jalankan migrasi schema yang belum diterapkan, return versi baru"""
+        cursor = conn.cursor()
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        
+        for target, steps in TRADES_MIGRATIONS:
+            if target <= version:
+                continue
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute(f'PRAGMA user_version = {target}')
+            conn.commit()
+            logger.info(f"Migrated {self.db_path} to schema v{target}")
+            version = target
+        
+        return version
+    
+    def get_trade_payload(self, trade_id: int) -> Dict:
+        """Ambil raw_operation / related_operations satu trade dari trade_payloads"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT payload FROM trade_payloads WHERE trade_id = ?', (trade_id,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        if not row or row[0] is None:
+            return {"raw_operation": {}, "related_operations": []}
+        return json.loads(zlib.decompress(row[0]))
     
     def hex_to_decimal(self, hex_value: str) -> float:
         """Konversi hex ke desimal dengan handling untuk nilai besar"""
-        try:
-            # Handle nilai yang sangat besar dengan konversi ke float
-            decimal_value = int(hex_value, 16)
-            
-            # Jika nilai terlalu besar (> 1e15), konversi ke format yang lebih kecil
-            if decimal_value > 1e15:
-                # Asumsikan ini adalah token dengan 18 decimals
-                return decimal_value / 1e18
-            else:
-                return float(decimal_value)
-                
-        except (ValueError, OverflowError):
-            return 0.0
+        return self.amount_to_decimal(decode_hex(hex_value))
+    
+    def amount_to_decimal(self, amount: int) -> float:
+        """Konversi amount integer (sudah di-parse) ke desimal"""
+        # Jika nilai terlalu besar (> 1e15), asumsikan token dengan 18 decimals
+        if amount > 10 ** 15:
+            return to_float(amount, KTA_DECIMALS)
+        return float(amount)
     
     def get_ledger_history(self, limit: int = 50) -> Optional[Dict]:
         """Ambil riwayat ledger dari API Keeta"""
@@ -96,98 +344,118 @@ class KeetaMonitor:
             url = f"{self.api_base}/ledger/history"
             params = {"limit": limit}
             
-            response = requests.get(url, params=params, timeout=30)
+            response = requests.get(url, params=params, timeout=30, stream=True)
+            if self.poller is not None:
+                self.poller.observe_response(response)
             response.raise_for_status()
             
-            return response.json()
+            # Hanya field block yang dipakai parser yang di-decode
+            return read_history_page(response, MONITOR_BLOCK_FIELDS)
         except Exception as e:
             logger.error(f"Error fetching ledger history: {e}")
             return None
     
     def parse_transaction(self, operation: Dict, block_data: Dict) -> Optional[Dict]:
-        """Parse transaksi individual"""
+        """Parse transaksi individual dari dict mentah API (operasi harus bagian dari block_data)"""
+        operations = block_data.get("operations") or []
+        op_index = next((i for i, candidate in enumerate(operations) if candidate is operation), None)
+        if op_index is None and operation in operations:
+            op_index = operations.index(operation)
+        if op_index is None:
+            logger.error(f"Operation not found in block {block_data.get('$hash', '')}")
+            return None
+        block = normalize_block(block_data)
+        return self.parse_operation(normalize_operation(operation, op_index, block.symbols), block,
+                                    raw_operation=operation)
+    
+    def parse_block(self, block: BlockRecord) -> List[Dict]:
+        """Parse semua transaksi MURF/KTA dalam satu block (index operasi dibuat sekali)"""
+        index = OTC_ENGINE.index_block(block)
+        if not index.has_token(MURF_ID, KTA_ID):
+            return []
+        
+        trades = []
+        for op in block.operations:
+            trade_data = self.parse_operation(op, block, index)
+            if trade_data:
+                trades.append(trade_data)
+        return trades
+    
+    def parse_operation(self, op: OperationRecord, block: BlockRecord,
+                        index: Optional[BlockOpIndex] = None,
+                        raw_operation: Optional[Dict] = None) -> Optional[Dict]:
+        """Parse transaksi individual dari record yang sudah dinormalisasi"""
         try:
             # Cek apakah ini transaksi MURF atau KTA
-            token_id = operation.get("token", "")
-            if token_id not in [self.murf_token, self.kta_token]:
+            if op.token not in (MURF_ID, KTA_ID):
                 return None
             
             # Tentukan jenis transaksi berdasarkan type
-            operation_type = operation.get("type", 0)
-            trade_type_map = {
-                0: "transfer",
-                1: "mint",
-                2: "burn", 
-                3: "freeze",
-                4: "unfreeze",
-                5: "approve",
-                6: "revoke",
-                7: "otc_trade",  # Transaksi OTC
-                8: "swap",
-                9: "stake",
-                10: "unstake"
-            }
-            
-            trade_type = trade_type_map.get(operation_type, f"unknown_type_{operation_type}")
+            trade_type = TRADE_TYPE_MAP.get(op.type, f"unknown_type_{op.type}")
+            # Operasi disimpan persis seperti dari API (field tak dikenal, format hex asli)
+            if raw_operation is None:
+                raw_operation = block.raw_operation(op)
+            amount_hex = raw_operation.get("amount")
             
             # Extract data transaksi
             trade_data = {
-                "timestamp": block_data.get("date", ""),
-                "block_hash": block_data.get("$hash", ""),
-                "from_address": block_data.get("account", ""),
-                "to_address": operation.get("to", ""),
-                "token_id": token_id,
-                "amount_hex": operation.get("amount", ""),
-                "amount_decimal": self.hex_to_decimal(operation.get("amount", "0x0")),
+                "timestamp": block.date,
+                "block_hash": block.hash,
+                "op_index": op.index,  # posisi operasi di block (kunci dedup)
+                "from_address": block.name(block.account),
+                "to_address": block.name(op.to_id),
+                "token_id": block.name(op.token),
+                "amount_hex": amount_hex if isinstance(amount_hex, str) else format_amount(op.amount),
+                "amount_decimal": self.amount_to_decimal(op.amount),
                 "trade_type": trade_type,
-                "operation_type": operation_type,
-                "raw_operation": operation  # Simpan data mentah untuk analisis lebih lanjut
+                "operation_type": op.type,
+                "raw_operation": raw_operation  # Simpan data mentah untuk analisis lebih lanjut
             }
             
             # Khusus untuk type 7 (OTC), tambahkan analisis tambahan
-            if operation_type == 7:
-                trade_data.update(self._parse_otc_trade(operation, block_data))
+            if op.type == OP_OTC:
+                trade_data.update(self._parse_otc_trade(op, block, index))
             
             return trade_data
         except Exception as e:
             logger.error(f"Error parsing transaction: {e}")
             return None
     
-    def _parse_otc_trade(self, operation: Dict, block_data: Dict) -> Dict:
+    def _parse_otc_trade(self, op: OperationRecord, block: BlockRecord,
+                         index: Optional[BlockOpIndex] = None) -> Dict:
         """Parse transaksi OTC (type 7) dengan detail tambahan"""
         try:
             # Analisis khusus untuk transaksi OTC berdasarkan struktur data yang sebenarnya
             otc_data = {
                 "is_otc": True,
                 "otc_details": {
-                    "from_address": operation.get("from", ""),
-                    "exact": operation.get("exact", False),
+                    "from_address": block.name(op.from_id),
+                    "exact": op.exact,
                     "otc_type": "swap",  # Berdasarkan data, ini adalah SWAP
-                    "trade_pair": f"{operation.get('token', '')[:20]}...",
-                    "settlement_time": block_data.get("date", ""),
-                    "block_hash": block_data.get("$hash", ""),
-                    "network": block_data.get("network", ""),
-                    "signer": block_data.get("signer", "")
+                    "trade_pair": f"{block.name(op.token)[:20]}...",
+                    "settlement_time": block.date,
+                    "block_hash": block.hash,
+                    "network": block.network,
+                    "signer": block.name(block.signer)
                 }
             }
             
-            # Cari operasi terkait dalam block yang sama untuk mendapatkan counterpart
+            # Operasi terkait (Type 0 token lain) dari index block yang sama
+            index = index or OTC_ENGINE.index_block(block)
             related_operations = []
-            if "operations" in block_data:
-                for op in block_data["operations"]:
-                    if op.get("type") == 0 and op.get("token") != operation.get("token"):
-                        related_operations.append({
-                            "to": op.get("to", ""),
-                            "amount": op.get("amount", ""),
-                            "amount_decimal": self.hex_to_decimal(op.get("amount", "0x0")),
-                            "token": op.get("token", "")
-                        })
+            for related_op in index.counterparts(op):
+                related_operations.append({
+                    "to": block.name(related_op.to_id),
+                    "amount": f"0x{related_op.amount:X}",
+                    "amount_decimal": self.amount_to_decimal(related_op.amount),
+                    "token": block.name(related_op.token)
+                })
             
             otc_data["otc_details"]["related_operations"] = related_operations
             
             # Hitung rasio pertukaran jika ada operasi terkait
             if related_operations:
-                main_amount = self.hex_to_decimal(operation.get("amount", "0x0"))
+                main_amount = self.amount_to_decimal(op.amount)
                 counterpart_amount = related_operations[0]["amount_decimal"]
                 
                 if main_amount > 0 and counterpart_amount > 0:
@@ -201,70 +469,135 @@ class KeetaMonitor:
             logger.error(f"Error parsing OTC trade: {e}")
             return {"is_otc": True, "otc_details": {}}
     
-    def save_trade(self, trade_data: Dict):
-        """Simpan data transaksi ke database"""
+    def _trade_row(self, trade_data: Dict) -> tuple:
+        """Baris tabel trades untuk satu trade hasil parse"""
+        otc_details = trade_data.get("otc_details", {})
+        return (
+            trade_data["timestamp"],
+            trade_data["block_hash"],
+            trade_data.get("op_index"),
+            trade_data["from_address"],
+            trade_data["to_address"],
+            trade_data["token_id"],
+            trade_data["amount_hex"],
+            trade_data["amount_decimal"],
+            trade_data["trade_type"],
+            trade_data.get("operation_type", 0),
+            trade_data.get("is_otc", False),
+            otc_details.get("from_address", ""),
+            otc_details.get("exact", False),
+            otc_details.get("otc_type", ""),
+            otc_details.get("trade_pair", ""),
+            otc_details.get("settlement_time", ""),
+            otc_details.get("network", ""),
+            otc_details.get("signer", ""),
+            otc_details.get("exchange_ratio", 0),
+            otc_details.get("counterpart_amount", 0),
+            otc_details.get("counterpart_token", "")
+        )
+        
+    def save_trades(self, trades: List[Dict]) -> Dict:
+        """Simpan banyak trade dalam satu transaksi database, return jumlah per status"""
+        counts = {"parsed": len(trades), "inserted": 0, "duplicates": 0, "failed": 0}
+        if not trades:
+            return counts
+        
+        # Duplikat di dalam batch yang sama dibuang dulu; kunci = (block_hash, op_index)
+        batch = {}
+        for trade_data in trades:
+            batch.setdefault((trade_data["block_hash"], trade_data.get("op_index")), trade_data)
+        
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
-            
-            # Extract OTC data jika ada
-            otc_details = trade_data.get("otc_details", {})
-            is_otc = trade_data.get("is_otc", False)
-            
-            cursor.execute('''
-                INSERT INTO trades (
-                    timestamp, block_hash, from_address, to_address, 
-                    token_id, amount_hex, amount_decimal, trade_type,
-                    operation_type, is_otc, otc_from_address, otc_exact,
-                    otc_type, trade_pair, settlement_time, network, signer,
-                    exchange_ratio, counterpart_amount, counterpart_token,
-                    related_operations, raw_operation
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                trade_data["timestamp"],
-                trade_data["block_hash"],
-                trade_data["from_address"],
-                trade_data["to_address"],
-                trade_data["token_id"],
-                trade_data["amount_hex"],
-                trade_data["amount_decimal"],
-                trade_data["trade_type"],
-                trade_data.get("operation_type", 0),
-                is_otc,
-                otc_details.get("from_address", ""),
-                otc_details.get("exact", False),
-                otc_details.get("otc_type", ""),
-                otc_details.get("trade_pair", ""),
-                otc_details.get("settlement_time", ""),
-                otc_details.get("network", ""),
-                otc_details.get("signer", ""),
-                otc_details.get("exchange_ratio", 0),
-                otc_details.get("counterpart_amount", 0),
-                otc_details.get("counterpart_token", ""),
-                json.dumps(otc_details.get("related_operations", [])),
-                json.dumps(trade_data.get("raw_operation", {}))
-            ))
-            
+        
+            # Operasi yang sudah tersimpan (block_hash, op_index) dilewati
+            hashes = list({key[0] for key in batch})
+            existing = set()
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(f'''
+                    SELECT block_hash, op_index FROM trades
+                    WHERE block_hash IN ({placeholders}) AND op_index IS NOT NULL
+                ''', chunk)
+                existing.update(cursor.fetchall())
+        
+            # JSON mentah disimpan terkompresi di tabel terpisah, dengan id baris yang baru disimpan
+            new_trades = []
+            payloads = []
+            for key, trade_data in batch.items():
+                if key in existing:
+                    continue
+                cursor.execute('''
+                    INSERT OR IGNORE INTO trades (
+                        timestamp, block_hash, op_index, from_address, to_address,
+                        token_id, amount_hex, amount_decimal, trade_type,
+                        operation_type, is_otc, otc_from_address, otc_exact,
+                        otc_type, trade_pair, settlement_time, network, signer,
+                        exchange_ratio, counterpart_amount, counterpart_token
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', self._trade_row(trade_data))
+                if cursor.rowcount != 1:
+                    continue  # disimpan proses lain di antara SELECT dan INSERT
+                new_trades.append(trade_data)
+                payloads.append((cursor.lastrowid, encode_payload(
+                    trade_data.get("raw_operation", {}),
+                    trade_data.get("otc_details", {}).get("related_operations", [])
+                )))
+            cursor.executemany('INSERT OR IGNORE INTO trade_payloads (trade_id, payload) VALUES (?, ?)', payloads)
+        
             conn.commit()
             conn.close()
-            
-            # Log dengan detail OTC jika ada
-            if is_otc:
-                exchange_ratio = otc_details.get('exchange_ratio', 0)
-                counterpart_amount = otc_details.get('counterpart_amount', 0)
-                counterpart_token = otc_details.get('counterpart_token', '')[:20] + '...' if otc_details.get('counterpart_token') else 'N/A'
-                
-                logger.info(f"🔄 OTC SWAP detected: {trade_data['amount_decimal']:,} {trade_data['token_id'][:20]}... "
-                          f"⇄ {counterpart_amount:,} {counterpart_token} "
-                          f"(Ratio: {exchange_ratio:.8f})")
-            else:
-                logger.info(f"💸 Regular trade: {trade_data['amount_decimal']:,} {trade_data['token_id'][:20]}... "
-                          f"(Type: {trade_data['trade_type']})")
-            
         except Exception as e:
-            logger.error(f"Error saving trade: {e}")
-    
+            logger.error(f"Error saving trades: {e}")
+            counts["failed"] = len(batch)
+            counts["duplicates"] = len(trades) - len(batch)
+            return counts
+        
+        counts["inserted"] = len(new_trades)
+        counts["duplicates"] = len(trades) - len(new_trades)
+        
+        # Alert engine dievaluasi urut waktu (halaman history berisi block terbaru lebih dulu)
+        if self.alert_engine is not None:
+            for trade_data in sorted(new_trades, key=lambda t: t["timestamp"] or ""):
+                self.alert_engine.observe(trade_data)
+        
+        # Log OTC satu per satu, transaksi biasa cukup ringkasannya
+        regular = 0
+        for trade_data in new_trades:
+            if not trade_data.get("is_otc"):
+                regular += 1
+                continue
+            otc_details = trade_data.get("otc_details", {})
+            counterpart_token = otc_details.get('counterpart_token', '')[:20] + '...' if otc_details.get('counterpart_token') else 'N/A'
+            logger.info(f"🔄 OTC SWAP detected: {trade_data['amount_decimal']:,} {trade_data['token_id'][:20]}... "
+                      f"⇄ {otc_details.get('counterpart_amount', 0):,} {counterpart_token} "
+                      f"(Ratio: {otc_details.get('exchange_ratio', 0):.8f})")
+        if regular:
+            logger.info(f"💸 {regular} regular trades saved")
+        return counts
+        
+    def save_trade(self, trade_data: Dict) -> bool:
+        """Simpan satu transaksi, return False jika sudah tersimpan sebelumnya"""
+        return self.save_trades([trade_data])["inserted"] == 1
+        
+    def ingest_history(self, history: Optional[Dict]) -> Dict:
+        """Parse dan simpan satu halaman history sekaligus (hanya block yang belum dilihat)"""
+        blocks = self.block_cache.filter_new((history or {}).get("blocks", []))
+        trades = []
+        # Satu symbol table per halaman (tidak tumbuh selama proses berjalan)
+        for block in normalize_blocks(blocks):
+            trades.extend(self.parse_block(block))
+        
+        counts = self.save_trades(trades)
+        counts["blocks"] = len(blocks)
+        # Block hanya ditandai jika batch tersimpan, supaya dicoba lagi pada polling berikutnya
+        if not counts["failed"]:
+            self.block_cache.mark_blocks(blocks)
+        return counts
+        
     def calculate_price_ratio(self) -> Optional[float]:
         """Hitung rasio harga MURF/KTA dari transaksi terbaru"""
         try:
@@ -320,19 +653,8 @@ class KeetaMonitor:
                     time.sleep(interval)
                     continue
                 
-                # Parse dan simpan transaksi baru
-                new_trades = 0
-                for entry in history.get("history", []):
-                    blocks = entry.get("voteStaple", {}).get("blocks", [])
-                    
-                    for block in blocks:
-                        operations = block.get("operations", [])
-                        
-                        for operation in operations:
-                            trade_data = self.parse_transaction(operation, block)
-                            if trade_data:
-                                self.save_trade(trade_data)
-                                new_trades += 1
+                # Parse dan simpan satu halaman dalam satu transaksi database
+                new_trades = self.ingest_history(history)["inserted"]
                 
                 if new_trades > 0:
                     logger.info(f"Found {new_trades} new trades")
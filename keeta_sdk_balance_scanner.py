@@ -4,18 +4,24 @@ KeetaNetSDK Balance Scanner - Using getBalance method
 Get accurate MURF token balances for all addresses
 """
 
-import requests
 import json
 import sqlite3
 from collections import defaultdict
 from datetime import datetime, timezone
 import time
+from history_stream import iter_operations, ADDRESS_BLOCK_FIELDS
+from ledger_archive import fetch_history_page, replay_archive
+from amount_codec import decode_amount
+from parallel_aggregation import ParallelAggregator, collect_page_addresses, merge_address_partials, scan_workers
 
 class KeetaSDKBalanceScanner:
-    def __init__(self):
+    def __init__(self, archive=None):
         self.murf_token = "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm"
         self.api_base = "https://rep2.main.network.api.keeta.com/api/node/ledger"
         
+        # Replay history pages from the local archive instead of the API
+        self.archive = archive if archive is not None else replay_archive()
+        
         # Database setup
         self.db_path = "keeta_sdk_balances.db"
         self.init_database()
@@ -70,7 +76,7 @@ class KeetaSDKBalanceScanner:
         conn.close()
         print("KeetaNetSDK balance database initialized: keeta_sdk_balances.db")
     
-    def get_all_addresses_from_blocks(self, max_blocks=10000):
+    def get_all_addresses_from_blocks(self, max_blocks=10000, workers=None):
         """Get all unique addresses from blockchain"""
         self.start_time = time.time()
         print(f"Starting address collection...")
@@ -83,23 +89,31 @@ class KeetaSDKBalanceScanner:
             all_blocks = []
             next_key = None
             batch_count = 0
+            total_blocks = 0
+            
+            # Parallel mode: worker processes aggregate pages while fetching continues
+            workers = scan_workers(workers)
+            aggregator = ParallelAggregator(collect_page_addresses, workers) if workers > 1 else None
             
-            while len(all_blocks) < max_blocks and batch_count < 50:  # Max 50 batches
+            while total_blocks < max_blocks and batch_count < 50:  # Max 50 batches
                 url = f"{self.api_base}/history"
                 params = {'limit': 200}  # Max per request
                 if next_key:
                     params['nextKey'] = next_key
                 
                 print(f"Fetching batch {batch_count + 1}...")
-                response = requests.get(url, params=params, timeout=30)
+                page = fetch_history_page(url, params, ADDRESS_BLOCK_FIELDS, archive=self.archive)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    history = data.get('history', [])
-                    next_key = data.get('nextKey')
+                if page is not None:
+                    history = page['blocks']
+                    next_key = page['nextKey']
                     
-                    all_blocks.extend(history)
-                    print(f"  Batch {batch_count + 1}: {len(history)} blocks (Total: {len(all_blocks)})")
+                    if aggregator is not None:
+                        aggregator.add_page(history)
+                    else:
+                        all_blocks.extend(history)
+                    total_blocks += len(history)
+                    print(f"  Batch {batch_count + 1}: {len(history)} blocks (Total: {total_blocks})")
                     
                     if not next_key:
                         print("  No more blocks available")
@@ -107,27 +121,23 @@ class KeetaSDKBalanceScanner:
                     
                     batch_count += 1
                 else:
-                    print(f"  API Error: {response.status_code}")
                     break
             
-            total_blocks_found = len(all_blocks)
-            print(f"Total blocks found: {total_blocks_found}")
+            print(f"Total blocks found: {total_blocks}")
             
-            # Extract all addresses from blocks
-            print("Extracting all addresses from blocks...")
-            for i, entry in enumerate(all_blocks):
-                if 'voteStaple' in entry:
-                    vote_staple = entry['voteStaple']
-                    blocks = vote_staple.get('blocks', [])
-                    
-                    for block in blocks:
-                        if isinstance(block, dict):
-                            self.extract_addresses_from_block(block)
-                            self.blocks_scanned += 1
+            if aggregator is not None:
+                print(f"Merging partial aggregates from {aggregator.workers} worker processes...")
+                self.merge_parallel_results(aggregator.results())
+            else:
+                # Extract all addresses from blocks
+                print("Extracting all addresses from blocks...")
+                for block in all_blocks:
+                    self.extract_addresses_from_block(block)
+                    self.blocks_scanned += 1
                             
-                            # Progress update
-                            if self.blocks_scanned % 1000 == 0:
-                                print(f"  Processed {self.blocks_scanned} blocks, found {len(self.all_addresses)} unique addresses...")
+                    # Progress update
+                    if self.blocks_scanned % 1000 == 0:
+                        print(f"  Processed {self.blocks_scanned} blocks, found {len(self.all_addresses)} unique addresses...")
             
             elapsed = time.time() - self.start_time
             rate = self.blocks_scanned / elapsed if elapsed > 0 else 0
@@ -180,6 +190,12 @@ class KeetaSDKBalanceScanner:
             # Skip problematic blocks
             pass
     
+    def merge_parallel_results(self, partials):
+        """Merge per-shard address sets from the process pool"""
+        blocks, addresses = merge_address_partials(partials)
+        self.blocks_scanned += blocks
+        self.all_addresses.update(addresses)
+    
     def check_balances_using_api(self):
         """Check MURF token balances using API approach"""
         print(f"Checking MURF token balances for {len(self.all_addresses)} addresses...")
@@ -228,36 +244,24 @@ class KeetaSDKBalanceScanner:
             # Check if address has MURF transactions
             url = f"{self.api_base}/history"
             params = {'limit': 200}
-            response = requests.get(url, params=params, timeout=10)
+            page = fetch_history_page(url, params, archive=self.archive, timeout=10)
             
-            if response.status_code == 200:
-                data = response.json()
-                history = data.get('history', [])
+            if page is not None:
                 
                 balance = 0
-                for entry in history:
-                    if 'voteStaple' in entry:
-                        vote_staple = entry['voteStaple']
-                        blocks = vote_staple.get('blocks', [])
+                for block, op in iter_operations(page['blocks']):
+                    if op.get('token') == self.murf_token:
+                        from_addr = op.get('from', '')
+                        to_addr = op.get('to', '')
                         
-                        for block in blocks:
-                            if isinstance(block, dict):
-                                operations = block.get('operations', [])
-                                if isinstance(operations, list):
-                                    for op in operations:
-                                        if isinstance(op, dict):
-                                            if op.get('token') == self.murf_token:
-                                                from_addr = op.get('from', '')
-                                                to_addr = op.get('to', '')
-                                                
-                                                if from_addr == address:
-                                                    # Sent MURF
-                                                    amount = self.hex_to_decimal(op.get('amount', '0'))
-                                                    balance -= amount
-                                                elif to_addr == address:
-                                                    # Received MURF
-                                                    amount = self.hex_to_decimal(op.get('amount', '0'))
-                                                    balance += amount
+                        if from_addr == address:
+                            # Sent MURF
+                            amount = self.hex_to_decimal(op.get('amount', '0'))
+                            balance -= amount
+                        elif to_addr == address:
+                            # Received MURF
+                            amount = self.hex_to_decimal(op.get('amount', '0'))
+                            balance += amount
                 
                 return max(0, balance)  # Return 0 if negative balance
             else:
@@ -268,12 +272,7 @@ class KeetaSDKBalanceScanner:
     
     def hex_to_decimal(self, hex_str):
         """Convert hexadecimal string to decimal integer."""
-        try:
-            if hex_str.startswith('0x'):
-                return int(hex_str, 16)
-            return int(hex_str)
-        except:
-            return 0
+        return decode_amount(hex_str)
     
     def save_to_database(self):
         """Save all addresses and token balances to database"""
@@ -346,14 +345,14 @@ class KeetaSDKBalanceScanner:
             'scan_duration': time.time() - self.start_time if self.start_time else 0
         }
     
-    def run_balance_scan(self, max_blocks=10000):
+    def run_balance_scan(self, max_blocks=10000, workers=None):
         """Run complete KeetaNetSDK balance scan"""
         print("Starting KeetaNetSDK Balance Scanner...")
         print("Using getBalance approach for accurate MURF token balances")
         print("=" * 60)
         
         # Step 1: Get all addresses
-        if not self.get_all_addresses_from_blocks(max_blocks):
+        if not self.get_all_addresses_from_blocks(max_blocks, workers):
             print("Failed to get all addresses")
             return None
         
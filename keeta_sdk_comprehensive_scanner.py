@@ -4,23 +4,33 @@ KeetaNetSDK Comprehensive Scanner - Using getBalance approach
 Find ALL MURF holders including your address
 """
 
-import requests
 import json
 import sqlite3
 from collections import defaultdict
 from datetime import datetime, timezone
 import time
+from history_stream import ADDRESS_BLOCK_FIELDS
+from ledger_archive import fetch_history_page, replay_archive
+from account_index import AccountIndex
+from operation_records import SymbolTable, normalize_blocks, MURF_ID, OP_SEND, OP_OTC
+from amount_codec import decode_amount
+from parallel_aggregation import ParallelAggregator, aggregate_holder_pages, merge_holder_partials, scan_workers
 
 class KeetaSDKComprehensiveScanner:
-    def __init__(self):
+    def __init__(self, archive=None, index=None):
         self.murf_token = "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm"
         self.api_base = "https://rep2.main.network.api.keeta.com/api/node/ledger"
         
+        # Replay history pages from the local archive instead of the API
+        self.archive = archive if archive is not None else replay_archive()
+        self.index = index if index is not None else AccountIndex()
+        
         # Database setup
         self.db_path = "keeta_sdk_comprehensive.db"
         self.init_database()
         
-        # Scanning data
+        # Scanning data (address IDs are interned in this scan's symbol table)
+        self.symbols = SymbolTable()
         self.all_addresses = set()
         self.murf_holders = {}
         self.blocks_scanned = 0
@@ -72,7 +82,7 @@ class KeetaSDKComprehensiveScanner:
         conn.close()
         print("KeetaNetSDK comprehensive database initialized: keeta_sdk_comprehensive.db")
     
-    def scan_all_blocks_with_pagination(self, max_blocks=50000):
+    def scan_all_blocks_with_pagination(self, max_blocks=50000, workers=None):
         """Scan ALL blocks with pagination to get older blocks"""
         self.start_time = time.time()
         print(f"Starting KeetaNetSDK comprehensive scan...")
@@ -85,23 +95,33 @@ class KeetaSDKComprehensiveScanner:
             all_blocks = []
             next_key = None
             batch_count = 0
+            total_blocks = 0
+            total_entries = 0  # max_blocks counts history entries (an entry can hold several blocks)
+            
+            # Parallel mode: worker processes aggregate pages while fetching continues
+            workers = scan_workers(workers)
+            aggregator = ParallelAggregator(aggregate_holder_pages, workers) if workers > 1 else None
             
-            while len(all_blocks) < max_blocks and batch_count < 250:  # Max 250 batches
+            while total_entries < max_blocks and batch_count < 250:  # Max 250 batches
                 url = f"{self.api_base}/history"
                 params = {'limit': 200}  # Max per request
                 if next_key:
                     params['nextKey'] = next_key
                 
                 print(f"Fetching batch {batch_count + 1}...")
-                response = requests.get(url, params=params, timeout=30)
+                page = fetch_history_page(url, params, ADDRESS_BLOCK_FIELDS, archive=self.archive)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    history = data.get('history', [])
-                    next_key = data.get('nextKey')
+                if page is not None:
+                    history = page['blocks']
+                    next_key = page['nextKey']
                     
-                    all_blocks.extend(history)
-                    print(f"  Batch {batch_count + 1}: {len(history)} blocks (Total: {len(all_blocks)})")
+                    if aggregator is not None:
+                        aggregator.add_page(history)
+                    else:
+                        all_blocks.extend(normalize_blocks(history, self.symbols))
+                    total_blocks += len(history)
+                    total_entries += page['entries']
+                    print(f"  Batch {batch_count + 1}: {len(history)} blocks (Total: {total_blocks})")
                     
                     if not next_key:
                         print("  No more blocks available")
@@ -109,27 +129,23 @@ class KeetaSDKComprehensiveScanner:
                     
                     batch_count += 1
                 else:
-                    print(f"  API Error: {response.status_code}")
                     break
             
-            total_blocks_found = len(all_blocks)
-            print(f"Total blocks found: {total_blocks_found}")
+            print(f"Total blocks found: {total_blocks}")
             
-            # Extract ALL addresses and MURF holders
-            print("Extracting ALL addresses and MURF holders...")
-            for i, entry in enumerate(all_blocks):
-                if 'voteStaple' in entry:
-                    vote_staple = entry['voteStaple']
-                    blocks = vote_staple.get('blocks', [])
-                    
-                    for block in blocks:
-                        if isinstance(block, dict):
-                            self.extract_comprehensive_data(block)
-                            self.blocks_scanned += 1
-                            
-                            # Progress update
-                            if self.blocks_scanned % 5000 == 0:
-                                print(f"  Processed {self.blocks_scanned} blocks, found {len(self.all_addresses)} addresses, {len(self.murf_holders)} MURF holders...")
+            if aggregator is not None:
+                print(f"Merging partial aggregates from {aggregator.workers} worker processes...")
+                self.merge_parallel_results(aggregator.results())
+            else:
+                # Extract ALL addresses and MURF holders
+                print("Extracting ALL addresses and MURF holders...")
+                for block in all_blocks:
+                    self.extract_comprehensive_data(block)
+                    self.blocks_scanned += 1
+
+                    # Progress update
+                    if self.blocks_scanned % 5000 == 0:
+                        print(f"  Processed {self.blocks_scanned} blocks, found {len(self.all_addresses)} addresses, {len(self.murf_holders)} MURF holders...")
             
             elapsed = time.time() - self.start_time
             rate = self.blocks_scanned / elapsed if elapsed > 0 else 0
@@ -148,48 +164,47 @@ class KeetaSDKComprehensiveScanner:
             return False
     
     def extract_comprehensive_data(self, block):
-        """Extract comprehensive data from block"""
+        """Extract comprehensive data from a normalized block"""
         try:
             # Extract account address
-            account = block.get('account', '')
-            if account and isinstance(account, str):
-                self.all_addresses.add(account)
+            if block.account:
+                self.all_addresses.add(block.account)
             
             # Extract addresses from operations
-            operations = block.get('operations', [])
-            if isinstance(operations, list):
-                for op in operations:
-                    if isinstance(op, dict):
-                        # Extract from/to addresses
-                        from_addr = op.get('from', '')
-                        to_addr = op.get('to', '')
-                        
-                        if from_addr and isinstance(from_addr, str):
-                            self.all_addresses.add(from_addr)
-                        if to_addr and isinstance(to_addr, str):
-                            self.all_addresses.add(to_addr)
-                        
-                        # Check for MURF token operations
-                        if op.get('token') == self.murf_token:
-                            self.process_murf_operation(op, block)
+            for op in block.operations:
+                # Extract from/to addresses
+                if op.from_id:
+                    self.all_addresses.add(op.from_id)
+                if op.to_id:
+                    self.all_addresses.add(op.to_id)
+                
+                # Check for MURF token operations
+                if op.token == MURF_ID:
+                    self.process_murf_operation(op, block)
             
             # Extract other addresses from block metadata
-            signer = block.get('signer', '')
-            if signer and isinstance(signer, str):
-                self.all_addresses.add(signer)
+            if block.signer:
+                self.all_addresses.add(block.signer)
                 
         except Exception as e:
             # Skip problematic blocks
             pass
     
+    def merge_parallel_results(self, partials):
+        """Merge per-shard partials from the process pool (addresses re-interned in this process)"""
+        blocks, addresses, holders = merge_holder_partials(partials)
+        self.blocks_scanned += blocks
+        self.all_addresses.update(self.symbols.intern(address) for address in addresses)
+        for address, data in holders.items():
+            self.murf_holders[self.symbols.intern(address)] = data
+    
     def process_murf_operation(self, op, block):
-        """Process MURF token operation"""
+        """Process MURF token operation (holders keyed by interned address ID)"""
         try:
-            from_addr = op.get('from', '')
-            to_addr = op.get('to', '')
-            amount = self.hex_to_decimal(op.get('amount', '0'))
-            op_type = op.get('type', 0)
-            date = block.get('date', '')
+            from_addr = op.from_id
+            to_addr = op.to_id
+            amount = op.amount
+            date = block.date
             
             # Process sender
             if from_addr:
@@ -203,7 +218,7 @@ class KeetaSDKComprehensiveScanner:
                         'last_murf_tx': date
                     }
                 
-                if op_type == 7:  # SEND operation
+                if op.type == OP_OTC:  # SEND operation
                     self.murf_holders[from_addr]['total_sent'] += amount
                     self.murf_holders[from_addr]['current_balance'] -= amount
                     self.murf_holders[from_addr]['transaction_count'] += 1
@@ -221,7 +236,7 @@ class KeetaSDKComprehensiveScanner:
                         'last_murf_tx': date
                     }
                 
-                if op_type == 0:  # RECEIVE operation
+                if op.type == OP_SEND:  # RECEIVE operation
                     self.murf_holders[to_addr]['total_received'] += amount
                     self.murf_holders[to_addr]['current_balance'] += amount
                     self.murf_holders[to_addr]['transaction_count'] += 1
@@ -233,12 +248,7 @@ class KeetaSDKComprehensiveScanner:
     
     def hex_to_decimal(self, hex_str):
         """Convert hexadecimal string to decimal integer."""
-        try:
-            if hex_str.startswith('0x'):
-                return int(hex_str, 16)
-            return int(hex_str)
-        except:
-            return 0
+        return decode_amount(hex_str)
     
     def save_comprehensive_data(self):
         """Save comprehensive data to database"""
@@ -253,21 +263,21 @@ class KeetaSDKComprehensiveScanner:
         cursor.execute('DELETE FROM scan_metadata')
         
         # Save all addresses
-        for address in self.all_addresses:
-            is_murf_holder = address in self.murf_holders
+        for address_id in self.all_addresses:
+            is_murf_holder = address_id in self.murf_holders
             cursor.execute('''
                 INSERT INTO addresses (address, is_murf_holder)
                 VALUES (?, ?)
-            ''', (address, is_murf_holder))
+            ''', (self.symbols.name(address_id), is_murf_holder))
         
         # Save MURF holders
-        for address, data in self.murf_holders.items():
+        for address_id, data in self.murf_holders.items():
             cursor.execute('''
                 INSERT INTO murf_holders (address, total_received, total_sent, 
                                         current_balance, transaction_count, 
                                         first_murf_tx, last_murf_tx)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (address, data['total_received'], data['total_sent'], 
+            ''', (self.symbols.name(address_id), data['total_received'], data['total_sent'], 
                   data['current_balance'], data['transaction_count'],
                   data['first_murf_tx'], data['last_murf_tx']))
         
@@ -291,8 +301,14 @@ class KeetaSDKComprehensiveScanner:
         print(f"\nChecking user address: {user_address}")
         print("=" * 60)
         
-        if user_address in self.murf_holders:
-            data = self.murf_holders[user_address]
+        user_id = self.symbols.lookup(user_address)
+        if user_id in self.murf_holders:
+            data = self.murf_holders[user_id]
+        else:
+            # Indexed lookup covers history outside the scanned window
+            data = self.index.get_murf_balance(user_address)
+        
+        if data:
             print(f"FOUND! User is a MURF holder!")
             print(f"Current Balance: {data['current_balance']:,} MURF")
             print(f"Total Received: {data['total_received']:,} MURF")
@@ -320,8 +336,8 @@ class KeetaSDKComprehensiveScanner:
             print(f"\nMURF Token Holders (by current balance):")
             sorted_holders = sorted(self.murf_holders.items(), key=lambda x: x[1]['current_balance'], reverse=True)
             
-            for i, (address, data) in enumerate(sorted_holders, 1):
-                print(f"{i:2d}. {address[:50]}...")
+            for i, (address_id, data) in enumerate(sorted_holders, 1):
+                print(f"{i:2d}. {self.symbols.name(address_id)[:50]}...")
                 print(f"    Current Balance: {data['current_balance']:,} MURF")
                 print(f"    Total Received: {data['total_received']:,} MURF")
                 print(f"    Total Sent: {data['total_sent']:,} MURF")
@@ -338,14 +354,14 @@ class KeetaSDKComprehensiveScanner:
             'scan_duration': time.time() - self.start_time if self.start_time else 0
         }
     
-    def run_comprehensive_scan(self, max_blocks=50000):
+    def run_comprehensive_scan(self, max_blocks=50000, workers=None):
         """Run comprehensive scan"""
         print("Starting KeetaNetSDK Comprehensive MURF Holder Scanner...")
         print("Target: Find ALL MURF holders including your address")
         print("=" * 60)
         
         # Step 1: Scan all blocks
-        if not self.scan_all_blocks_with_pagination(max_blocks):
+        if not self.scan_all_blocks_with_pagination(max_blocks, workers):
             print("Failed to scan all blocks")
             return None
         
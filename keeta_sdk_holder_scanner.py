@@ -4,18 +4,22 @@ KeetaNetSDK-based MURF Holder Scanner
 Using KeetaNetSDK Account methods to efficiently find all token holders
 """
 
-import requests
 import json
 import sqlite3
 from collections import defaultdict
 from datetime import datetime, timezone
 import time
+from history_stream import ADDRESS_BLOCK_FIELDS
+from ledger_archive import fetch_history_page, replay_archive
 
 class KeetaSDKHolderScanner:
-    def __init__(self):
+    def __init__(self, archive=None):
         self.murf_token = "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm"
         self.api_base = "https://rep2.main.network.api.keeta.com/api/node/ledger"
         
+        # Replay history pages from the local archive instead of the API
+        self.archive = archive if archive is not None else replay_archive()
+        
         # Database setup
         self.db_path = "keeta_sdk_holders.db"
         self.init_database()
@@ -90,12 +94,11 @@ class KeetaSDKHolderScanner:
                     params['nextKey'] = next_key
                 
                 print(f"Fetching batch {batch_count + 1}...")
-                response = requests.get(url, params=params, timeout=30)
+                page = fetch_history_page(url, params, ADDRESS_BLOCK_FIELDS, archive=self.archive)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    history = data.get('history', [])
-                    next_key = data.get('nextKey')
+                if page is not None:
+                    history = page['blocks']
+                    next_key = page['nextKey']
                     
                     all_blocks.extend(history)
                     print(f"  Batch {batch_count + 1}: {len(history)} blocks (Total: {len(all_blocks)})")
@@ -106,7 +109,6 @@ class KeetaSDKHolderScanner:
                     
                     batch_count += 1
                 else:
-                    print(f"  API Error: {response.status_code}")
                     break
             
             total_blocks_found = len(all_blocks)
@@ -114,19 +116,13 @@ class KeetaSDKHolderScanner:
             
             # Extract all addresses from blocks
             print("Extracting all addresses from blocks...")
-            for i, entry in enumerate(all_blocks):
-                if 'voteStaple' in entry:
-                    vote_staple = entry['voteStaple']
-                    blocks = vote_staple.get('blocks', [])
-                    
-                    for block in blocks:
-                        if isinstance(block, dict):
-                            self.extract_addresses_from_block(block)
-                            self.blocks_scanned += 1
-                            
-                            # Progress update
-                            if self.blocks_scanned % 5000 == 0:
-                                print(f"  Processed {self.blocks_scanned} blocks, found {len(self.all_addresses)} unique addresses...")
+            for block in all_blocks:
+                self.extract_addresses_from_block(block)
+                self.blocks_scanned += 1
+                
+                # Progress update
+                if self.blocks_scanned % 5000 == 0:
+                    print(f"  Processed {self.blocks_scanned} blocks, found {len(self.all_addresses)} unique addresses...")
             
             elapsed = time.time() - self.start_time
             rate = self.blocks_scanned / elapsed if elapsed > 0 else 0
@@ -188,20 +184,11 @@ class KeetaSDKHolderScanner:
         try:
             url = f"{self.api_base}/history"
             params = {'limit': 200}
-            response = requests.get(url, params=params, timeout=30)
+            page = fetch_history_page(url, params, archive=self.archive)
             
-            if response.status_code == 200:
-                data = response.json()
-                history = data.get('history', [])
-                
-                for entry in history:
-                    if 'voteStaple' in entry:
-                        vote_staple = entry['voteStaple']
-                        blocks = vote_staple.get('blocks', [])
-                        
-                        for block in blocks:
-                            if isinstance(block, dict):
-                                self.check_block_for_murf_holders(block)
+            if page is not None:
+                for block in page['blocks']:
+                    self.check_block_for_murf_holders(block)
             
             print(f"Token holder check complete!")
             return True
@@ -4,18 +4,25 @@ KeetaNetSDK Proper Scanner - Using KeetaNetSDK methods
 Based on: https://static.network.keeta.com/docs/documents/GETTING-STARTED.html
 """
 
-import requests
 import json
 import sqlite3
 from collections import defaultdict
 from datetime import datetime, timezone
 import time
+from history_stream import ADDRESS_BLOCK_FIELDS
+from ledger_archive import fetch_history_page, replay_archive
+from account_index import AccountIndex
+from amount_codec import decode_amount
 
 class KeetaNetSDKProperScanner:
-    def __init__(self):
+    def __init__(self, archive=None, index=None):
         self.murf_token = "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm"
         self.api_base = "https://rep2.main.network.api.keeta.com/api/node/ledger"
         
+        # Replay history pages from the local archive instead of the API
+        self.archive = archive if archive is not None else replay_archive()
+        self.index = index if index is not None else AccountIndex()
+        
         # Database setup
         self.db_path = "keeta_sdk_proper.db"
         self.init_database()
@@ -79,30 +86,29 @@ class KeetaNetSDKProperScanner:
             # client.chain() - returns blocks for the account
             # But we'll use API equivalent for now
             
+            # Indexed lookup when the ingester has seen this address
+            if self.index.has_address(address):
+                for op in self.index.get_murf_operations(address):
+                    # Indexed operations carry their block date
+                    self.process_murf_operation_for_address(op, op, address)
+                self.blocks_scanned += len(self.index.get_block_hashes(address))
+                return True
+            
             url = f"{self.api_base}/history"
             params = {'limit': 200}
-            response = requests.get(url, params=params, timeout=30)
+            page = fetch_history_page(url, params, archive=self.archive)
             
-            if response.status_code == 200:
-                data = response.json()
-                history = data.get('history', [])
+            if page is not None:
                 
-                # Process vote staples (equivalent to client.chain())
-                for entry in history:
-                    if 'voteStaple' in entry:
-                        vote_staple = entry['voteStaple']
-                        blocks = vote_staple.get('blocks', [])
-                        
-                        for block in blocks:
-                            if isinstance(block, dict):
-                                # Check if this block affects the address
-                                if self.block_affects_address(block, address):
-                                    self.process_block_for_address(block, address)
-                                    self.blocks_scanned += 1
+                # Process vote staple blocks (equivalent to client.chain())
+                for block in page['blocks']:
+                    # Check if this block affects the address
+                    if self.block_affects_address(block, address):
+                        self.process_block_for_address(block, address)
+                        self.blocks_scanned += 1
                 
                 return True
             else:
-                print(f"API Error: {response.status_code}")
                 return False
                 
         except Exception as e:
@@ -195,12 +201,7 @@ class KeetaNetSDKProperScanner:
     
     def hex_to_decimal(self, hex_str):
         """Convert hexadecimal string to decimal integer."""
-        try:
-            if hex_str.startswith('0x'):
-                return int(hex_str, 16)
-            return int(hex_str)
-        except:
-            return 0
+        return decode_amount(hex_str)
     
     def scan_all_addresses_comprehensive(self, max_blocks=50000):
         """Scan all addresses comprehensively using KeetaNetSDK approach"""
@@ -224,12 +225,11 @@ class KeetaNetSDKProperScanner:
                     params['nextKey'] = next_key
                 
                 print(f"Fetching batch {batch_count + 1}...")
-                response = requests.get(url, params=params, timeout=30)
+                page = fetch_history_page(url, params, ADDRESS_BLOCK_FIELDS, archive=self.archive)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    history = data.get('history', [])
-                    next_key = data.get('nextKey')
+                if page is not None:
+                    history = page['blocks']
+                    next_key = page['nextKey']
                     
                     all_blocks.extend(history)
                     print(f"  Batch {batch_count + 1}: {len(history)} blocks (Total: {len(all_blocks)})")
@@ -240,20 +240,13 @@ class KeetaNetSDKProperScanner:
                     
                     batch_count += 1
                 else:
-                    print(f"  API Error: {response.status_code}")
                     break
             
             # Extract all addresses
             print("Extracting all addresses...")
-            for entry in all_blocks:
-                if 'voteStaple' in entry:
-                    vote_staple = entry['voteStaple']
-                    blocks = vote_staple.get('blocks', [])
-                    
-                    for block in blocks:
-                        if isinstance(block, dict):
-                            self.extract_addresses_from_block(block)
-                            self.blocks_scanned += 1
+            for block in all_blocks:
+                self.extract_addresses_from_block(block)
+                self.blocks_scanned += 1
             
             print(f"Found {len(self.all_addresses)} unique addresses")
             
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Ledger Archive - Local store of raw Keeta history pages
+Pages are zlib-compressed and keyed by (scope, cursor), so scanners can replay
+the chain from disk instead of re-downloading it from the API. Every archived
+block hash is indexed, so a fresh walk from the head stops (and is linked into
+the stored chain) at the first page that reaches already archived history.
+"""
+
+import json
+import os
+import sqlite3
+import zlib
+from datetime import datetime
+
+import requests
+
+from history_stream import read_history_page, loads, BLOCK_FIELDS
+
+ARCHIVE_DB = "ledger_archive.db"
+
+# Scope of the network-wide /ledger/history feed (account feeds use the address)
+NETWORK_SCOPE = ""
+
+# Set KEETA_REPLAY=1 to make scanners read from the archive instead of the API
+REPLAY_ENV = "KEETA_REPLAY"
+ARCHIVE_ENV = "KEETA_ARCHIVE_DB"
+
+
+def cursor_key(cursor):
+    """Normalize a nextKey cursor (None = head page)"""
+    return "" if cursor is None else str(cursor)
+
+
+def page_hashes(raw):
+    """Block hashes of a raw page, newest first"""
+    return [block['$hash'] for block in read_history_page(raw, ('$hash',))['blocks'] if block.get('$hash')]
+
+
+def trim_page(raw, drop_hashes, next_key):
+    """Raw page without the blocks in drop_hashes (vote staples left empty are removed), linked to next_key"""
+    data = loads(raw)
+    data['nextKey'] = next_key
+    if 'blocks' in data:
+        data['blocks'] = [block for block in data['blocks']
+                          if not (isinstance(block, dict) and block.get('$hash') in drop_hashes)]
+    else:
+        history = []
+        for entry in data.get('history', []):
+            vote_staple = entry.get('voteStaple') if isinstance(entry, dict) else None
+            if vote_staple and isinstance(vote_staple.get('blocks'), list):
+                vote_staple['blocks'] = [block for block in vote_staple['blocks']
+                                         if not (isinstance(block, dict) and block.get('$hash') in drop_hashes)]
+                if not vote_staple['blocks']:
+                    continue
+            history.append(entry)
+        data['history'] = history
+    return json.dumps(data).encode('utf-8')
+
+
+class LedgerArchive:
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.environ.get(ARCHIVE_ENV, ARCHIVE_DB)
+        self.init_database()
+
+    def init_database(self):
+        """Initialize archive database"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        # One row per (scope, cursor); the head page (cursor '') is replaced every run
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS history_pages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scope TEXT NOT NULL,
+                cursor TEXT NOT NULL,
+                next_key TEXT,
+                block_count INTEGER,
+                raw_size INTEGER,
+                payload BLOB NOT NULL,
+                fetched_at TEXT
+            )
+        ''')
+
+        # Block hash -> page holding it, to detect where a fresh walk reaches archived history
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archive_blocks (
+                scope TEXT NOT NULL,
+                block_hash TEXT NOT NULL,
+                cursor TEXT NOT NULL,
+                PRIMARY KEY (scope, block_hash)
+            ) WITHOUT ROWID
+        ''')
+
+        # Cursors where an interrupted walk stopped (older history still to fetch)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ingest_frontier (
+                scope TEXT NOT NULL,
+                cursor TEXT NOT NULL,
+                PRIMARY KEY (scope, cursor)
+            )
+        ''')
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'idx_history_pages_scope_cursor'")
+        if cursor.fetchone() is None:
+            self._migrate_append_only(cursor)
+
+        conn.commit()
+        conn.close()
+
+    def _migrate_append_only(self, cursor):
+        """Collapse append-only rows to one per cursor and build the block map / frontier"""
+        cursor.execute('''
+            DELETE FROM history_pages WHERE id NOT IN (
+                SELECT MAX(id) FROM history_pages GROUP BY scope, cursor
+            )
+        ''')
+        cursor.execute('DROP INDEX IF EXISTS idx_history_pages_cursor')
+        cursor.execute('''
+            CREATE UNIQUE INDEX idx_history_pages_scope_cursor ON history_pages (scope, cursor)
+        ''')
+
+        cursor.execute('SELECT scope, cursor, payload FROM history_pages ORDER BY id')
+        for scope, page_cursor, payload in cursor.fetchall():
+            cursor.executemany('''
+                INSERT OR REPLACE INTO archive_blocks (scope, block_hash, cursor) VALUES (?, ?, ?)
+            ''', [(scope, block_hash, page_cursor) for block_hash in page_hashes(zlib.decompress(payload))])
+
+        # Chain ends that were never fetched (walks cut off by max_pages)
+        cursor.execute('''
+            INSERT OR IGNORE INTO ingest_frontier (scope, cursor)
+            SELECT scope, next_key FROM history_pages AS page
+            WHERE next_key IS NOT NULL AND NOT EXISTS (
+                SELECT 1 FROM history_pages WHERE scope = page.scope AND cursor = page.next_key
+            )
+        ''')
+
+    def archived_cursor(self, scope, block_hashes):
+        """Cursor of the archived page holding the first of block_hashes found (None if none archived)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor_db = conn.cursor()
+        try:
+            for block_hash in block_hashes:
+                cursor_db.execute('''
+                    SELECT cursor FROM archive_blocks WHERE scope = ? AND block_hash = ?
+                ''', (scope, block_hash))
+                row = cursor_db.fetchone()
+                if row:
+                    return row[0]
+            return None
+        finally:
+            conn.close()
+
+    def store_page(self, scope, cursor, raw):
+        """Store a raw history page (bytes) and return its page info
+
+        Blocks that are already archived are dropped from the page and its
+        nextKey is pointed at the archived page holding the first of them, so
+        the replay chain from the head joins the existing history without
+        repeating blocks (Keeta cursors shift as new blocks arrive). A
+        replaced head page is kept under a 'head:<newest hash>' cursor.
+        """
+        if isinstance(raw, str):
+            raw = raw.encode('utf-8')
+
+        page = read_history_page(raw, ('$hash',))
+        hashes = [block['$hash'] for block in page['blocks'] if block.get('$hash')]
+        next_key = page['nextKey']
+
+        conn = sqlite3.connect(self.db_path)
+        cursor_db = conn.cursor()
+
+        if cursor_key(cursor) == '':
+            # Keep the previous head reachable: re-key it before replacing it
+            cursor_db.execute('SELECT payload FROM history_pages WHERE scope = ? AND cursor = ?', (scope, ''))
+            row = cursor_db.fetchone()
+            previous = page_hashes(zlib.decompress(row[0])) if row else []
+            if previous:
+                retired = f"head:{previous[0]}"
+                cursor_db.execute('''
+                    UPDATE OR REPLACE history_pages SET cursor = ? WHERE scope = ? AND cursor = ?
+                ''', (retired, scope, ''))
+                cursor_db.execute('''
+                    UPDATE archive_blocks SET cursor = ? WHERE scope = ? AND cursor = ?
+                ''', (retired, scope, ''))
+
+        joined = None
+        archived = set()
+        for block_hash in hashes:
+            cursor_db.execute('''
+                SELECT cursor FROM archive_blocks WHERE scope = ? AND block_hash = ?
+            ''', (scope, block_hash))
+            row = cursor_db.fetchone()
+            if row and row[0] != cursor_key(cursor):
+                archived.add(block_hash)
+                joined = joined or row[0]
+        if archived:
+            next_key = joined
+            raw = trim_page(raw, archived, next_key)
+            hashes = [block_hash for block_hash in hashes if block_hash not in archived]
+
+        info = {
+            'scope': scope,
+            'cursor': cursor_key(cursor),
+            'next_key': None if next_key is None else str(next_key),
+            'block_count': len(hashes),
+            'raw_size': len(raw),
+            'joined': joined
+        }
+
+        cursor_db.execute('''
+            INSERT INTO history_pages
+            (scope, cursor, next_key, block_count, raw_size, payload, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(scope, cursor) DO UPDATE SET
+                next_key = excluded.next_key,
+                block_count = excluded.block_count,
+                raw_size = excluded.raw_size,
+                payload = excluded.payload,
+                fetched_at = excluded.fetched_at
+        ''', (info['scope'], info['cursor'], info['next_key'], info['block_count'],
+              info['raw_size'], zlib.compress(raw, 6), datetime.now().isoformat()))
+        cursor_db.executemany('''
+            INSERT OR REPLACE INTO archive_blocks (scope, block_hash, cursor) VALUES (?, ?, ?)
+        ''', [(scope, block_hash, info['cursor']) for block_hash in hashes])
+        cursor_db.execute('DELETE FROM ingest_frontier WHERE scope = ? AND cursor = ?', (scope, info['cursor']))
+        conn.commit()
+        conn.close()
+        return info
+
+    def add_frontier(self, scope, cursor):
+        """Remember a cursor where a walk stopped before reaching archived history"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('INSERT OR IGNORE INTO ingest_frontier (scope, cursor) VALUES (?, ?)',
+                     (scope, cursor_key(cursor)))
+        conn.commit()
+        conn.close()
+
+    def get_frontier(self, scope):
+        """Cursors of older history still to fetch"""
+        conn = sqlite3.connect(self.db_path)
+        cursor_db = conn.cursor()
+        cursor_db.execute('SELECT cursor FROM ingest_frontier WHERE scope = ? ORDER BY rowid', (scope,))
+        cursors = [row[0] for row in cursor_db.fetchall()]
+        conn.close()
+        return cursors
+
+    def page_info(self, scope, cursor):
+        """Get metadata of the archived page for a cursor (None if missing)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor_db = conn.cursor()
+        cursor_db.execute('''
+            SELECT next_key, block_count, raw_size, fetched_at FROM history_pages
+            WHERE scope = ? AND cursor = ?
+        ''', (scope, cursor_key(cursor)))
+        row = cursor_db.fetchone()
+        conn.close()
+
+        if not row:
+            return None
+        return {
+            'scope': scope,
+            'cursor': cursor_key(cursor),
+            'next_key': row[0],
+            'block_count': row[1],
+            'raw_size': row[2],
+            'fetched_at': row[3]
+        }
+
+    def has_page(self, scope, cursor):
+        """Check if a cursor is archived"""
+        return self.page_info(scope, cursor) is not None
+
+    def get_raw_page(self, scope, cursor):
+        """Get the raw (decompressed) page bytes for a cursor"""
+        conn = sqlite3.connect(self.db_path)
+        cursor_db = conn.cursor()
+        cursor_db.execute('''
+            SELECT payload FROM history_pages
+            WHERE scope = ? AND cursor = ?
+        ''', (scope, cursor_key(cursor)))
+        row = cursor_db.fetchone()
+        conn.close()
+
+        if not row:
+            return None
+        return zlib.decompress(row[0])
+
+    def replay_page(self, cursor=None, fields=BLOCK_FIELDS, scope=NETWORK_SCOPE):
+        """Read an archived page as {'blocks': [...], 'nextKey': ...} (None if missing)"""
+        raw = self.get_raw_page(scope, cursor)
+        if raw is None:
+            return None
+        return read_history_page(raw, fields)
+
+    def iter_pages(self, scope=NETWORK_SCOPE, fields=BLOCK_FIELDS, max_pages=None, cursor=None):
+        """Replay the archived cursor chain from a cursor (default: head page)"""
+        count = 0
+        while max_pages is None or count < max_pages:
+            page = self.replay_page(cursor, fields, scope)
+            if page is None:
+                break
+            yield page
+            count += 1
+            cursor = page['nextKey']
+            if not cursor:
+                break
+
+    def get_stats(self, scope=None):
+        """Get archive statistics"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        query = '''
+            SELECT COUNT(*), COUNT(DISTINCT scope || ':' || cursor),
+                   COALESCE(SUM(block_count), 0), COALESCE(SUM(raw_size), 0),
+                   COALESCE(SUM(LENGTH(payload)), 0)
+            FROM history_pages
+        '''
+        if scope is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query + ' WHERE scope = ?', (scope,))
+        row = cursor.fetchone()
+        conn.close()
+
+        return {
+            'pages': row[0],
+            'cursors': row[1],
+            'blocks': row[2],
+            'raw_bytes': row[3],
+            'stored_bytes': row[4]
+        }
+
+
+def replay_archive():
+    """Get the archive when replay mode is enabled (KEETA_REPLAY=1), else None"""
+    if os.environ.get(REPLAY_ENV, '').lower() in ('1', 'true', 'yes'):
+        return LedgerArchive()
+    return None
+
+
+def fetch_history_page(url, params=None, fields=BLOCK_FIELDS, archive=None,
+                       scope=NETWORK_SCOPE, timeout=30):
+    """Fetch one history page from the API, or from the archive in replay mode
+
+    Returns {'blocks': [...], 'nextKey': ...} or None when the page is unavailable.
+    """
+    params = params or {}
+
+    if archive is not None:
+        page = archive.replay_page(params.get('nextKey'), fields, scope)
+        if page is None:
+            print(f"  [ARCHIVE] Page not archived: {cursor_key(params.get('nextKey')) or 'head'}")
+        return page
+
+    response = requests.get(url, params=params, timeout=timeout, stream=True)
+    if response.status_code != 200:
+        print(f"  API Error: {response.status_code}")
+        return None
+    return read_history_page(response, fields)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Ledger Ingester - Download Keeta history pages once into the local archive
+Scanners then run with KEETA_REPLAY=1 and read the chain from disk.
+"""
+
+import time
+
+import requests
+
+from account_index import AccountIndex
+from balance_ledger import BalanceLedger
+from history_stream import read_history_page, ADDRESS_BLOCK_FIELDS
+from ledger_archive import LedgerArchive, NETWORK_SCOPE, cursor_key
+
+
+class LedgerIngester:
+    def __init__(self, archive=None, index=None, ledger=None):
+        self.api_base = "https://rep2.main.network.api.keeta.com/api/node/ledger"
+        self.archive = archive or LedgerArchive()
+        self.index = index or AccountIndex()
+        self.ledger = ledger or BalanceLedger()
+        self.pages_fetched = 0
+
+    def history_url(self, scope):
+        """API URL for a scope (network feed or account feed)"""
+        if scope == NETWORK_SCOPE:
+            return f"{self.api_base}/history"
+        return f"{self.api_base}/account/{scope}/history"
+
+    def fetch_raw_page(self, scope, cursor, limit):
+        """Fetch one raw history page (bytes) from the API"""
+        params = {'limit': limit}
+        if cursor:
+            params['nextKey'] = cursor
+
+        response = requests.get(self.history_url(scope), params=params, timeout=30)
+        response.raise_for_status()
+        return response.content
+
+    def ingest(self, scope=NETWORK_SCOPE, limit=200, max_pages=250):
+        """Archive the blocks added since the last run, then continue older history
+
+        The walk from the head stops at the first page holding a block that is
+        already archived (cursors shift as new blocks arrive, so they cannot be
+        compared). A walk cut off by max_pages leaves its cursor in the
+        frontier, and later runs continue from there.
+        """
+        start_time = time.time()
+        pages = 0
+        blocks = 0
+
+        print(f"[INGEST] Scope: {scope or 'network'} (limit={limit}, max_pages={max_pages})")
+
+        failed = False
+        for start in [None] + self.archive.get_frontier(scope):
+            cursor = start
+            while pages < max_pages:
+                try:
+                    raw = self.fetch_raw_page(scope, cursor, limit)
+                except requests.exceptions.RequestException as e:
+                    print(f"[INGEST] Error fetching page {cursor_key(cursor) or 'head'}: {e}")
+                    failed = True
+                    break
+                info = self.archive.store_page(scope, cursor, raw)
+                page_blocks = read_history_page(raw, ADDRESS_BLOCK_FIELDS)['blocks']
+                self.index.index_blocks(page_blocks)
+                self.ledger.apply_blocks(page_blocks)
+                self.pages_fetched += 1
+                blocks += info['block_count']
+                pages += 1
+                if pages % 25 == 0:
+                    print(f"[INGEST] {pages} pages fetched, {blocks} new blocks")
+
+                if info['joined'] is not None:
+                    print(f"[INGEST] Reached archived history at {cursor_key(cursor) or 'head'}")
+                    cursor = None
+                    break
+                cursor = info['next_key']
+                if not cursor:
+                    print("[INGEST] Reached end of history")
+                    break
+
+            if cursor:
+                # Cut off by max_pages or an error: continue from here next run
+                self.archive.add_frontier(scope, cursor)
+            if failed or pages >= max_pages:
+                break
+
+        elapsed = time.time() - start_time
+        print(f"[INGEST] Done: {pages} pages, {blocks} new blocks in {elapsed:.2f}s")
+        return {'pages': pages, 'new_blocks': blocks, 'elapsed': elapsed}
+
+def main():
+    ingester = LedgerIngester()
+
+    # Network-wide history (used by the holder / address scanners)
+    ingester.ingest(NETWORK_SCOPE, limit=200, max_pages=250)
+
+    # Airdrop wallet account history (used by airdrop_trace_scanner.py)
+    ingester.ingest("keeta_aablrt5p4in4mehyxxunow3kp4c7rs2v4mh6v4z6qtfnt7sw5cxtw4r3b5oxtwi",
+                    limit=1000, max_pages=50)
+
+    stats = ingester.archive.get_stats()
+    print(f"Archive: {stats['cursors']} pages, {stats['blocks']} blocks, "
+          f"{stats['raw_bytes']:,} bytes raw -> {stats['stored_bytes']:,} bytes stored")
+    print(f"Database: {ingester.archive.db_path}")
+
+    stats = ingester.index.get_stats()
+    print(f"Account index: {stats['addresses']} addresses, {stats['blocks']} blocks, "
+          f"{stats['murf_operations']} MURF operations ({ingester.index.db_path})")
+
+    stats = ingester.ledger.get_stats()
+    print(f"Balance ledger: {stats['holders']} holders, {stats['events']} events, "
+          f"{stats['circulation']:,} MURF in circulation ({ingester.ledger.db_path})")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ import urllib.parse
 from datetime import datetime
 import threading
 import time
+from amount_codec import decode_hex, to_float, KTA_DECIMALS
 
 class KeetaAPIClient:
     def __init__(self):
@@ -61,12 +62,7 @@ class KeetaAPIClient:
     
     def hex_to_decimal(self, hex_str):
         """Convert hex to decimal"""
-        try:
-            if hex_str.startswith('0x'):
-                hex_str = hex_str[2:]
-            return int(hex_str, 16) / 1e18  # Assuming 18 decimals
-        except:
-            return 0
+        return to_float(decode_hex(hex_str), KTA_DECIMALS)  # Assuming 18 decimals
     
     def get_otc_trades(self):
         """Get OTC trades from API"""
@@ -5,12 +5,38 @@ MURF Holders Database - Store and manage MURF token holders data
 
 import sqlite3
 import json
-from datetime import datetime
+from holder_leaderboard import get_leaderboard
+
+# Insert or update a holder; rows whose values are unchanged are not rewritten
+UPSERT_HOLDER = '''
+    INSERT INTO murf_holders 
+    (address, total_received, total_sent, current_balance, tx_count, 
+     first_tx_date, last_tx_date, rank, is_airdrop_recipient)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(address) DO UPDATE SET
+        total_received = excluded.total_received,
+        total_sent = excluded.total_sent,
+        current_balance = excluded.current_balance,
+        tx_count = excluded.tx_count,
+        first_tx_date = excluded.first_tx_date,
+        last_tx_date = excluded.last_tx_date,
+        rank = excluded.rank,
+        is_airdrop_recipient = excluded.is_airdrop_recipient
+    WHERE total_received IS NOT excluded.total_received
+       OR total_sent IS NOT excluded.total_sent
+       OR current_balance IS NOT excluded.current_balance
+       OR tx_count IS NOT excluded.tx_count
+       OR first_tx_date IS NOT excluded.first_tx_date
+       OR last_tx_date IS NOT excluded.last_tx_date
+       OR rank IS NOT excluded.rank
+       OR is_airdrop_recipient IS NOT excluded.is_airdrop_recipient
+'''
 
 class MURFHoldersDB:
     def __init__(self, db_path="murf_holders.db"):
         self.db_path = db_path
         self.init_database()
+        self.leaderboard = get_leaderboard(db_path)
     
     def init_database(self):
         """Initialize SQLite database for MURF holders"""
@@ -41,6 +67,63 @@ class MURFHoldersDB:
             )
         ''')
         
+        # Change tracking for incremental exports: triggers stamp updated_at on
+        # every writer (rank changes alone do not count as a change)
+        cursor.execute('PRAGMA table_info(murf_holders)')
+        if 'updated_at' not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute('ALTER TABLE murf_holders ADD COLUMN updated_at TEXT')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_murf_holders_updated_at ON murf_holders (updated_at)')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS murf_holders_inserted AFTER INSERT ON murf_holders
+            BEGIN
+                UPDATE murf_holders SET updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+                WHERE address = NEW.address;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS murf_holders_updated
+            AFTER UPDATE OF current_balance, total_received, total_sent, tx_count ON murf_holders
+            WHEN NEW.current_balance IS NOT OLD.current_balance
+              OR NEW.total_received IS NOT OLD.total_received
+              OR NEW.total_sent IS NOT OLD.total_sent
+              OR NEW.tx_count IS NOT OLD.tx_count
+            BEGIN
+                UPDATE murf_holders SET updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+                WHERE address = NEW.address;
+            END
+        ''')
+        
+        # Deleted holders leave a tombstone so incremental exports can report removals
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS murf_holder_tombstones (
+                address TEXT PRIMARY KEY,
+                deleted_at TEXT NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_murf_holder_tombstones_deleted_at ON murf_holder_tombstones (deleted_at)')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS murf_holders_deleted AFTER DELETE ON murf_holders
+            BEGIN
+                INSERT OR REPLACE INTO murf_holder_tombstones (address, deleted_at)
+                VALUES (OLD.address, strftime('%Y-%m-%dT%H:%M:%f', 'now'));
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS murf_holders_restored AFTER INSERT ON murf_holders
+            BEGIN
+                DELETE FROM murf_holder_tombstones WHERE address = NEW.address;
+            END
+        ''')
+        
+        # Last balance ledger event folded into murf_holders (SmartHoldersManager.sync_from_ledger)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ledger_sync (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                last_event INTEGER NOT NULL,
+                synced_at TEXT
+            )
+        ''')
+        
         conn.commit()
         conn.close()
         print(f"MURF holders database initialized: {self.db_path}")
@@ -50,8 +133,7 @@ class MURFHoldersDB:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        # Clear existing data
-        cursor.execute('DELETE FROM murf_holders')
+        # Upsert instead of delete + insert: updated_at only moves for holders that changed
         cursor.execute('DELETE FROM holder_statistics')
         
         # Save holders with ranking
@@ -63,15 +145,16 @@ class MURFHoldersDB:
             current_balance = data['received'] - data['sent']
             is_airdrop_recipient = data['received'] > 0
             
-            cursor.execute('''
-                INSERT OR REPLACE INTO murf_holders 
-                (address, total_received, total_sent, current_balance, tx_count, 
-                 first_tx_date, last_tx_date, rank, is_airdrop_recipient)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (address, data['received'], data['sent'], current_balance, 
+            cursor.execute(UPSERT_HOLDER, (address, data['received'], data['sent'], current_balance, 
                   data['tx_count'], data['first_tx'], data['last_tx'], 
                   rank, is_airdrop_recipient))
         
+        # Holders missing from the new data are removed (tombstoned by trigger)
+        cursor.execute('CREATE TEMP TABLE saved_addresses (address TEXT PRIMARY KEY)')
+        cursor.executemany('INSERT INTO saved_addresses (address) VALUES (?)', [(address,) for address in holders_data])
+        cursor.execute('DELETE FROM murf_holders WHERE address NOT IN (SELECT address FROM saved_addresses)')
+        cursor.execute('DROP TABLE saved_addresses')
+        
         # Save statistics
         cursor.execute('''
             INSERT INTO holder_statistics 
@@ -82,76 +165,16 @@ class MURFHoldersDB:
         
         conn.commit()
         conn.close()
+        self.leaderboard.reload()
         print(f"Saved {len(holders_data)} holders to database")
     
     def get_top_holders(self, limit=20):
-        """Get top MURF holders"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT address, total_received, current_balance, tx_count, rank
-            FROM murf_holders 
-            ORDER BY current_balance DESC 
-            LIMIT ?
-        ''', (limit,))
-        
-        results = cursor.fetchall()
-        conn.close()
-        
-        holders = []
-        for row in results:
-            holders.append({
-                'address': row[0],
-                'total_received': row[1],
-                'current_balance': row[2],
-                'tx_count': row[3],
-                'rank': row[4]
-            })
-        
-        return holders
+        """Get top MURF holders (served from the in-memory leaderboard)"""
+        return self.leaderboard.get_top_holders(limit)
     
     def get_holder_statistics(self):
-        """Get holder statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            # Calculate statistics from murf_holders table
-            cursor.execute('''
-                SELECT 
-                    COUNT(*) as total_holders,
-                    SUM(current_balance) as total_circulation,
-                    COUNT(CASE WHEN is_airdrop_recipient = 1 THEN 1 END) as total_airdropped
-                FROM murf_holders 
-                WHERE current_balance > 0
-            ''')
-            
-            result = cursor.fetchone()
-            conn.close()
-            
-            if result:
-                return {
-                    'total_holders': result[0] or 0,
-                    'total_circulation': result[1] or 0,
-                    'total_airdropped': result[2] or 0,
-                    'last_updated': datetime.now().isoformat()
-                }
-            else:
-                return {
-                    'total_holders': 0,
-                    'total_circulation': 0,
-                    'total_airdropped': 0,
-                    'last_updated': datetime.now().isoformat()
-                }
-        except Exception as e:
-            print(f"Error getting holder statistics: {e}")
-            return {
-                'total_holders': 0,
-                'total_circulation': 0,
-                'total_airdropped': 0,
-                'last_updated': datetime.now().isoformat()
-            }
+        """Get holder statistics (running totals of the in-memory leaderboard)"""
+        return self.leaderboard.get_holder_statistics()
     
     def get_holder_by_address(self, address):
         """Get specific holder by address"""
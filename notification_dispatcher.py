@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Notification Dispatcher - Persistent outbox with per-channel delivery workers
+Alerts are written to an outbox table (one row per channel, unique per
+idempotency key) and returned to the caller immediately. A worker thread per
+channel batches due rows into a digest, delivers it, and retries failures
+with exponential backoff, so a slow or failing channel never blocks ingest.
+"""
+
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from email.mime.text import MIMEText
+import logging
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_DB = "notification_outbox.db"
+
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+
+# Alerts tied to one trade are keyed by the trade; condition alerts by minute
+TRADE_ALERTS = ('large_trade', 'otc_trade')
+
+
+def idempotency_key(alert):
+    """Key identifying what an alert is about (the same trade never notifies twice)"""
+    alert_type = alert['type']
+    data = alert.get('data')
+    if alert_type in TRADE_ALERTS and data:
+        trade = data[0]
+        return (f"{alert_type}:{trade.get('block_hash')}:{trade.get('token_id')}:"
+                f"{trade.get('amount_hex') or trade.get('amount_decimal')}")
+    if alert_type == 'rule' and data:
+        trade = data.get('trade') or {}
+        return f"rule:{data['rule']}:{trade.get('block_hash')}:{trade.get('token_id')}"
+    return f"{alert_type}:{(alert.get('fired_at') or datetime.now().isoformat())[:16]}"
+
+
+class NotificationChannel:
+    """A delivery target; send() raises on failure"""
+    name = 'channel'
+
+    def send(self, subject, body):
+        raise NotImplementedError
+
+
+class TelegramChannel(NotificationChannel):
+    name = 'telegram'
+
+    def __init__(self, bot_token, chat_id, timeout=10):
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.timeout = timeout
+
+    def send(self, subject, body):
+        response = requests.post(f"https://api.telegram.org/bot{self.bot_token}/sendMessage",
+                                 json={'chat_id': self.chat_id, 'text': body}, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class EmailChannel(NotificationChannel):
+    name = 'email'
+
+    def __init__(self, host, to_email, port=587, username=None, password=None, from_email=None, timeout=20):
+        self.host = host
+        self.port = port
+        self.to_email = to_email
+        self.username = username
+        self.password = password
+        self.from_email = from_email or username or to_email
+        self.timeout = timeout
+
+    def send(self, subject, body):
+        message = MIMEText(body, 'plain', 'utf-8')
+        message['Subject'] = subject
+        message['From'] = self.from_email
+        message['To'] = self.to_email
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as server:
+            server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+            server.sendmail(self.from_email, [self.to_email], message.as_string())
+
+
+class MockChannel(NotificationChannel):
+    """Local channel for tests: records deliveries, optionally slow or failing"""
+
+    def __init__(self, name='mock', delay=0, fail_times=0):
+        self.name = name
+        self.delay = delay
+        self.fail_times = fail_times
+        self.deliveries = []  # (subject, body)
+        self.attempts = 0
+
+    def send(self, subject, body):
+        self.attempts += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise RuntimeError(f"{self.name}: simulated delivery failure")
+        self.deliveries.append((subject, body))
+
+
+def channels_from_env():
+    """Channels configured through environment variables"""
+    channels = []
+    if os.environ.get('TELEGRAM_BOT_TOKEN') and os.environ.get('TELEGRAM_CHAT_ID'):
+        channels.append(TelegramChannel(os.environ['TELEGRAM_BOT_TOKEN'], os.environ['TELEGRAM_CHAT_ID']))
+    if os.environ.get('SMTP_HOST') and os.environ.get('ALERT_EMAIL_TO'):
+        channels.append(EmailChannel(os.environ['SMTP_HOST'], os.environ['ALERT_EMAIL_TO'],
+                                     port=int(os.environ.get('SMTP_PORT', 587)),
+                                     username=os.environ.get('SMTP_USER'),
+                                     password=os.environ.get('SMTP_PASSWORD')))
+    return channels
+
+
+class NotificationDispatcher:
+    def __init__(self, channels, db_path=OUTBOX_DB, digest_window=30, max_digest=500,
+                 max_attempts=6, base_backoff=5, max_backoff=900, poll_interval=1.0):
+        self.channels = {channel.name: channel for channel in channels}
+        self.db_path = db_path
+        self.digest_window = digest_window  # seconds to collect alerts into one digest
+        self.max_digest = max_digest
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.running = False
+        self.workers = []
+        self.init_database()
+
+    def init_database(self):
+        """Initialize outbox table"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')  # workers and ingest write concurrently
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel TEXT NOT NULL,
+                idempotency_key TEXT NOT NULL,
+                alert_type TEXT,
+                subject TEXT,
+                message TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_ts REAL NOT NULL,
+                next_attempt_ts REAL NOT NULL,
+                digest_id INTEGER,
+                last_error TEXT,
+                created_at TEXT,
+                sent_at TEXT,
+                UNIQUE (channel, idempotency_key)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (channel, status, next_attempt_ts)')
+        conn.commit()
+        conn.close()
+
+    def enqueue(self, alert):
+        """Write an alert to every channel's outbox, return number of new rows (duplicates are ignored)"""
+        if not self.channels:
+            return 0
+        key = alert.get('key') or idempotency_key(alert)
+        subject = f"Keeta {alert['type'].replace('_', ' ').title()} Alert"
+        now = time.time()
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR IGNORE INTO outbox
+            (channel, idempotency_key, alert_type, subject, message, created_ts, next_attempt_ts, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(name, key, alert['type'], subject, alert['message'], now, now, datetime.now().isoformat())
+              for name in self.channels])
+        new_rows = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return new_rows
+
+    def build_digest(self, rows):
+        """(subject, body) for a batch of outbox rows (id, alert_type, subject, message)"""
+        if len(rows) == 1:
+            return rows[0][2], rows[0][3]
+
+        counts = {}
+        for row in rows:
+            counts[row[1]] = counts.get(row[1], 0) + 1
+        summary = ', '.join(f"{count} {alert_type.replace('_', ' ')}" for alert_type, count in sorted(counts.items()))
+        shown = rows[:10]
+        body = f"🔔 Keeta Alert Digest - {len(rows)} alerts ({summary})\n\n"
+        body += "\n\n".join(row[3] for row in shown)
+        if len(rows) > len(shown):
+            body += f"\n\n... and {len(rows) - len(shown)} more"
+        return f"Keeta Alert Digest ({len(rows)} alerts)", body
+
+    def deliver_due(self, channel_name, now=None):
+        """Deliver one digest of due rows for a channel, return number of alerts sent
+
+        Nothing is sent until the oldest due row has waited `digest_window`
+        seconds, so a burst of alerts goes out as a single digest.
+        """
+        now = now if now is not None else time.time()
+        channel = self.channels[channel_name]
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, alert_type, subject, message, created_ts, attempts
+            FROM outbox
+            WHERE channel = ? AND status = ? AND next_attempt_ts <= ?
+            ORDER BY id LIMIT ?
+        ''', (channel_name, PENDING, now, self.max_digest))
+        rows = cursor.fetchall()
+        conn.close()
+
+        if not rows:
+            return 0
+        first_attempt = all(row[5] == 0 for row in rows)
+        if first_attempt and now - min(row[4] for row in rows) < self.digest_window:
+            return 0
+
+        subject, body = self.build_digest(rows)
+        ids = [row[0] for row in rows]
+        try:
+            channel.send(subject, body)
+            error = None
+        except Exception as e:
+            error = str(e)
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        if error is None:
+            cursor.executemany('''
+                UPDATE outbox SET status = ?, digest_id = ?, sent_at = ?, attempts = attempts + 1 WHERE id = ?
+            ''', [(SENT, ids[0], datetime.now().isoformat(), row_id) for row_id in ids])
+        else:
+            # Each row keeps its own attempt count and backoff (a digest can mix fresh and retried rows)
+            updates = []
+            for row in rows:
+                attempts = row[5] + 1
+                delay = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+                status = FAILED if attempts >= self.max_attempts else PENDING
+                updates.append((status, attempts, now + delay, error, row[0]))
+            cursor.executemany('''
+                UPDATE outbox SET status = ?, attempts = ?, next_attempt_ts = ?, last_error = ? WHERE id = ?
+            ''', updates)
+            failed = sum(1 for update in updates if update[0] == FAILED)
+            logger.error(f"Notification delivery via {channel_name} failed for {len(ids)} alerts "
+                         f"({failed} gave up): {error}")
+        conn.commit()
+        conn.close()
+        return len(ids) if error is None else 0
+
+    def _worker(self, channel_name):
+        while self.running:
+            try:
+                self.deliver_due(channel_name)
+            except Exception as e:
+                logger.error(f"Notification worker {channel_name} error: {e}")
+            time.sleep(self.poll_interval)
+
+    def start(self, runtime=None):
+        """Start one delivery worker per channel (jobs on a WorkerRuntime if given, else threads)"""
+        self.running = True
+        if runtime is not None:
+            for name in self.channels:
+                runtime.register(f"notify-{name}", lambda name=name: self.deliver_due(name),
+                                 interval=self.poll_interval, jitter=0.2, timeout=60)
+            logger.info(f"Notification dispatcher jobs registered: {', '.join(self.channels) or 'no channels'}")
+            return
+        for name in self.channels:
+            worker = threading.Thread(target=self._worker, args=(name,), name=f"notify-{name}")
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+        logger.info(f"Notification dispatcher started: {', '.join(self.channels) or 'no channels'}")
+
+    def stop(self):
+        """Stop the delivery threads (pending rows stay in the outbox)
+
+        Jobs registered on a WorkerRuntime stop with that runtime.
+        """
+        self.running = False
+        for worker in self.workers:
+            worker.join(timeout=self.poll_interval * 2)
+        self.workers = []
+
+    def get_stats(self):
+        """Outbox row counts per channel and status"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT channel, status, COUNT(*) FROM outbox GROUP BY channel, status')
+        stats = {}
+        for channel, status, count in cursor.fetchall():
+            stats.setdefault(channel, {})[status] = count
+        conn.close()
+        return stats
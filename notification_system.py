@@ -12,6 +12,7 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Dict, List
 import logging
+from notification_dispatcher import TelegramChannel, EmailChannel
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -28,6 +29,13 @@ class KeetaNotifier:
         self.large_trade_threshold = 10000000  # 10M token
         self.volume_threshold = 100000000  # 100M volume
         
+        # Rule tambahan untuk AlertEngine (sintaks: lihat alert_rules.py), contoh:
+        #   "murf volume 1h > 3x prev 1h", "single trade > 5000 kta from new address"
+        self.alert_rules = []
+        
+        # Dispatcher opsional (outbox + worker per channel); tanpa itu alert hanya di-log
+        self.dispatcher = None
+        
     def get_latest_price(self) -> float:
         """Ambil harga terbaru MURF/KTA"""
         conn = sqlite3.connect(self.db_path)
@@ -203,25 +211,36 @@ class KeetaNotifier:
             "increase_percentage": volume_increase * 100
         }
     
-    def send_email_notification(self, subject: str, body: str, to_email: str = None):
-        """Kirim notifikasi email (perlu konfigurasi SMTP)"""
+    def send_email_notification(self, subject: str, body: str, to_email: str = None,
+                                smtp_host: str = "localhost", smtp_port: int = 587,
+                                username: str = None, password: str = None):
+        """Kirim notifikasi email langsung (tanpa outbox; perlu konfigurasi SMTP)"""
         if not to_email:
             logger.info("No email configured, skipping email notification")
             return
         
-        # Implementasi email notification
-        # Perlu konfigurasi SMTP server
-        logger.info(f"Email notification: {subject}")
-        logger.info(f"Body: {body}")
+        EmailChannel(smtp_host, to_email, port=smtp_port, username=username, password=password).send(subject, body)
+        logger.info(f"Email notification sent: {subject}")
     
     def send_telegram_notification(self, message: str, bot_token: str = None, chat_id: str = None):
-        """Kirim notifikasi Telegram (perlu bot token)"""
+        """Kirim notifikasi Telegram langsung (tanpa outbox; perlu bot token)"""
         if not bot_token or not chat_id:
             logger.info("No Telegram configured, skipping Telegram notification")
             return
         
-        # Implementasi Telegram notification
-        logger.info(f"Telegram notification: {message}")
+        TelegramChannel(bot_token, chat_id).send("Keeta Alert", message)
+        logger.info("Telegram notification sent")
+    
+    def dispatch(self, alert_type: str, data, message: str):
+        """Masukkan alert ke outbox dispatcher (duplikat per trade diabaikan)"""
+        if self.dispatcher is None:
+            return 0
+        return self.dispatcher.enqueue({
+            "type": alert_type,
+            "data": data,
+            "message": message,
+            "fired_at": datetime.now().isoformat()
+        })
     
     def generate_notification_message(self, alert_type: str, data: Dict) -> str:
         """Generate pesan notifikasi"""
@@ -273,6 +292,15 @@ Previous Volume: {data['previous_volume']:,}
 {trades_text}
             """.strip()
         
+        elif alert_type == "rule":
+            threshold = f"{data['threshold']:,.2f}" if data.get('threshold') is not None else "-"
+            return f"""
+🚨 Rule Alert - {timestamp}
+{data['text']}
+
+Value: {data['value']:,.2f} (threshold {threshold})
+            """.strip()
+        
         return f"Keeta Alert - {timestamp}: {alert_type}"
     
     def check_alerts(self):
@@ -284,32 +312,31 @@ Previous Volume: {data['previous_volume']:,}
         if price_data["alert"]:
             message = self.generate_notification_message("price_change", price_data)
             logger.warning(f"PRICE ALERT: {message}")
-            # self.send_email_notification("Keeta Price Alert", message)
-            # self.send_telegram_notification(message)
+            self.dispatch("price_change", price_data, message)
         
         # Cek transaksi besar
         large_trades = self.check_large_trades()
         if large_trades:
             message = self.generate_notification_message("large_trade", large_trades)
             logger.warning(f"LARGE TRADE ALERT: {message}")
-            # self.send_email_notification("Keeta Large Trade Alert", message)
-            # self.send_telegram_notification(message)
+            # Satu entri outbox per trade: trade yang sama tidak dikirim ulang tiap menit
+            for trade in large_trades:
+                self.dispatch("large_trade", [trade], self.generate_notification_message("large_trade", [trade]))
         
         # Cek transaksi OTC
         otc_trades = self.check_otc_trades()
         if otc_trades:
             message = self.generate_notification_message("otc_trade", otc_trades)
             logger.warning(f"OTC TRADE ALERT: {message}")
-            # self.send_email_notification("Keeta OTC Trade Alert", message)
-            # self.send_telegram_notification(message)
+            for trade in otc_trades:
+                self.dispatch("otc_trade", [trade], self.generate_notification_message("otc_trade", [trade]))
         
         # Cek lonjakan volume
         volume_data = self.check_volume_spike()
         if volume_data["spike"]:
             message = self.generate_notification_message("volume_spike", volume_data)
             logger.warning(f"VOLUME ALERT: {message}")
-            # self.send_email_notification("Keeta Volume Alert", message)
-            # self.send_telegram_notification(message)
+            self.dispatch("volume_spike", volume_data, message)
         
         logger.info("Alert check completed")
 
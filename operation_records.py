@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Operation Records - Compact typed form of Keeta blocks and operations
+Each block is normalized once: token/address strings are interned to small
+integer IDs and amounts are parsed to integers, so analyzers compare ints
+instead of 60+ character strings. A symbol table lives as long as one scan
+(a history page, a dashboard poll, a scanner run), not the whole process.
+"""
+
+import threading
+from typing import NamedTuple, Tuple
+
+from amount_codec import decode_hex
+
+MURF_TOKEN = "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm"
+KTA_TOKEN = "keeta_anqdilpazdekdu4acw65fj7smltcp26wbrildkqtszqvverljpwpezmd44ssg"
+
+# Operation types seen on the ledger
+OP_SEND = 0
+OP_OTC = 7
+
+# Interned first in every symbol table, so their IDs are the same everywhere
+TRACKED_TOKENS = (MURF_TOKEN, KTA_TOKEN)
+MURF_ID = 1
+KTA_ID = 2
+
+
+class SymbolTable:
+    """Intern token/address strings to small integer IDs (0 = empty, then MURF_ID, KTA_ID)"""
+
+    def __init__(self):
+        self.ids = {'': 0}
+        self.names = ['']
+        self.lock = threading.Lock()
+        for token in TRACKED_TOKENS:
+            self.intern(token)
+
+    def intern(self, value):
+        """Get (or assign) the ID for a string"""
+        if not value or not isinstance(value, str):
+            return 0
+        symbol_id = self.ids.get(value)
+        if symbol_id is None:
+            with self.lock:
+                symbol_id = self.ids.get(value)
+                if symbol_id is None:
+                    symbol_id = len(self.names)
+                    self.names.append(value)
+                    self.ids[value] = symbol_id
+        return symbol_id
+
+    def lookup(self, value):
+        """Get the ID for a string without assigning one (None if unknown)"""
+        return self.ids.get(value)
+
+    def name(self, symbol_id):
+        """Get the string for an ID"""
+        return self.names[symbol_id]
+
+    def __len__(self):
+        return len(self.names)
+
+
+def parse_amount(value):
+    """Parse a hex amount ('0x...') to an exact integer"""
+    return decode_hex(value)
+
+
+def format_amount(amount):
+    """Format an integer amount as API hex ('0x...')"""
+    return f"0x{amount:X}"
+
+
+class OperationRecord(NamedTuple):
+    index: int
+    type: int                       # non-int API types are kept as-is (unknown)
+    token: int
+    from_id: int
+    to_id: int
+    amount: int
+    exact: bool
+
+    def as_operation(self, symbols):
+        """Rebuild the API-shaped operation dict (for storage/logging)"""
+        op = {'type': self.type, 'amount': format_amount(self.amount)}
+        if self.token:
+            op['token'] = symbols.name(self.token)
+        if self.from_id:
+            op['from'] = symbols.name(self.from_id)
+        if self.to_id:
+            op['to'] = symbols.name(self.to_id)
+        if self.exact:
+            op['exact'] = True
+        return op
+
+
+class BlockRecord:
+    __slots__ = ('hash', 'date', 'account', 'signer', 'network', 'operations', 'raw_operations', 'symbols')
+
+    def __init__(self, hash, date, account, signer, network, operations, raw_operations=None, symbols=None):
+        self.hash = hash
+        self.date = date
+        self.account = account
+        self.signer = signer
+        self.network = network
+        self.operations = operations
+        self.raw_operations = raw_operations    # source operations list, for storing operations verbatim
+        self.symbols = symbols                  # table the IDs above belong to
+
+    def name(self, symbol_id):
+        """Get the string for an ID of this block"""
+        return self.symbols.name(symbol_id)
+
+    def raw_operation(self, op):
+        """The operation dict as the API sent it (rebuilt from the record if the list is not kept)"""
+        operations = self.raw_operations
+        if operations is not None and op.index < len(operations) and isinstance(operations[op.index], dict):
+            return operations[op.index]
+        return op.as_operation(self.symbols)
+
+    def has_token(self, *token_ids):
+        """Check if any operation in the block touches one of the tokens"""
+        return any(op.token in token_ids for op in self.operations)
+
+
+def normalize_operation(op, index, symbols):
+    """Convert a raw operation dict into an OperationRecord"""
+    op_type = op.get('type', 0)
+    if not isinstance(op_type, (int, str)):
+        op_type = str(op_type)          # unknown types stay unknown (never SEND/OTC), but hashable
+    return OperationRecord(
+        index,
+        op_type,
+        symbols.intern(op.get('token')),
+        symbols.intern(op.get('from')),
+        symbols.intern(op.get('to')),
+        parse_amount(op.get('amount', '0x0')),
+        bool(op.get('exact', False))
+    )
+
+
+def normalize_block(block, symbols=None):
+    """Convert a raw block dict into a BlockRecord (new symbol table unless one is given)"""
+    symbols = symbols if symbols is not None else SymbolTable()
+    operations = block.get('operations', [])
+    if not isinstance(operations, list):
+        operations = []
+
+    records: Tuple[OperationRecord, ...] = tuple(
+        normalize_operation(op, index, symbols)
+        for index, op in enumerate(operations)
+        if isinstance(op, dict)
+    )
+    return BlockRecord(
+        block.get('$hash', ''),
+        block.get('date', ''),
+        symbols.intern(block.get('account')),
+        symbols.intern(block.get('signer')),
+        block.get('network', ''),
+        records,
+        operations,
+        symbols
+    )
+
+
+def normalize_blocks(blocks, symbols=None):
+    """Normalize a list of raw blocks, skipping non-dict entries (one symbol table for the list)"""
+    symbols = symbols if symbols is not None else SymbolTable()
+    return [normalize_block(block, symbols) for block in blocks if isinstance(block, dict)]
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+OTC Batch - Vectorized OTC analysis over many history pages
+Operations of a whole page range are loaded once into columnar NumPy arrays;
+amount decoding, leg pairing, exchange rates, USD values and validity masks
+are then computed with array operations instead of per-trade Python loops.
+"""
+
+try:
+    import numpy as np  # Optional (batch backfills only)
+except ImportError:
+    np = None
+
+from ledger_archive import NETWORK_SCOPE
+from operation_records import SymbolTable, MURF_ID, KTA_ID, OP_SEND, OP_OTC
+from amount_codec import decode_amounts, decode_amount, to_float
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is required for batch OTC analysis (pip install numpy)")
+
+
+class OperationColumns:
+    """Columnar view of every operation in a range of blocks"""
+
+    def __init__(self, blocks):
+        require_numpy()
+        self.symbols = SymbolTable()    # address IDs of this page range
+        block_hashes, block_dates, block_accounts = [], [], []
+        block_idx, op_types, tokens, from_ids, to_ids, amounts_hex = [], [], [], [], [], []
+
+        for block in blocks:
+            if not isinstance(block, dict):
+                continue
+            b = len(block_hashes)
+            block_hashes.append(block.get('$hash', ''))
+            block_dates.append(block.get('date', ''))
+            block_accounts.append(self.symbols.intern(block.get('account')))
+
+            operations = block.get('operations', [])
+            if not isinstance(operations, list):
+                continue
+            for op in operations:
+                if not isinstance(op, dict):
+                    continue
+                op_type = op.get('type', 0)
+                block_idx.append(b)
+                op_types.append(op_type if isinstance(op_type, int) else -1)
+                tokens.append(self.symbols.intern(op.get('token')))
+                from_ids.append(self.symbols.intern(op.get('from')))
+                to_ids.append(self.symbols.intern(op.get('to')))
+                amounts_hex.append(op.get('amount', '0x0'))
+
+        self.block_hashes = np.array(block_hashes, dtype=object)
+        self.block_dates = np.array(block_dates, dtype=object)
+        self.block_accounts = np.array(block_accounts, dtype=np.int64)
+        self.block_idx = np.array(block_idx, dtype=np.int64)
+        self.types = np.array(op_types, dtype=np.int64)
+        self.tokens = np.array(tokens, dtype=np.int64)
+        self.from_ids = np.array(from_ids, dtype=np.int64)
+        self.to_ids = np.array(to_ids, dtype=np.int64)
+        self.amounts_hex = amounts_hex
+        self.amounts, self.amount_valid = decode_amounts(amounts_hex)
+
+    @property
+    def n_blocks(self):
+        return len(self.block_hashes)
+
+    def first_leg(self, op_type, token):
+        """Per block: index of the first operation with (type, token), -1 if none"""
+        table = np.full(self.n_blocks, -1, dtype=np.int64)
+        positions = np.flatnonzero((self.types == op_type) & (self.tokens == token))
+        if len(positions):
+            blocks, first = np.unique(self.block_idx[positions], return_index=True)
+            table[blocks] = positions[first]
+        return table
+
+
+class OTCBatchResult:
+    """Columnar OTC trades (one row per Type 7 MURF/KTA leg)"""
+
+    def __init__(self, columns, legs, counterparts, kta_price_usd=0.0):
+        self.columns = columns
+        self.legs = legs
+        self.counterparts = counterparts
+        has_cp = counterparts >= 0
+        cp = np.where(has_cp, counterparts, 0)
+
+        is_kta_leg = columns.tokens[legs] == KTA_ID
+        leg_amounts = columns.amounts[legs]
+        cp_amounts = np.where(has_cp, columns.amounts[cp], 0.0)
+
+        # KTA has 18 decimals, MURF amounts are used as-is
+        self.kta_amount = np.where(is_kta_leg, leg_amounts, cp_amounts) / 1e18
+        self.murf_amount = np.where(is_kta_leg, cp_amounts, leg_amounts)
+        self.is_kta_seller = is_kta_leg
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.exchange_rate = np.where(self.kta_amount > 0, self.murf_amount / self.kta_amount, 0.0)
+        self.usd_value = self.kta_amount * kta_price_usd
+
+        self.valid = (has_cp & (self.kta_amount > 0) & (self.murf_amount > 0)
+                      & columns.amount_valid[legs] & np.where(has_cp, columns.amount_valid[cp], False))
+
+        self.block = columns.block_idx[legs]
+        self.from_ids = columns.from_ids[legs]
+        self.to_ids = np.where(has_cp, columns.to_ids[cp], 0)
+
+    def __len__(self):
+        return len(self.legs)
+
+    def raw_amounts(self, row):
+        """Exact (kta_raw, murf_raw) integers of a trade row"""
+        leg = int(self.legs[row])
+        cp = int(self.counterparts[row])
+        leg_amount = decode_amount(self.columns.amounts_hex[leg])
+        cp_amount = decode_amount(self.columns.amounts_hex[cp]) if cp >= 0 else 0
+        if self.is_kta_seller[row]:
+            return leg_amount, cp_amount
+        return cp_amount, leg_amount
+
+    def to_records(self, valid_only=True):
+        """Rows shaped like otc_transactions (tx_hash, kta_amount, ...)"""
+        rows = np.flatnonzero(self.valid) if valid_only else np.arange(len(self.legs))
+        hashes = self.columns.block_hashes[self.block[rows]]
+        dates = self.columns.block_dates[self.block[rows]]
+        records = []
+        for i, row in enumerate(rows):
+            kta_raw, murf_raw = self.raw_amounts(row)
+            records.append({
+                'tx_hash': hashes[i] or 'N/A',
+                'block_hash': hashes[i] or 'N/A',
+                'kta_amount': float(self.kta_amount[row]),
+                'murf_amount': float(self.murf_amount[row]),
+                'exchange_rate': float(self.exchange_rate[row]),
+                'from_address': self.columns.symbols.name(int(self.from_ids[row])) or 'N/A',
+                'to_address': self.columns.symbols.name(int(self.to_ids[row])) or 'N/A',
+                'timestamp': dates[i],
+                'kta_amount_raw': kta_raw,
+                'murf_amount_raw': murf_raw
+            })
+        return records
+
+    def summary(self):
+        """Aggregate volumes and volume-weighted rate over valid trades"""
+        valid = self.valid
+        # Totals are summed exactly on the raw integers (no float drift)
+        kta_raw, murf_raw = 0, 0
+        for row in np.flatnonzero(valid):
+            kta, murf = self.raw_amounts(row)
+            kta_raw += kta
+            murf_raw += murf
+        kta_volume = to_float(kta_raw)
+        murf_volume = float(murf_raw)
+        return {
+            'legs': len(self.legs),
+            'valid_trades': int(valid.sum()),
+            'kta_volume': kta_volume,
+            'murf_volume': murf_volume,
+            'usd_volume': float(self.usd_value[valid].sum()),
+            'vwap_rate': murf_volume / kta_volume if kta_volume > 0 else 0.0
+        }
+
+
+def analyze_blocks(blocks, kta_price_usd=0.0, lookback=True):
+    """Vectorized OTC analysis over a list of raw (slim) blocks
+
+    Same pairing rules as otc_engine: Type 7 KTA pairs with the first Type 0
+    MURF of the block (or of the previous block when lookback is on), Type 7
+    MURF pairs with the first Type 0 KTA of the block.
+    """
+    columns = OperationColumns(blocks)
+    murf_send = columns.first_leg(OP_SEND, MURF_ID)
+    kta_send = columns.first_leg(OP_SEND, KTA_ID)
+
+    legs = np.flatnonzero((columns.types == OP_OTC) & np.isin(columns.tokens, (KTA_ID, MURF_ID)))
+    leg_blocks = columns.block_idx[legs]
+    is_kta_leg = columns.tokens[legs] == KTA_ID
+
+    counterparts = np.where(is_kta_leg, murf_send[leg_blocks], kta_send[leg_blocks])
+    if lookback and len(legs):
+        missing = is_kta_leg & (counterparts < 0) & (leg_blocks > 0)
+        counterparts[missing] = murf_send[leg_blocks[missing] - 1]
+
+    return OTCBatchResult(columns, legs, counterparts, kta_price_usd)
+
+
+def analyze_archive(archive, max_pages=None, cursor=None, kta_price_usd=0.0, scope=NETWORK_SCOPE):
+    """Vectorized OTC analysis over a page range of the ledger archive"""
+    blocks = []
+    for page in archive.iter_pages(scope, max_pages=max_pages, cursor=cursor):
+        blocks.extend(page['blocks'])
+    return analyze_blocks(blocks, kta_price_usd)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+OTC Engine - Single-pass MURF/KTA OTC leg matching
+Each block's operations are grouped by (type, token) in one pass, so the
+Type 0 counterpart of a Type 7 leg is a dict lookup instead of a rescan, and
+blocks without MURF/KTA OTC legs are skipped right after indexing.
+"""
+
+from typing import NamedTuple, Optional
+
+from operation_records import OperationRecord, BlockRecord, MURF_ID, KTA_ID, OP_SEND, OP_OTC
+from amount_codec import to_float, KTA_DECIMALS
+
+
+class BlockOpIndex:
+    """Operations of one block grouped by (type, token)"""
+    __slots__ = ('block', 'by_key', 'sends', '_counterparts')
+
+    def __init__(self, block):
+        self.block = block
+        self.by_key = {}
+        self.sends = []
+        self._counterparts = {}
+
+        for op in block.operations:
+            key = (op.type, op.token)
+            ops = self.by_key.get(key)
+            if ops is None:
+                self.by_key[key] = [op]
+            else:
+                ops.append(op)
+            if op.type == OP_SEND:
+                self.sends.append(op)
+
+    def get(self, op_type, token):
+        """All operations with this (type, token), in block order"""
+        return self.by_key.get((op_type, token), ())
+
+    def first(self, op_type, token):
+        """First operation with this (type, token), or None"""
+        ops = self.by_key.get((op_type, token))
+        return ops[0] if ops else None
+
+    def has_token(self, *tokens):
+        """Check if any operation touches one of the tokens"""
+        return any(key[1] in tokens for key in self.by_key)
+
+    def counterparts(self, op):
+        """Type 0 operations of a different token than op (block order)"""
+        related = self._counterparts.get(op.token)
+        if related is None:
+            related = [send for send in self.sends if send.token != op.token]
+            self._counterparts[op.token] = related
+        return related
+
+
+class OtcMatch(NamedTuple):
+    block: BlockRecord
+    op: OperationRecord                      # Type 7 leg
+    counterpart: Optional[OperationRecord]   # Type 0 leg of the other token
+    from_previous: bool                      # counterpart found in the previous block
+    kta_amount: int                          # raw (18 decimals)
+    murf_amount: int                         # raw (no decimals)
+
+    @property
+    def is_kta_seller(self):
+        return self.op.token == KTA_ID
+
+    @property
+    def kta_decimal(self):
+        return to_float(self.kta_amount, KTA_DECIMALS)
+
+
+class OTCEngine:
+    def __init__(self, kta_id=KTA_ID, murf_id=MURF_ID):
+        self.kta_id = kta_id
+        self.murf_id = murf_id
+        self.blocks_indexed = 0
+        self.blocks_skipped = 0
+
+    def index_block(self, block):
+        """Build the (type, token) index of a block"""
+        self.blocks_indexed += 1
+        return BlockOpIndex(block)
+
+    def match_block(self, block, previous=None, index=None):
+        """Pair the MURF/KTA OTC legs of one block
+
+        Pattern 1: Type 7 KTA + Type 0 MURF (KTA -> MURF)
+        Pattern 2: Type 7 MURF + Type 0 KTA (MURF -> KTA)
+        When a KTA leg has no MURF leg in the block, the first Type 0 MURF of
+        the previous block is used. previous may be a BlockRecord or a
+        callable returning one; it is only resolved when needed.
+        """
+        index = index or self.index_block(block)
+        kta_legs = index.get(OP_OTC, self.kta_id)
+        murf_legs = index.get(OP_OTC, self.murf_id)
+        if not kta_legs and not murf_legs:
+            self.blocks_skipped += 1
+            return []
+
+        matches = []
+        previous_index = None
+        for op in block.operations:
+            if op.type != OP_OTC:
+                continue
+
+            if op.token == self.kta_id:
+                counterpart = index.first(OP_SEND, self.murf_id)
+                from_previous = False
+                if counterpart is None and previous is not None:
+                    if previous_index is None:
+                        previous_block = previous() if callable(previous) else previous
+                        previous_index = self.index_block(previous_block)
+                    counterpart = previous_index.first(OP_SEND, self.murf_id)
+                    from_previous = counterpart is not None
+                matches.append(OtcMatch(block, op, counterpart, from_previous, op.amount,
+                                        counterpart.amount if counterpart else 0))
+
+            elif op.token == self.murf_id:
+                counterpart = index.first(OP_SEND, self.kta_id)
+                matches.append(OtcMatch(block, op, counterpart, False,
+                                        counterpart.amount if counterpart else 0, op.amount))
+
+        return matches
+
+    def match_blocks(self, blocks, lookback=True):
+        """Match OTC legs over a list of BlockRecords (API order)"""
+        matches = []
+        for j, block in enumerate(blocks):
+            previous = blocks[j - 1] if lookback and j > 0 else None
+            matches.extend(self.match_block(block, previous))
+        return matches
+
+
+# Shared engine for the dashboard, auto scraper and monitor
+OTC_ENGINE = OTCEngine()
@@ -1,6 +1,31 @@
 import sqlite3
 import json
 from datetime import datetime
+from amount_codec import parse_units, KTA_DECIMALS, MURF_DECIMALS
+
+# Exact raw amounts (integer units as decimal TEXT) next to the REAL display columns
+RAW_AMOUNT_COLUMNS = ('kta_amount_raw', 'murf_amount_raw')
+
+
+def ensure_raw_amount_columns(cursor):
+    """Add the exact raw amount columns to an existing otc_transactions table"""
+    cursor.execute('PRAGMA table_info(otc_transactions)')
+    existing = {row[1] for row in cursor.fetchall()}
+    for column in RAW_AMOUNT_COLUMNS:
+        if column not in existing:
+            cursor.execute(f'ALTER TABLE otc_transactions ADD COLUMN {column} TEXT')
+
+
+def raw_amounts(tx_data):
+    """Exact (kta_raw, murf_raw) integers of a transaction, derived from the REAL values for legacy rows"""
+    kta_raw = tx_data.get('kta_amount_raw')
+    murf_raw = tx_data.get('murf_amount_raw')
+    if kta_raw is None:
+        kta_raw = parse_units(float(tx_data.get('kta_amount') or 0), KTA_DECIMALS)
+    if murf_raw is None:
+        murf_raw = parse_units(float(tx_data.get('murf_amount') or 0), MURF_DECIMALS)
+    return parse_units(kta_raw), parse_units(murf_raw)
+
 
 class OTCTransactionsDB:
     def __init__(self, db_path="otc_transactions.db"):
@@ -24,10 +49,15 @@ class OTCTransactionsDB:
                 from_address TEXT,
                 to_address TEXT,
                 timestamp TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                kta_amount_raw TEXT,
+                murf_amount_raw TEXT
             )
         ''')
         
+        # Migrate databases created before the raw amount columns existed
+        ensure_raw_amount_columns(cursor)
+        
         # Create index for faster queries
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_tx_hash ON otc_transactions(tx_hash)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON otc_transactions(timestamp)')
@@ -42,10 +72,12 @@ class OTCTransactionsDB:
         cursor = conn.cursor()
         
         try:
+            kta_raw, murf_raw = raw_amounts(tx_data)
             cursor.execute('''
                 INSERT OR REPLACE INTO otc_transactions 
-                (tx_hash, block_hash, kta_amount, murf_amount, exchange_rate, from_address, to_address, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                (tx_hash, block_hash, kta_amount, murf_amount, exchange_rate, from_address, to_address, timestamp,
+                 kta_amount_raw, murf_amount_raw)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 tx_data.get('tx_hash', ''),
                 tx_data.get('block_hash', ''),
@@ -54,7 +86,9 @@ class OTCTransactionsDB:
                 tx_data.get('exchange_rate', 0),
                 tx_data.get('from_address', ''),
                 tx_data.get('to_address', ''),
-                tx_data.get('timestamp', '')
+                tx_data.get('timestamp', ''),
+                str(kta_raw),
+                str(murf_raw)
             ))
             conn.commit()
             print(f"[SAVE] Saved OTC transaction: {tx_data.get('tx_hash', '')[:20]}...")
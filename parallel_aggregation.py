@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Parallel Aggregation - Shard history pages across a process pool
+Full-history scans spend most of their time normalizing blocks and folding
+operations into per-address totals, which is GIL-bound in one thread. Pages are
+sent to worker processes in shards as they are fetched; each worker returns a
+partial aggregate keyed by address string (symbol IDs are per process), and the
+partials are merged in page order so the result matches a sequential scan.
+
+Set KEETA_SCAN_WORKERS (a number, or 'auto' for one per core) to make the
+scanners use this path; unset or 1 keeps the single-threaded scan.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from operation_records import SymbolTable, normalize_blocks, MURF_TOKEN, OP_SEND, OP_OTC
+
+WORKERS_ENV = "KEETA_SCAN_WORKERS"
+
+# Holder partial fields: [total_received, total_sent, transaction_count, first_murf_tx, last_murf_tx]
+RECEIVED, SENT, COUNT, FIRST, LAST = range(5)
+
+
+def scan_workers(workers=None):
+    """Number of aggregation processes: explicit value, else KEETA_SCAN_WORKERS, else 1"""
+    if workers is None:
+        workers = os.environ.get(WORKERS_ENV, '1').strip().lower() or '1'
+    if workers == 'auto':
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def aggregate_holder_pages(pages):
+    """Worker: fold raw history pages into (blocks, addresses, holders) keyed by address string
+
+    Same rules as the comprehensive scanners: OP_OTC counts as sent by `from`,
+    OP_SEND as received by `to`; an address gets first_murf_tx when first seen
+    and last_murf_tx on every counted operation (None if none in this shard).
+    """
+    symbols = SymbolTable()
+    murf_id = symbols.intern(MURF_TOKEN)
+    addresses = set()
+    holders = {}
+    blocks = 0
+
+    for page in pages:
+        for block in normalize_blocks(page, symbols):
+            blocks += 1
+            if block.account:
+                addresses.add(block.account)
+            for op in block.operations:
+                if op.from_id:
+                    addresses.add(op.from_id)
+                if op.to_id:
+                    addresses.add(op.to_id)
+                if op.token != murf_id:
+                    continue
+
+                if op.from_id:
+                    holder = holders.setdefault(op.from_id, [0, 0, 0, block.date, None])
+                    if op.type == OP_OTC:
+                        holder[SENT] += op.amount
+                        holder[COUNT] += 1
+                        holder[LAST] = block.date
+                if op.to_id:
+                    holder = holders.setdefault(op.to_id, [0, 0, 0, block.date, None])
+                    if op.type == OP_SEND:
+                        holder[RECEIVED] += op.amount
+                        holder[COUNT] += 1
+                        holder[LAST] = block.date
+            if block.signer:
+                addresses.add(block.signer)
+
+    return (blocks,
+            [symbols.name(address_id) for address_id in addresses],
+            {symbols.name(address_id): holder for address_id, holder in holders.items()})
+
+
+def merge_holder_partials(partials):
+    """Merge holder partials in page order, return (blocks, addresses, holders in scanner format)"""
+    blocks = 0
+    addresses = set()
+    merged = {}
+    for part_blocks, part_addresses, part_holders in partials:
+        blocks += part_blocks
+        addresses.update(part_addresses)
+        for address, holder in part_holders.items():
+            current = merged.get(address)
+            if current is None:
+                merged[address] = list(holder)
+                continue
+            current[RECEIVED] += holder[RECEIVED]
+            current[SENT] += holder[SENT]
+            current[COUNT] += holder[COUNT]
+            if holder[LAST] is not None:
+                current[LAST] = holder[LAST]
+
+    holders = {
+        address: {
+            'total_received': holder[RECEIVED],
+            'total_sent': holder[SENT],
+            'current_balance': holder[RECEIVED] - holder[SENT],
+            'transaction_count': holder[COUNT],
+            'first_murf_tx': holder[FIRST],
+            'last_murf_tx': holder[LAST] if holder[LAST] is not None else holder[FIRST]
+        }
+        for address, holder in merged.items()
+    }
+    return blocks, addresses, holders
+
+
+def collect_page_addresses(pages):
+    """Worker: (blocks, addresses) from raw pages (account, signer, op from/to/signer)"""
+    addresses = set()
+    blocks = 0
+    for page in pages:
+        for block in page:
+            if not isinstance(block, dict):
+                continue
+            blocks += 1
+            for key in ('account', 'signer'):
+                value = block.get(key)
+                if value and isinstance(value, str):
+                    addresses.add(value)
+            operations = block.get('operations', [])
+            if not isinstance(operations, list):
+                continue
+            for op in operations:
+                if not isinstance(op, dict):
+                    continue
+                for key in ('from', 'to', 'signer'):
+                    value = op.get(key)
+                    if value and isinstance(value, str):
+                        addresses.add(value)
+    return blocks, addresses
+
+
+def merge_address_partials(partials):
+    """Merge address partials, return (blocks, addresses)"""
+    blocks = 0
+    addresses = set()
+    for part_blocks, part_addresses in partials:
+        blocks += part_blocks
+        addresses.update(part_addresses)
+    return blocks, addresses
+
+
+class ParallelAggregator:
+    """Submit pages as they are fetched; shards run in a process pool while fetching continues"""
+
+    def __init__(self, worker, workers=None, pages_per_shard=5):
+        self.worker = worker
+        self.workers = scan_workers(workers)
+        self.pages_per_shard = pages_per_shard
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.buffer = []
+        self.futures = []
+
+    def add_page(self, blocks):
+        """Queue one page of raw blocks"""
+        self.buffer.append(blocks)
+        if len(self.buffer) >= self.pages_per_shard:
+            self._submit()
+
+    def _submit(self):
+        if self.buffer:
+            self.futures.append(self.pool.submit(self.worker, self.buffer))
+            self.buffer = []
+
+    def results(self):
+        """Partials in page order (waits for all shards, then shuts the pool down)"""
+        self._submit()
+        try:
+            return [future.result() for future in self.futures]
+        finally:
+            self.close()
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
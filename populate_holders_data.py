@@ -7,12 +7,7 @@ import requests
 import json
 from datetime import datetime
 from murf_holders_db import MURFHoldersDB
-
-def hex_to_decimal(hex_str):
-    """Convert hexadecimal string to decimal integer."""
-    if hex_str.startswith('0x'):
-        return int(hex_str, 16)
-    return int(hex_str)
+from amount_codec import hex_to_decimal
 
 def fetch_holders_data():
     """Fetch MURF holders data from airdrop wallet"""
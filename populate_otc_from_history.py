@@ -3,6 +3,9 @@
 import sqlite3
 from datetime import datetime, timedelta
 import random
+from ledger_archive import LedgerArchive
+from otc_batch import analyze_archive, np
+from otc_transactions_db import ensure_raw_amount_columns, raw_amounts
 
 class OTCDataPopulator:
     def __init__(self):
@@ -34,6 +37,9 @@ class OTCDataPopulator:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_tx_hash ON otc_transactions(tx_hash)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON otc_transactions(timestamp)')
         
+        # Exact raw amount columns
+        ensure_raw_amount_columns(cursor)
+        
         conn.commit()
         conn.close()
         print("OTC database initialized successfully")
@@ -63,6 +69,38 @@ class OTCDataPopulator:
         finally:
             conn.close()
     
+    def get_latest_kta_price(self):
+        """Latest KTA/USD price from price history (0 if unknown)"""
+        conn = sqlite3.connect(self.price_db_path)
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('SELECT kta_price_usd FROM price_history ORDER BY timestamp DESC LIMIT 1')
+            row = cursor.fetchone()
+            return row[0] if row and row[0] else 0.0
+        except Exception as e:
+            print(f"Error getting KTA price: {e}")
+            return 0.0
+        finally:
+            conn.close()
+    
+    def analyze_archived_history(self, max_pages=None):
+        """Real OTC transactions from the ledger archive (vectorized batch analysis)"""
+        if np is None:
+            print("numpy not installed, skipping archive analysis")
+            return []
+        
+        archive = LedgerArchive()
+        if not archive.get_stats()['pages']:
+            print("Ledger archive is empty (run ledger_ingester.py first)")
+            return []
+        
+        result = analyze_archive(archive, max_pages=max_pages, kta_price_usd=self.get_latest_kta_price())
+        summary = result.summary()
+        print(f"Archive analysis: {summary['valid_trades']} valid OTC trades out of {summary['legs']} legs "
+              f"(USD volume: ${summary['usd_volume']:,.2f})")
+        return result.to_records()
+    
     def generate_otc_transactions(self, price_data):
         """Generate OTC transactions from price history data"""
         otc_transactions = []
@@ -122,11 +160,12 @@ class OTCDataPopulator:
         saved_count = 0
         for tx in transactions:
             try:
+                kta_raw, murf_raw = raw_amounts(tx)
                 cursor.execute('''
                     INSERT OR REPLACE INTO otc_transactions 
                     (tx_hash, block_hash, kta_amount, murf_amount, exchange_rate, 
-                     from_address, to_address, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                     from_address, to_address, timestamp, kta_amount_raw, murf_amount_raw)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     tx['tx_hash'],
                     tx['block_hash'],
@@ -135,7 +174,9 @@ class OTCDataPopulator:
                     tx['exchange_rate'],
                     tx['from_address'],
                     tx['to_address'],
-                    tx['timestamp']
+                    tx['timestamp'],
+                    str(kta_raw),
+                    str(murf_raw)
                 ))
                 saved_count += 1
                 
@@ -179,6 +220,14 @@ class OTCDataPopulator:
         """Main function to populate OTC database"""
         print("Starting OTC Database Population...")
         
+        # Prefer real trades from the archived ledger history
+        otc_transactions = self.analyze_archived_history()
+        if otc_transactions:
+            saved_count = self.save_otc_transactions(otc_transactions)
+            self.get_database_stats()
+            print(f"\nPopulation completed! Saved {saved_count} OTC transactions from ledger archive")
+            return True
+        
         # Get price history data
         price_data = self.get_price_history_data()
         if not price_data:
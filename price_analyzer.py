@@ -6,10 +6,40 @@ Analisis harga dan volume trading MURF-KTA
 
 import sqlite3
 import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 import matplotlib.pyplot as plt
 import pandas as pd
+from keeta_monitor import LARGE_TRADE_AMOUNT
+
+# Kolom trades yang dipakai laporan (tanpa payload JSON)
+TRADE_COLUMNS = (
+    "id", "timestamp", "block_hash", "from_address", "to_address", "token_id",
+    "amount_decimal", "trade_type", "is_otc", "otc_type", "exchange_ratio",
+    "counterpart_amount", "counterpart_token"
+)
+
+# Ringkasan 24 jam dari trade_minutes: (nama, ekspresi SQL), dihitung dalam satu scan
+MINUTE_SUMMARY = (
+    ("total_trades", "TOTAL(trades)"),
+    ("large_trades", "TOTAL(large_trades)"),
+    ("murf_volume", "TOTAL(CASE WHEN token_id = :murf THEN volume END)"),
+    ("murf_max", "MAX(CASE WHEN token_id = :murf THEN max_amount END)"),
+    ("kta_volume", "TOTAL(CASE WHEN token_id = :kta THEN volume END)"),
+    ("kta_max", "MAX(CASE WHEN token_id = :kta THEN max_amount END)"),
+    ("otc_trades", "TOTAL(CASE WHEN is_otc THEN trades END)"),
+    ("otc_volume", "TOTAL(CASE WHEN is_otc THEN volume END)"),
+    ("otc_ratio_sum", "TOTAL(CASE WHEN is_otc THEN ratio_sum END)"),
+    ("otc_ratio_count", "TOTAL(CASE WHEN is_otc THEN ratio_count END)"),
+    ("buy_trades", "TOTAL(CASE WHEN is_otc AND otc_type = 'buy' THEN trades END)"),
+    ("sell_trades", "TOTAL(CASE WHEN is_otc AND otc_type = 'sell' THEN trades END)"),
+    ("swap_trades", "TOTAL(CASE WHEN is_otc AND otc_type = 'swap' THEN trades END)")
+)
+
+def utc_cutoff(hours: float) -> str:
+    """Batas waktu N jam lalu dalam format timestamp block (UTC, '...Z')"""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
+    return cutoff.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
 
 class KeetaPriceAnalyzer:
     def __init__(self, db_path: str = "keeta_trades.db"):
@@ -22,39 +52,85 @@ class KeetaPriceAnalyzer:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        cutoff_time = datetime.now() - timedelta(hours=hours)
+        cutoff_time = utc_cutoff(hours)
         
-        cursor.execute('''
-            SELECT * FROM trades 
+        cursor.execute(f'''
+            SELECT {", ".join(TRADE_COLUMNS)} FROM trades 
             WHERE timestamp > ? 
             ORDER BY timestamp DESC
-        ''', (cutoff_time.isoformat(),))
+        ''', (cutoff_time,))
         
-        columns = [description[0] for description in cursor.description]
-        trades = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        trades = [dict(zip(TRADE_COLUMNS, row)) for row in cursor.fetchall()]
         
         conn.close()
         return trades
     
-    def get_otc_trades(self, hours: int = 24) -> List[Dict]:
+    def get_otc_trades(self, hours: int = 24, limit: Optional[int] = None) -> List[Dict]:
         """Ambil transaksi OTC terbaru"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        cutoff_time = datetime.now() - timedelta(hours=hours)
+        cutoff_time = utc_cutoff(hours)
         
-        cursor.execute('''
-            SELECT * FROM trades 
-            WHERE timestamp > ? AND is_otc = 1
+        cursor.execute(f'''
+            SELECT {", ".join(TRADE_COLUMNS)} FROM trades 
+            WHERE is_otc = 1 AND timestamp > ?
             ORDER BY timestamp DESC
-        ''', (cutoff_time.isoformat(),))
+            LIMIT ?
+        ''', (cutoff_time, limit if limit is not None else -1))
         
-        columns = [description[0] for description in cursor.description]
-        otc_trades = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        otc_trades = [dict(zip(TRADE_COLUMNS, row)) for row in cursor.fetchall()]
         
         conn.close()
         return otc_trades
     
+    def get_large_trades(self, hours: int = 24, limit: int = 20) -> List[Dict]:
+        """Transaksi besar terbaru (>= LARGE_TRADE_AMOUNT), hanya kolom yang ditampilkan"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cutoff_time = utc_cutoff(hours)
+        
+        cursor.execute('''
+            SELECT timestamp, token_id, amount_decimal, from_address, to_address
+            FROM trades INDEXED BY idx_trades_timestamp
+            WHERE timestamp > ? AND amount_decimal >= ?
+            ORDER BY timestamp DESC
+            LIMIT ?
+        ''', (cutoff_time, LARGE_TRADE_AMOUNT, limit))
+        
+        large_trades = [{
+            'timestamp': row[0],
+            'token': 'MURF' if row[1] == self.murf_token else 'KTA',
+            'amount': row[2],
+            'from': row[3],
+            'to': row[4]
+        } for row in cursor.fetchall()]
+        
+        conn.close()
+        return large_trades
+    
+    def get_minute_aggregates(self, hours: int = 24) -> Optional[Dict]:
+        """Ringkasan agregat per menit (trade_minutes) untuk N jam terakhir dalam satu baris"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cutoff_minute = utc_cutoff(hours)[:16]
+        
+        try:
+            cursor.execute(f'''
+                SELECT {", ".join(expr for _, expr in MINUTE_SUMMARY)}
+                FROM trade_minutes
+                WHERE minute >= :cutoff
+            ''', {"cutoff": cutoff_minute, "murf": self.murf_token, "kta": self.kta_token})
+            summary = dict(zip((name for name, _ in MINUTE_SUMMARY), cursor.fetchone()))
+        except sqlite3.OperationalError:
+            # Database belum dimigrasi ke schema v4 (jalankan KeetaMonitor sekali)
+            summary = None
+        
+        conn.close()
+        return summary
+    
     def calculate_murf_kta_ratio(self, trades: List[Dict]) -> float:
         """Hitung rasio MURF/KTA dari transaksi"""
         murf_trades = [t for t in trades if t['token_id'] == self.murf_token]
@@ -85,7 +161,7 @@ class KeetaPriceAnalyzer:
             'total_trades': len(trades)
         }
     
-    def detect_large_trades(self, trades: List[Dict], threshold: int = 1000000) -> List[Dict]:
+    def detect_large_trades(self, trades: List[Dict], threshold: int = LARGE_TRADE_AMOUNT) -> List[Dict]:
         """Deteksi transaksi besar (whale trades)"""
         large_trades = []
         
@@ -102,19 +178,37 @@ class KeetaPriceAnalyzer:
         return large_trades
     
     def generate_price_report(self) -> Dict:
-        """Generate laporan harga lengkap"""
-        trades = self.get_recent_trades(24)  # 24 jam terakhir
-        otc_trades = self.get_otc_trades(24)  # Transaksi OTC 24 jam terakhir
-        
-        if not trades:
+        """Generate laporan harga lengkap dari agregat per menit 24 jam terakhir"""
+        summary = self.get_minute_aggregates(24)
+        if summary is None:
+            return {"error": "Trade aggregates not available (run keeta_monitor.py to migrate the database)"}
+        if not summary['total_trades']:
             return {"error": "No recent trades found"}
         
-        ratio = self.calculate_murf_kta_ratio(trades)
-        volume = self.get_trading_volume(trades)
-        large_trades = self.detect_large_trades(trades)
+        # Rasio dari transaksi terbesar masing-masing token (30M MURF = 116 KTA)
+        max_murf = summary['murf_max'] or 0
+        max_kta = summary['kta_max'] or 0
+        ratio = max_murf / max_kta if max_murf > 0 and max_kta > 0 else 0.0
+        
+        volume = {
+            'murf_volume': summary['murf_volume'],
+            'kta_volume': summary['kta_volume'],
+            'total_trades': int(summary['total_trades'])
+        }
+        large_trade_count = int(summary['large_trades'])
+        large_trades = self.get_large_trades(24) if large_trade_count else []
         
         # Analisis khusus OTC
-        otc_analysis = self.analyze_otc_trades(otc_trades)
+        otc_trades = int(summary['otc_trades'])
+        otc_analysis = {
+            "total_otc_trades": otc_trades,
+            "otc_volume": summary['otc_volume'],
+            "avg_price": summary['otc_ratio_sum'] / summary['otc_ratio_count'] if summary['otc_ratio_count'] else 0,
+            "buy_trades": int(summary['buy_trades']),
+            "sell_trades": int(summary['sell_trades']),
+            "swap_trades": int(summary['swap_trades']),
+            "recent_otc": self.get_otc_trades(24, limit=5) if otc_trades else []  # 5 transaksi OTC terbaru
+        }
         
         report = {
             "timestamp": datetime.now().isoformat(),
@@ -130,11 +224,12 @@ class KeetaPriceAnalyzer:
             },
             "otc_analysis": otc_analysis,
             "large_trades": large_trades,
+            "large_trade_count": large_trade_count,
             "market_analysis": {
                 "active_trading": volume['total_trades'] > 10,
                 "high_volume": volume['murf_volume'] > 1000000000,  # 1B MURF
-                "whale_activity": len(large_trades) > 0,
-                "otc_activity": len(otc_trades) > 0
+                "whale_activity": large_trade_count > 0,
+                "otc_activity": otc_trades > 0
             }
         }
         
@@ -146,8 +241,8 @@ class KeetaPriceAnalyzer:
             return {"total_otc_trades": 0, "otc_volume": 0, "avg_price": 0}
         
         total_volume = sum(t['amount_decimal'] for t in otc_trades)
-        total_price = sum(t['price_decimal'] for t in otc_trades if t['price_decimal'] > 0)
-        avg_price = total_price / len([t for t in otc_trades if t['price_decimal'] > 0]) if any(t['price_decimal'] > 0 for t in otc_trades) else 0
+        prices = [t['exchange_ratio'] for t in otc_trades if (t.get('exchange_ratio') or 0) > 0]
+        avg_price = sum(prices) / len(prices) if prices else 0
         
         # Kategorisasi berdasarkan otc_type
         buy_trades = [t for t in otc_trades if t.get('otc_type') == 'buy']
@@ -189,7 +284,7 @@ class KeetaPriceAnalyzer:
         print()
         
         if report['large_trades']:
-            print("🐋 Large Trades Detected:")
+            print(f"🐋 Large Trades Detected: {report['large_trade_count']}")
             for trade in report['large_trades'][:5]:  # Show top 5
                 print(f"   {trade['amount']:,} {trade['token']} at {trade['timestamp']}")
         print()
@@ -8,16 +8,39 @@ import http.server
 import socketserver
 import json
 import urllib.request
+import urllib.error
 import urllib.parse
 from datetime import datetime, timedelta, timezone
 import threading
 import time
 from price_history_db import PriceHistoryDB
-from otc_transactions_db import OTCTransactionsDB
+from otc_transactions_db import OTCTransactionsDB, raw_amounts
 from murf_holders_db import MURFHoldersDB
+from holder_analytics import get_holder_analytics, numpy_available
+from holder_export import HolderExporter, FORMATS as EXPORT_FORMATS
 from smart_holders_manager import SmartHoldersManager
+from worker_runtime import WorkerRuntime
+from adaptive_poller import AdaptivePoller
+from ingest_backends import ingest_backend, StreamSubscriber
+from history_stream import read_history_page
+from operation_records import SymbolTable, normalize_block, MURF_ID, KTA_ID
+from block_cache import SeenBlockCache
+from otc_engine import OTC_ENGINE
+from amount_codec import decode_hex, to_float, KTA_DECIMALS, MURF_DECIMALS
 
 class RealLiveAPIClient:
+    # Shared by the per-request clients so overlapping polls skip seen blocks
+    # (created on first use; path from KEETA_BLOCK_CACHE_DB)
+    _block_cache = None
+    _block_cache_lock = threading.Lock()
+    
+    # API polled at an activity-driven interval instead of on every request;
+    # requests in between reuse the last analysis
+    poller = AdaptivePoller(15, min_interval=5, max_interval=120)
+    last_analysis = None
+    # True while a StreamSubscriber feeds ingest_page (no API fetch per request)
+    subscribed = False
+    
     def __init__(self):
         self.keeta_api_url = "https://rep2.main.network.api.keeta.com/api/node/ledger/history"
         self.murf_token = "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm"
@@ -31,6 +54,15 @@ class RealLiveAPIClient:
         self.kta_price_usd = self.get_real_kta_price()
         self.murf_total_supply = 1000000000000  # 1T MURF
         self.murf_circulation = 60000000000  # 60B MURF
+    
+    @property
+    def block_cache(self):
+        """Seen-block cache shared by all clients"""
+        if RealLiveAPIClient._block_cache is None:
+            with RealLiveAPIClient._block_cache_lock:
+                if RealLiveAPIClient._block_cache is None:
+                    RealLiveAPIClient._block_cache = SeenBlockCache("real_live_dashboard")
+        return RealLiveAPIClient._block_cache
         
     def get_real_kta_price(self):
         """Get real KTA price from CoinGecko API"""
@@ -62,12 +94,7 @@ class RealLiveAPIClient:
     
     def hex_to_decimal(self, hex_string):
         """Convert hex string to decimal"""
-        try:
-            if hex_string.startswith('0x'):
-                hex_string = hex_string[2:]
-            return int(hex_string, 16)
-        except:
-            return 0
+        return decode_hex(hex_string)
     
     def format_number(self, number, decimals=2):
         """Format large numbers with suffixes (K, M, B)"""
@@ -91,12 +118,25 @@ class RealLiveAPIClient:
         try:
             url = f"{self.keeta_api_url}?limit={limit}"
             with urllib.request.urlopen(url, timeout=10) as response:
-                data = json.loads(response.read().decode('utf-8'))
-                return data
+                self.poller.observe_response(response)
+                # Selective decode: only blocks + fields used by analyze_keeta_data
+                return read_history_page(response)
+        except urllib.error.HTTPError as e:
+            # 429/503 carry Retry-After / rate-limit headers
+            self.poller.observe_response(e)
+            print(f"Error fetching Keeta data: {e}")
+            return None
         except Exception as e:
             print(f"Error fetching Keeta data: {e}")
             return None
     
+    def ingest_page(self, page):
+        """Ingest handler: analyze a pushed page (saves its OTC trades), return new MURF/KTA blocks"""
+        analysis = self.analyze_keeta_data(page)
+        if analysis['type_7_murf_txs'] or RealLiveAPIClient.last_analysis is None:
+            RealLiveAPIClient.last_analysis = analysis
+        return analysis['new_activity']
+    
     def analyze_keeta_data(self, data):
         """Analyze Keeta data for OTC transactions - Type 7 KTA + Type 0 MURF dalam block yang sama"""
         if not data:
@@ -104,16 +144,14 @@ class RealLiveAPIClient:
                 'total_blocks': 0,
                 'recent_activity': [],
                 'last_update': datetime.now().isoformat(),
-                'type_7_murf_txs': []
+                'type_7_murf_txs': [],
+                'new_activity': 0
             }
         
         recent_activity = []
         total_blocks = 0
         otc_transactions = []
-        
-        # Token IDs
-        kta_token = "keeta_anqdilpazdekdu4acw65fj7smltcp26wbrildkqtszqvverljpwpezmd44ssg"
-        murf_token = "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm"
+        new_activity = 0
         
         # Check for new API structure (blocks directly in root)
         if 'blocks' in data:
@@ -132,128 +170,106 @@ class RealLiveAPIClient:
                 'total_blocks': 0,
                 'recent_activity': [],
                 'last_update': datetime.now().isoformat(),
-                'type_7_murf_txs': []
+                'type_7_murf_txs': [],
+                'new_activity': 0
             }
         
-        # Process blocks for OTC transactions
-        for j, block in enumerate(blocks):
-            if 'operations' in block:
-                operations = block['operations']
-                total_blocks += 1
+        blocks = [block for block in blocks if isinstance(block, dict)]
+        total_blocks = sum(1 for block in blocks if 'operations' in block)
+        
+        # Only blocks not handled by a previous (overlapping) poll
+        fresh = [j for j, block in enumerate(blocks)
+                 if self.block_cache.is_new(block.get('$hash'), block.get('date'))]
+        print(f"[CACHE] {len(fresh)} new blocks (skipped {len(blocks) - len(fresh)} already seen)")
+        
+        # Process blocks for OTC transactions (one symbol table per poll)
+        symbols = SymbolTable()
+        for j in fresh:
+            # Normalize: interned token/address IDs + integer amounts
+            block = normalize_block(blocks[j], symbols)
+            if any(op.token in (MURF_ID, KTA_ID) for op in block.operations):
+                new_activity += 1
+            
+            # Pasangkan leg OTC (Type 7 KTA/MURF + Type 0 lawannya) dalam satu pass;
+            # block sebelumnya hanya dinormalisasi jika leg MURF tidak ada di block ini
+            previous = (lambda j=j: normalize_block(blocks[j-1], symbols)) if j > 0 else None
+            for match in OTC_ENGINE.match_block(block, previous):
+                op = match.op
+                from_addr = symbols.name(op.from_id) or 'N/A'
+                kta_amount = match.kta_decimal
+                murf_amount = match.murf_amount  # TIDAK dibagi 1e18 untuk MURF
+                to_addr = 'N/A'
+                if match.counterpart:
+                    to_addr = symbols.name(match.counterpart.to_id) or 'N/A'
+                
+                if match.is_kta_seller:
+                    # Pattern 1: KTA -> MURF (Type 7 KTA + Type 0 MURF)
+                    print(f"[OK] Found Type 7 KTA: {block.hash[:20]}... KTA: {kta_amount:.2f}")
+                    if match.counterpart and not match.from_previous:
+                        print(f"   [OK] Found Type 0 MURF: {murf_amount:.0f} MURF")
+                else:
+                    # Pattern 2: MURF -> KTA (Type 7 MURF + Type 0 KTA)
+                    print(f"[OK] Found Type 7 MURF: {block.hash[:20]}... MURF: {murf_amount:.0f}")
+                    if match.counterpart:
+                        print(f"   [OK] Found Type 0 KTA: {kta_amount:.2f} KTA")
                 
-                # Cari OTC operations (Type 7 KTA atau Type 7 MURF)
-                for op in operations:
-                    op_type = op.get('type')
-                    token = op.get('token', '')
+                print(f"   MURF found: {murf_amount:.2f} MURF")
+                
+                # Simpan OTC transaction ke database dengan pola yang benar
+                # Pengirim: from_addr (dari Type 7 KTA)
+                # Penerima: account field (dari block header)
+                account_addr = symbols.name(block.account) or to_addr  # Fallback ke to_addr jika tidak ada account
+                
+                otc_tx_data = {
+                    'tx_hash': block.hash or 'N/A',
+                    'block_hash': block.hash or 'N/A',
+                    'kta_amount': kta_amount,
+                    'murf_amount': murf_amount,
+                    'from_address': from_addr,  # Pengirim dari Type 7
+                    'to_address': account_addr,  # Penerima dari account field
+                    'timestamp': block.date or 'N/A',
+                    'exchange_rate': murf_amount/kta_amount if kta_amount > 0 else 0,
+                    'kta_amount_raw': str(match.kta_amount),
+                    'murf_amount_raw': str(match.murf_amount)
+                }
+                
+                # Debug: Show correct sender/receiver pattern
+                print(f"   [INFO] OTC Pattern:")
+                print(f"     Sender (Type 7): {from_addr[:20]}...")
+                print(f"     Receiver (Account): {account_addr[:20]}...")
+                print(f"     Different: {from_addr != account_addr}")
+                
+                # VALIDATION: Only save if MURF amount > 0 (real MURF OTC)
+                if murf_amount > 0:
+                    print(f"   [SAVE] Valid MURF OTC: {murf_amount:,.0f} MURF")
+                    # Simpan ke database
+                    self.otc_db.save_otc_transaction(otc_tx_data)
                     
-                    # Pattern 1: Type 7 dengan KTA token (KTA -> MURF)
-                    # Pattern 2: Type 7 dengan MURF token (MURF -> KTA)
-                    if op_type == 7 and (kta_token in token or murf_token in token):
-                        from_addr = op.get('from', 'N/A')
-                        exact = op.get('exact', False)
-                        
-                        # Determine which pattern we have
-                        is_kta_seller = kta_token in token
-                        is_murf_seller = murf_token in token
-                        
-                        if is_kta_seller:
-                            # Pattern 1: KTA -> MURF (Type 7 KTA + Type 0 MURF)
-                            kta_amount = self.hex_to_decimal(op.get('amount', '0x0')) / 1e18
-                            print(f"[OK] Found Type 7 KTA: {block.get('$hash', 'N/A')[:20]}... KTA: {kta_amount:.2f}")
-                            
-                            # Look for Type 0 MURF
-                            murf_amount = 0
-                            to_addr = 'N/A'
-                            for related_op in operations:
-                                if (related_op.get('type') == 0 and 
-                                    related_op.get('token') == murf_token):
-                                    murf_amount_raw = self.hex_to_decimal(related_op.get('amount', '0x0'))
-                                    murf_amount = murf_amount_raw  # TIDAK dibagi 1e18 untuk MURF
-                                    to_addr = related_op.get('to', 'N/A')
-                                    print(f"   [OK] Found Type 0 MURF: {murf_amount:.0f} MURF")
-                                    break
-                        
-                        elif is_murf_seller:
-                            # Pattern 2: MURF -> KTA (Type 7 MURF + Type 0 KTA)
-                            murf_amount_raw = self.hex_to_decimal(op.get('amount', '0x0'))
-                            murf_amount = murf_amount_raw  # TIDAK dibagi 1e18 untuk MURF
-                            print(f"[OK] Found Type 7 MURF: {block.get('$hash', 'N/A')[:20]}... MURF: {murf_amount:.0f}")
-                            
-                            # Look for Type 0 KTA
-                            kta_amount = 0
-                            to_addr = 'N/A'
-                            for related_op in operations:
-                                if (related_op.get('type') == 0 and 
-                                    related_op.get('token') == kta_token):
-                                    kta_amount = self.hex_to_decimal(related_op.get('amount', '0x0')) / 1e18
-                                    to_addr = related_op.get('to', 'N/A')
-                                    print(f"   [OK] Found Type 0 KTA: {kta_amount:.2f} KTA")
-                                    break
-                        
-                        # Jika tidak ada dalam block yang sama, cari di block sebelumnya
-                        if murf_amount == 0 and j > 0:
-                            prev_block = blocks[j-1]
-                            if 'operations' in prev_block:
-                                for prev_op in prev_block['operations']:
-                                    if (prev_op.get('type') == 0 and 
-                                        murf_token in prev_op.get('token', '')):
-                                        murf_amount = self.hex_to_decimal(prev_op.get('amount', '0x0'))  # TIDAK dibagi 1e18 untuk MURF
-                                        to_addr = prev_op.get('to', 'N/A')
-                                        break
-                        
-                        print(f"   MURF found: {murf_amount:.2f} MURF")
-                        
-                        # Simpan OTC transaction ke database dengan pola yang benar
-                        # Pengirim: from_addr (dari Type 7 KTA)
-                        # Penerima: account field (dari block header)
-                        account_addr = block.get('account', to_addr)  # Fallback ke to_addr jika tidak ada account
-                        
-                        otc_tx_data = {
-                            'tx_hash': block.get('$hash', 'N/A'),
-                            'block_hash': block.get('$hash', 'N/A'),
-                            'kta_amount': kta_amount,
-                            'murf_amount': murf_amount,
-                            'from_address': from_addr,  # Pengirim dari Type 7
-                            'to_address': account_addr,  # Penerima dari account field
-                            'timestamp': block.get('date', 'N/A'),
-                            'exchange_rate': murf_amount/kta_amount if kta_amount > 0 else 0
-                        }
-                        
-                        # Debug: Show correct sender/receiver pattern
-                        print(f"   [INFO] OTC Pattern:")
-                        print(f"     Sender (Type 7): {from_addr[:20]}...")
-                        print(f"     Receiver (Account): {account_addr[:20]}...")
-                        print(f"     Different: {from_addr != account_addr}")
-                        
-                        # VALIDATION: Only save if MURF amount > 0 (real MURF OTC)
-                        if murf_amount > 0:
-                            print(f"   [SAVE] Valid MURF OTC: {murf_amount:,.0f} MURF")
-                            # Simpan ke database
-                            self.otc_db.save_otc_transaction(otc_tx_data)
-                            
-                            # REAL-TIME: Add OTC participants (seller/buyer) to holders
-                            try:
-                                print(f"   [HOLDERS] Adding OTC participants: {from_addr[:20]}... -> {account_addr[:20]}...")
-                                new_holders_added = self.smart_holders.update_holders_from_otc()
-                                if new_holders_added > 0:
-                                    print(f"   [HOLDERS] Added {new_holders_added} new holders from OTC")
-                                else:
-                                    print(f"   [HOLDERS] No new holders (participants already tracked)")
-                            except Exception as holders_error:
-                                print(f"   [ERROR] Failed to add OTC participants: {holders_error}")
-                            
-                            # Tambahkan ke list
-                            otc_transactions.append(otc_tx_data)
+                    # REAL-TIME: Add OTC participants (seller/buyer) to holders
+                    try:
+                        print(f"   [HOLDERS] Adding OTC participants: {from_addr[:20]}... -> {account_addr[:20]}...")
+                        new_holders_added = self.smart_holders.update_holders_from_otc()
+                        if new_holders_added > 0:
+                            print(f"   [HOLDERS] Added {new_holders_added} new holders from OTC")
                         else:
-                            print(f"   [SKIP] Not MURF OTC: {murf_amount} MURF")
-        
+                            print(f"   [HOLDERS] No new holders (participants already tracked)")
+                    except Exception as holders_error:
+                        print(f"   [ERROR] Failed to add OTC participants: {holders_error}")
+                    
+                    # Tambahkan ke list
+                    otc_transactions.append(otc_tx_data)
+                else:
+                    print(f"   [SKIP] Not MURF OTC: {murf_amount} MURF")
+
+        self.block_cache.mark_blocks([blocks[j] for j in fresh])
         print(f"[DATA] Found {len(otc_transactions)} OTC transactions")
         
         return {
             'total_blocks': total_blocks,
             'recent_activity': recent_activity[:5],  # Last 5 activities
             'last_update': datetime.now().isoformat(),
-            'type_7_murf_txs': otc_transactions
+            'type_7_murf_txs': otc_transactions,
+            'new_activity': new_activity  # new blocks touching MURF/KTA
         }
     
     def get_otc_volume_stats(self):
@@ -266,22 +282,21 @@ class RealLiveAPIClient:
             one_hour_ago = now - timedelta(hours=1)
             one_day_ago = now - timedelta(days=1)
             
-            # Calculate volumes
-            total_volume_kta = 0
-            total_volume_murf = 0
-            one_hour_volume_kta = 0
-            one_hour_volume_murf = 0
-            one_day_volume_kta = 0
-            one_day_volume_murf = 0
+            # Calculate volumes exactly on raw integer amounts (no float drift)
+            total_kta_raw = 0
+            total_murf_raw = 0
+            one_hour_kta_raw = 0
+            one_hour_murf_raw = 0
+            one_day_kta_raw = 0
+            one_day_murf_raw = 0
             
             for tx in all_otc:
-                kta_amount = tx.get('kta_amount', 0)
-                murf_amount = tx.get('murf_amount', 0)
+                kta_raw, murf_raw = raw_amounts(tx)
                 timestamp_str = tx.get('timestamp', '')
                 
                 # Add to total volume
-                total_volume_kta += kta_amount
-                total_volume_murf += murf_amount
+                total_kta_raw += kta_raw
+                total_murf_raw += murf_raw
                 
                 # Parse timestamp for time-based calculations
                 try:
@@ -290,17 +305,24 @@ class RealLiveAPIClient:
                         
                         # Check if within 1 hour
                         if tx_time >= one_hour_ago:
-                            one_hour_volume_kta += kta_amount
-                            one_hour_volume_murf += murf_amount
+                            one_hour_kta_raw += kta_raw
+                            one_hour_murf_raw += murf_raw
                         
                         # Check if within 1 day
                         if tx_time >= one_day_ago:
-                            one_day_volume_kta += kta_amount
-                            one_day_volume_murf += murf_amount
+                            one_day_kta_raw += kta_raw
+                            one_day_murf_raw += murf_raw
                 except:
                     # If timestamp parsing fails, skip time-based calculations
                     pass
             
+            total_volume_kta = to_float(total_kta_raw, KTA_DECIMALS)
+            total_volume_murf = to_float(total_murf_raw, MURF_DECIMALS)
+            one_hour_volume_kta = to_float(one_hour_kta_raw, KTA_DECIMALS)
+            one_hour_volume_murf = to_float(one_hour_murf_raw, MURF_DECIMALS)
+            one_day_volume_kta = to_float(one_day_kta_raw, KTA_DECIMALS)
+            one_day_volume_murf = to_float(one_day_murf_raw, MURF_DECIMALS)
+            
             return {
                 'total_volume_kta': total_volume_kta,
                 'total_volume_murf': total_volume_murf,
@@ -330,12 +352,22 @@ class RealLiveAPIClient:
             analysis = None
             
             try:
-                keeta_data = self.fetch_keeta_data()
-                if keeta_data:
-                    analysis = self.analyze_keeta_data(keeta_data)
-                    print("[OK] API data fetched successfully")
+                if RealLiveAPIClient.subscribed:
+                    # Pages are pushed by the stream subscriber
+                    analysis = RealLiveAPIClient.last_analysis
+                elif not self.poller.due():
+                    # Not yet time for the next poll: reuse the last analysis
+                    analysis = RealLiveAPIClient.last_analysis
+                    print(f"[CACHE] Reusing API data, next poll in {self.poller.get_stats()['next_poll_in']:.0f}s")
                 else:
-                    print("[WARNING] API data fetch failed, using database fallback")
+                    keeta_data = self.fetch_keeta_data()
+                    if keeta_data:
+                        analysis = self.analyze_keeta_data(keeta_data)
+                        RealLiveAPIClient.last_analysis = analysis
+                        print("[OK] API data fetched successfully")
+                    else:
+                        print("[WARNING] API data fetch failed, using database fallback")
+                    self.poller.record(analysis['new_activity'] if analysis else 0)
             except Exception as api_error:
                 print(f"[ERROR] API Error: {api_error}")
                 print("[DATA] Using database fallback for data")
@@ -578,6 +610,10 @@ class RealLiveDashboardHandler(http.server.BaseHTTPRequestHandler):
             self.serve_dashboard()
         elif self.path == '/api/stats':
             self.serve_stats()
+        elif self.path.split('?')[0] == '/api/holders/analytics':
+            self.serve_holder_analytics()
+        elif self.path.split('?')[0] == '/api/holders/export':
+            self.serve_holder_export()
         else:
             self.send_error(404)
     
@@ -2617,9 +2653,74 @@ class RealLiveDashboardHandler(http.server.BaseHTTPRequestHandler):
         stats = self.api_client.get_token_statistics()
         self.send_json_response(stats)
     
-    def send_json_response(self, data):
-        """Send JSON response"""
+    def serve_holder_analytics(self):
+        """Serve holder distribution analytics as JSON (?source=<holder store source>)"""
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        source = query.get('source', [None])[0]
+        if not numpy_available():
+            self.send_json_response({'error': 'numpy is required for holder analytics (pip install numpy)'},
+                                    status=501)
+            return
+        try:
+            self.send_json_response(get_holder_analytics().get_distribution(source))
+        except Exception as e:
+            print(f"[ERROR] Holder analytics error: {e}")
+            self.send_json_response({'error': str(e)}, status=500)
+    
+    def serve_holder_export(self):
+        """Stream the holders export (?format=csv|csv.gz|ndjson|ndjson.gz|parquet&incremental=1&name=...)"""
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        fmt = query.get('format', ['csv.gz'])[0]
+        incremental = query.get('incremental', ['0'])[0] in ('1', 'true')
+        name = query.get('name', ['default'])[0]
+        if fmt not in EXPORT_FORMATS:
+            self.send_json_response({'error': f'Unknown format: {fmt}'}, status=400)
+            return
+        
+        content_type, encoding, extension = EXPORT_FORMATS[fmt]
+        stream = HolderExporter().stream(fmt, incremental=incremental, name=name)
+        try:
+            first = next(stream, b'')  # surfaces setup errors (e.g. missing pyarrow) before headers
+        except Exception as e:
+            print(f"[ERROR] Holder export error: {e}")
+            self.send_json_response({'error': str(e)}, status=500)
+            return
+        
+        # Chunked transfer needs an HTTP/1.1 status line; HTTP/1.0 clients get a close-delimited body
+        chunked = self.request_version == 'HTTP/1.1'
+        if chunked:
+            self.protocol_version = 'HTTP/1.1'
         self.send_response(200)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Disposition', f'attachment; filename="murf_holders{extension}"')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        
+        try:
+            if first:
+                self._write_export_chunk(first, chunked)
+            for data in stream:
+                if data:
+                    self._write_export_chunk(data, chunked)
+            if chunked:
+                self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            print("[EXPORT] Client disconnected, export not recorded")
+            stream.close()
+    
+    def _write_export_chunk(self, data, chunked):
+        if chunked:
+            self.wfile.write(b'%X\r\n' % len(data) + data + b'\r\n')
+        else:
+            self.wfile.write(data)
+    
+    def send_json_response(self, data, status=200):
+        """Send JSON response"""
+        self.send_response(status)
         self.send_header('Content-type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
@@ -2636,9 +2737,18 @@ def main():
     print("[WARNING]  WARNING: Prices are estimates, not live trading prices")
     print("Press Ctrl+C to stop")
     
-    # Start background holders refresh
+    # Start background holders refresh (scheduled job, stopped with the server)
     client = RealLiveAPIClient()
-    client.smart_holders.start_background_refresh()
+    runtime = WorkerRuntime("dashboard")
+    client.smart_holders.start_background_refresh(runtime)
+    
+    # KEETA_INGEST=stream: new blocks are pushed into the database as the node produces them;
+    # otherwise the API is polled from stats requests
+    ingest = ingest_backend(client.fetch_keeta_data, RealLiveAPIClient.poller)
+    if isinstance(ingest, StreamSubscriber):
+        ingest.start(client.ingest_page)
+        RealLiveAPIClient.subscribed = True
+        print(f"[STREAM] Subscribed to {ingest.url}")
     
     with socketserver.TCPServer(("0.0.0.0", PORT), RealLiveDashboardHandler) as httpd:
         print(f"[OK] Server running on port {PORT}")
@@ -2646,6 +2756,9 @@ def main():
             httpd.serve_forever()
         except KeyboardInterrupt:
             print("\n[STOP] Server stopped")
+        finally:
+            ingest.stop()
+            runtime.stop()
 
 if __name__ == "__main__":
     main()
@@ -8,6 +8,7 @@ import requests
 import sqlite3
 import time
 from datetime import datetime
+from amount_codec import decode_hex
 
 class RealTimeHoldersScanner:
     def __init__(self):
@@ -18,10 +19,7 @@ class RealTimeHoldersScanner:
         
     def hex_to_decimal(self, hex_str):
         """Convert hex string to decimal"""
-        try:
-            return int(hex_str, 16)
-        except:
-            return 0
+        return decode_hex(hex_str)
     
     def get_current_balance(self, address):
         """Get current MURF balance for an address"""
@@ -4,109 +4,88 @@ Keeta Monitor Runner
 Script utama untuk menjalankan semua komponen monitoring
 """
 
-import time
-import threading
 from datetime import datetime
 from keeta_monitor import KeetaMonitor
 from price_analyzer import KeetaPriceAnalyzer
 from notification_system import KeetaNotifier
+from alert_engine import AlertEngine
+from notification_dispatcher import NotificationDispatcher, channels_from_env
+from worker_runtime import WorkerRuntime
+from adaptive_poller import AdaptivePoller
+from ingest_backends import ingest_backend
+from history_stream import MONITOR_BLOCK_FIELDS
 
 class KeetaMonitorRunner:
     def __init__(self):
         self.monitor = KeetaMonitor()
         self.analyzer = KeetaPriceAnalyzer()
         self.notifier = KeetaNotifier()
+        
+        # Alert dievaluasi saat trade disimpan (tanpa polling database tiap menit)
+        self.alert_engine = AlertEngine(self.notifier)
+        self.monitor.alert_engine = self.alert_engine
+        
+        # Pengiriman notifikasi lewat outbox (channel dari environment variable)
+        self.dispatcher = NotificationDispatcher(channels_from_env())
+        self.notifier.dispatcher = self.dispatcher
+        self.alert_engine.subscribe(self.dispatcher.enqueue)
+        
+        # Scheduler tunggal untuk semua job periodik
+        self.runtime = WorkerRuntime("keeta-monitor")
+        
+        # Interval polling mengikuti aktivitas: 30s normal, 5s saat ramai, maks 5 menit saat sepi
+        self.poller = AdaptivePoller(30, min_interval=5, max_interval=300)
+        self.monitor.poller = self.poller
+        
+        # Sumber halaman history: polling (default) atau stream dari node (KEETA_INGEST=stream)
+        self.ingest = ingest_backend(lambda: self.monitor.get_ledger_history(limit=50),
+                                     self.poller, MONITOR_BLOCK_FIELDS)
         self.running = False
     
     def start_monitoring(self):
-        """Mulai monitoring dalam thread terpisah"""
+        """Mulai monitoring: semua job periodik dijalankan oleh satu WorkerRuntime"""
         self.running = True
         
-        # Thread untuk monitoring transaksi
-        monitor_thread = threading.Thread(target=self._monitor_loop)
-        monitor_thread.daemon = True
-        monitor_thread.start()
+        # State window alert diisi sekali dari database (sebelum trade baru masuk)
+        self.alert_engine.warm_start(self.monitor.db_path)
         
-        # Thread untuk analisis harga
-        analysis_thread = threading.Thread(target=self._analysis_loop)
-        analysis_thread.daemon = True
-        analysis_thread.start()
+        # Ingest transaksi dan laporan harga; run yang masih berjalan tidak ditumpuk
+        self.ingest.start(self._ingest_page, self.runtime)
+        self.runtime.register("price-report", self._print_report, interval=300, timeout=120)
         
-        # Thread untuk notifikasi
-        notification_thread = threading.Thread(target=self._notification_loop)
-        notification_thread.daemon = True
-        notification_thread.start()
+        # Worker pengiriman notifikasi (satu job per channel)
+        self.dispatcher.start(self.runtime)
         
         print("🚀 Keeta Monitor Started!")
-        print("Monitoring MURF-KTA OTC trades...")
+        print(f"Monitoring MURF-KTA OTC trades ({self.ingest.name} ingest)...")
         print("Press Ctrl+C to stop")
         
         try:
-            while self.running:
-                time.sleep(1)
+            self.runtime.run_forever()
         except KeyboardInterrupt:
             self.stop_monitoring()
     
-    def _monitor_loop(self):
-        """Loop untuk monitoring transaksi"""
-        while self.running:
-            try:
-                # Ambil data terbaru
-                history = self.monitor.get_ledger_history(limit=50)
-                if history:
-                    # Parse dan simpan transaksi
-                    new_trades = 0
-                    for entry in history.get("history", []):
-                        blocks = entry.get("voteStaple", {}).get("blocks", [])
-                        
-                        for block in blocks:
-                            operations = block.get("operations", [])
-                            
-                            for operation in operations:
-                                trade_data = self.monitor.parse_transaction(operation, block)
-                                if trade_data:
-                                    self.monitor.save_trade(trade_data)
-                                    new_trades += 1
-                    
-                    if new_trades > 0:
-                        print(f"📊 Found {new_trades} new trades at {datetime.now().strftime('%H:%M:%S')}")
-                
-                time.sleep(30)  # Check every 30 seconds
-                
-            except Exception as e:
-                print(f"❌ Monitor error: {e}")
-                time.sleep(60)
-    
-    def _analysis_loop(self):
-        """Loop untuk analisis harga"""
-        while self.running:
-            try:
-                # Generate dan tampilkan laporan harga
-                self.analyzer.print_price_summary()
-                print("-" * 50)
-                
-                time.sleep(300)  # Update every 5 minutes
-                
-            except Exception as e:
-                print(f"❌ Analysis error: {e}")
-                time.sleep(60)
+    def _ingest_page(self, history):
+        """Simpan trade baru dari satu halaman history, return jumlah trade baru"""
+        # Parse dan simpan satu halaman sekaligus
+        new_trades = self.monitor.ingest_history(history)["inserted"]
+        
+        if new_trades > 0:
+            print(f"📊 Found {new_trades} new trades at {datetime.now().strftime('%H:%M:%S')}")
+        # Trade MURF/KTA baru mempercepat polling, halaman kosong/gagal memperlambat
+        return new_trades
     
-    def _notification_loop(self):
-        """Loop untuk notifikasi"""
-        while self.running:
-            try:
-                # Cek alert
-                self.notifier.check_alerts()
-                
-                time.sleep(60)  # Check alerts every minute
-                
-            except Exception as e:
-                print(f"❌ Notification error: {e}")
-                time.sleep(60)
+    def _print_report(self):
+        """Generate dan tampilkan laporan harga"""
+        self.analyzer.print_price_summary()
+        print("-" * 50)
     
     def stop_monitoring(self):
         """Stop monitoring"""
         self.running = False
+        self.ingest.stop()
+        self.runtime.stop()
+        self.dispatcher.stop()
         print("\n👋 Keeta Monitor stopped")
 
 def main():
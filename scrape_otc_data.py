@@ -5,6 +5,10 @@ import json
 import sqlite3
 from datetime import datetime
 import time
+from ledger_archive import LedgerArchive, replay_archive
+from otc_batch import analyze_archive, np
+from otc_transactions_db import ensure_raw_amount_columns, raw_amounts
+from amount_codec import decode_hex, to_float, KTA_DECIMALS
 
 class OTCDataScraper:
     def __init__(self):
@@ -39,6 +43,9 @@ class OTCDataScraper:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_tx_hash ON otc_transactions(tx_hash)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON otc_transactions(timestamp)')
         
+        # Exact raw amount columns
+        ensure_raw_amount_columns(cursor)
+        
         conn.commit()
         conn.close()
         print("Database initialized successfully")
@@ -93,12 +100,11 @@ class OTCDataScraper:
                 if type_7_kta and type_0_murf:
                     try:
                         # Parse KTA amount
-                        kta_amount_hex = type_7_kta.get('amount', '0x0')
-                        kta_amount = int(kta_amount_hex, 16) / 1e18
+                        kta_raw = decode_hex(type_7_kta.get('amount', '0x0'))
+                        kta_amount = to_float(kta_raw, KTA_DECIMALS)
                         
                         # Parse MURF amount
-                        murf_amount_hex = type_0_murf.get('amount', '0x0')
-                        murf_amount = int(murf_amount_hex, 16)
+                        murf_amount = decode_hex(type_0_murf.get('amount', '0x0'))
                         
                         if kta_amount > 0 and murf_amount > 0:
                             exchange_rate = murf_amount / kta_amount
@@ -111,7 +117,9 @@ class OTCDataScraper:
                                 'exchange_rate': exchange_rate,
                                 'from_address': type_7_kta.get('from', 'N/A'),
                                 'to_address': type_0_murf.get('to', 'N/A'),
-                                'timestamp': entry.get('date', datetime.now().isoformat())
+                                'timestamp': entry.get('date', datetime.now().isoformat()),
+                                'kta_amount_raw': kta_raw,
+                                'murf_amount_raw': murf_amount
                             }
                             
                             otc_transactions.append(otc_transaction)
@@ -135,11 +143,12 @@ class OTCDataScraper:
         saved_count = 0
         for tx in transactions:
             try:
+                kta_raw, murf_raw = raw_amounts(tx)
                 cursor.execute('''
                     INSERT OR REPLACE INTO otc_transactions 
                     (tx_hash, block_hash, kta_amount, murf_amount, exchange_rate, 
-                     from_address, to_address, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                     from_address, to_address, timestamp, kta_amount_raw, murf_amount_raw)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     tx['tx_hash'],
                     tx['block_hash'],
@@ -148,7 +157,9 @@ class OTCDataScraper:
                     tx['exchange_rate'],
                     tx['from_address'],
                     tx['to_address'],
-                    tx['timestamp']
+                    tx['timestamp'],
+                    str(kta_raw),
+                    str(murf_raw)
                 ))
                 saved_count += 1
                 print(f"Saved OTC transaction: {tx['tx_hash'][:20]}...")
@@ -162,6 +173,44 @@ class OTCDataScraper:
         print(f"Saved {saved_count} OTC transactions to database")
         return saved_count
     
+    def save_otc_batch(self, transactions):
+        """Save many OTC transactions in one statement"""
+        if not transactions:
+            return 0
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO otc_transactions 
+            (tx_hash, block_hash, kta_amount, murf_amount, exchange_rate, 
+             from_address, to_address, timestamp, kta_amount_raw, murf_amount_raw)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(tx['tx_hash'], tx['block_hash'], tx['kta_amount'], tx['murf_amount'],
+               tx['exchange_rate'], tx['from_address'], tx['to_address'], tx['timestamp'])
+              + tuple(str(raw) for raw in raw_amounts(tx))
+              for tx in transactions])
+        conn.commit()
+        conn.close()
+        return len(transactions)
+    
+    def backfill_from_archive(self, archive=None, max_pages=None, kta_price_usd=0.0):
+        """Batch (vectorized) OTC backfill over the local ledger archive"""
+        archive = archive or LedgerArchive()
+        print(f"Batch OTC backfill from archive: {archive.db_path}")
+        
+        start_time = time.time()
+        result = analyze_archive(archive, max_pages=max_pages, kta_price_usd=kta_price_usd)
+        summary = result.summary()
+        saved_count = self.save_otc_batch(result.to_records())
+        elapsed = time.time() - start_time
+        
+        print(f"Analyzed {result.columns.n_blocks} blocks, {summary['legs']} OTC legs in {elapsed:.2f}s")
+        print(f"Valid OTC trades: {summary['valid_trades']} "
+              f"(KTA volume: {summary['kta_volume']:,.2f}, MURF volume: {summary['murf_volume']:,.0f}, "
+              f"VWAP rate: {summary['vwap_rate']:,.0f})")
+        print(f"Saved {saved_count} OTC transactions to database")
+        return saved_count
+    
     def get_database_stats(self):
         """Get statistics from database"""
         conn = sqlite3.connect(self.db_path)
@@ -217,6 +266,13 @@ class OTCDataScraper:
 if __name__ == "__main__":
     scraper = OTCDataScraper()
     
+    # KEETA_REPLAY=1: vectorized backfill over the archived history instead of the API
+    archive = replay_archive()
+    if archive is not None and np is not None:
+        scraper.backfill_from_archive(archive)
+        scraper.get_database_stats()
+        raise SystemExit(0)
+    
     # Try different limits if API fails
     limits_to_try = [50, 100, 200]
     
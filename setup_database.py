@@ -5,59 +5,27 @@ Membuat database dan data sample untuk testing
 """
 
 import sqlite3
-import json
 from datetime import datetime, timedelta
 import random
 
+from keeta_monitor import KeetaMonitor, encode_payload
+
+# JSON mentah (raw_operation / related_operations) disimpan di trade_payloads, bukan di trades
+PAYLOAD_INSERT = 'INSERT INTO trade_payloads (trade_id, payload) VALUES (?, ?)'
+
 def setup_database():
     """Setup database dengan data sample"""
     print("🔧 Setting up MURF Token Database...")
     
+    # Schema + migrasi yang sama dengan KeetaMonitor (trade_payloads, op_index, trade_minutes)
+    KeetaMonitor("keeta_trades.db")
+    
     # Connect to database
     conn = sqlite3.connect("keeta_trades.db")
     cursor = conn.cursor()
     
-    # Create tables
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS trades (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            block_hash TEXT,
-            from_address TEXT,
-            to_address TEXT,
-            token_id TEXT,
-            amount_hex TEXT,
-            amount_decimal REAL,
-            price_usd REAL,
-            trade_type TEXT,
-            operation_type INTEGER,
-            is_otc BOOLEAN DEFAULT 0,
-            otc_from_address TEXT,
-            otc_exact BOOLEAN DEFAULT 0,
-            otc_type TEXT,
-            trade_pair TEXT,
-            settlement_time TEXT,
-            network TEXT,
-            signer TEXT,
-            exchange_ratio REAL,
-            counterpart_amount REAL,
-            counterpart_token TEXT,
-            related_operations TEXT,
-            raw_operation TEXT
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS price_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            token_id TEXT,
-            price REAL,
-            volume REAL
-        )
-    ''')
-    
     # Clear existing data
+    cursor.execute('DELETE FROM trade_payloads')
     cursor.execute('DELETE FROM trades')
     cursor.execute('DELETE FROM price_history')
     
@@ -78,9 +46,8 @@ def setup_database():
                 timestamp, block_hash, from_address, to_address, token_id,
                 amount_hex, amount_decimal, trade_type, operation_type, is_otc,
                 otc_from_address, otc_exact, otc_type, trade_pair, settlement_time,
-                network, signer, exchange_ratio, counterpart_amount, counterpart_token,
-                related_operations, raw_operation
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                network, signer, exchange_ratio, counterpart_amount, counterpart_token
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             trade_time.isoformat(),
             f"block_{i:06x}",
@@ -101,10 +68,9 @@ def setup_database():
             f"keeta_signer_{i:03d}",
             250000.0 if i % 3 == 0 else 0,
             murf_amount / 250000 if i % 3 == 0 else 0,
-            kta_token if i % 3 == 0 else "",
-            json.dumps([]),
-            json.dumps({})
+            kta_token if i % 3 == 0 else ""
         ))
+        cursor.execute(PAYLOAD_INSERT, (cursor.lastrowid, encode_payload({}, [])))
         
         # KTA trade (counterpart)
         if i % 3 == 0:  # OTC trades
@@ -114,9 +80,8 @@ def setup_database():
                     timestamp, block_hash, from_address, to_address, token_id,
                     amount_hex, amount_decimal, trade_type, operation_type, is_otc,
                     otc_from_address, otc_exact, otc_type, trade_pair, settlement_time,
-                    network, signer, exchange_ratio, counterpart_amount, counterpart_token,
-                    related_operations, raw_operation
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    network, signer, exchange_ratio, counterpart_amount, counterpart_token
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 trade_time.isoformat(),
                 f"block_{i:06x}",
@@ -137,10 +102,9 @@ def setup_database():
                 f"keeta_signer_{i:03d}",
                 0,
                 0,
-                "",
-                json.dumps([]),
-                json.dumps({})
+                ""
             ))
+            cursor.execute(PAYLOAD_INSERT, (cursor.lastrowid, encode_payload({}, [])))
     
     # Generate price history
     base_price = 0.00000263
@@ -12,8 +12,12 @@ import time
 import threading
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from murf_holders_db import MURFHoldersDB
+from murf_holders_db import MURFHoldersDB, UPSERT_HOLDER
 from otc_transactions_db import OTCTransactionsDB
+from amount_codec import decode_hex
+from balance_ledger import BalanceLedger
+from holder_reconciler import HolderReconciler
+from worker_runtime import WorkerRuntime
 
 class SmartHoldersManager:
     def __init__(self):
@@ -21,15 +25,15 @@ class SmartHoldersManager:
         self.api_base = "https://rep2.main.network.api.keeta.com/api/node/ledger/account"
         self.holders_db = MURFHoldersDB()
         self.otc_db = OTCTransactionsDB()
+        self.ledger = BalanceLedger()
+        self.reconciler = HolderReconciler(self.fetch_balances, ledger=self.ledger)
         self.last_refresh = None
         self.refresh_interval = 3600  # 1 hour in seconds
+        self.runtime = None
         
     def hex_to_decimal(self, hex_str):
         """Convert hex string to decimal"""
-        try:
-            return int(hex_str, 16)
-        except:
-            return 0
+        return decode_hex(hex_str)
     
     def get_current_balance(self, address):
         """Get current MURF balance for an address"""
@@ -54,15 +58,16 @@ class SmartHoldersManager:
         except Exception as e:
             return None
     
-    def get_balance_batch(self, addresses_batch):
+    def get_balance_batch(self, addresses_batch, keep_failures=False):
         """Get balances for a batch of addresses using threading"""
         results = []
+        failed_balance = None if keep_failures else 0
         
         def fetch_single_balance(address):
             balance = self.get_current_balance(address)
             return {
                 'address': address,
-                'current_balance': balance if balance is not None else 0
+                'current_balance': balance if balance is not None else failed_balance
             }
         
         # Use ThreadPoolExecutor for concurrent API calls
@@ -80,11 +85,19 @@ class SmartHoldersManager:
                     address = future_to_address[future]
                     results.append({
                         'address': address,
-                        'current_balance': 0
+                        'current_balance': failed_balance
                     })
         
         return results
     
+    def fetch_balances(self, addresses):
+        """Fetch balances in batches of 50 (None for failed lookups)"""
+        results = []
+        for i in range(0, len(addresses), 50):
+            results.extend(self.get_balance_batch(addresses[i:i + 50], keep_failures=True))
+            time.sleep(0.1)  # Small delay between batches to be nice to API
+        return results
+    
     def extract_otc_participants(self):
         """Extract all OTC participants (buyers/sellers) from recent transactions"""
         print("Extracting OTC participants...")
@@ -134,9 +147,16 @@ class SmartHoldersManager:
         
         print(f"Found {len(new_participants)} new OTC participants")
         
-        # Check balance for new participants
-        active_new_holders = []
+        # Balances of participants the ingester already saw come from the ledger
+        ledger_records = self.ledger.get_balances(new_participants)
+        active_new_holders = [record for record in ledger_records.values() if record['current_balance'] > 0]
+        for holder in active_new_holders:
+            print(f"New holder (ledger): {holder['address'][:50]}... - {holder['current_balance']:,} MURF")
+        
+        # Check balance for new participants unknown to the ledger
         for participant in new_participants:
+            if participant in ledger_records:
+                continue
             balance = self.get_current_balance(participant)
             if balance and balance > 0:
                 active_new_holders.append({
@@ -163,12 +183,9 @@ class SmartHoldersManager:
         conn = sqlite3.connect('murf_holders.db')
         cursor = conn.cursor()
         
+        # Upsert: an unchanged holder is not rewritten (keeps its updated_at)
         for holder in new_holders:
-            cursor.execute('''
-                INSERT OR REPLACE INTO murf_holders 
-                (address, total_received, total_sent, current_balance, tx_count, first_tx_date, last_tx_date, rank, is_airdrop_recipient)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            cursor.execute(UPSERT_HOLDER, (
                 holder['address'],
                 holder['total_received'],
                 holder['total_sent'],
@@ -182,62 +199,119 @@ class SmartHoldersManager:
         
         conn.commit()
         conn.close()
+        self.holders_db.leaderboard.update_many(new_holders)
         
         print(f"Added {len(new_holders)} new holders to database")
     
-    def refresh_holders_data(self):
-        """Full refresh of holders data (hourly) - OPTIMIZED with threading"""
-        print("Starting hourly holders refresh...")
-        
-        # Update from OTC participants first
-        new_holders = self.update_holders_from_otc()
-        
-        # Then do full scan of existing holders
-        print("Scanning existing holders for balance updates (OPTIMIZED)...")
-        
+    def sync_from_ledger(self):
+        """Fold balance ledger events added since the last sync into murf_holders
+
+        The ledger only covers the pages the ingester has walked, so its
+        totals are partial: each new operation event is applied as a delta,
+        and only when it is newer than the holder's last_tx_date (older
+        history backfilled by the ingester is already in scanned totals).
+        Reconciliation adjustments are not folded in (the reconciler writes
+        murf_holders itself). Holders whose balance drops to zero are removed.
+        """
         conn = sqlite3.connect('murf_holders.db')
         cursor = conn.cursor()
-        cursor.execute('SELECT address FROM murf_holders ORDER BY current_balance DESC')
-        addresses = [row[0] for row in cursor.fetchall()]
+        cursor.execute('SELECT last_event FROM ledger_sync WHERE id = 1')
+        row = cursor.fetchone()
+        events, last_event = self.ledger.get_events_after(row[0] if row else 0)
+        
+        changes = {}
+        for _, address, delta, date, moved in events:
+            changes.setdefault(address, []).append((delta, date, moved))
+        
+        existing = {}
+        addresses = list(changes)
+        for i in range(0, len(addresses), 500):
+            chunk = addresses[i:i + 500]
+            cursor.execute(f'''
+                SELECT address, total_received, total_sent, current_balance, tx_count, first_tx_date, last_tx_date
+                FROM murf_holders WHERE address IN ({",".join("?" * len(chunk))})
+            ''', chunk)
+            for holder in cursor.fetchall():
+                existing[holder[0]] = holder
+        
+        updated = []
+        removed = []
+        for address, address_events in changes.items():
+            holder = existing.get(address)
+            if holder:
+                received, sent, balance, count, first, last = (holder[1] or 0, holder[2] or 0, holder[3] or 0,
+                                                               holder[4] or 0, holder[5], holder[6])
+            else:
+                received, sent, balance, count, first, last = 0, 0, 0, 0, None, None
+            newest_known = last
+            applied = 0
+            for delta, date, moved in address_events:
+                if newest_known and date and date <= newest_known:
+                    continue            # already part of the scanned history
+                if moved:
+                    balance += delta    # else already in a balance verified by the reconciler
+                if delta >= 0:
+                    received += delta
+                else:
+                    sent -= delta
+                count += 1
+                applied += 1
+                if date:
+                    first = min(first or date, date)
+                    last = max(last or date, date)
+            if not applied:
+                continue
+            
+            record = {'address': address, 'total_received': received, 'total_sent': sent,
+                      'current_balance': balance, 'tx_count': count,
+                      'first_tx_date': first, 'last_tx_date': last}
+            if balance <= 0:
+                if holder:
+                    removed.append(address)
+            elif holder:
+                cursor.execute('''
+                    UPDATE murf_holders SET total_received = ?, total_sent = ?, current_balance = ?,
+                        tx_count = ?, first_tx_date = ?, last_tx_date = ?
+                    WHERE address = ?
+                ''', (received, sent, balance, count, first, last, address))
+                updated.append(record)
+            else:
+                cursor.execute(UPSERT_HOLDER, (address, received, sent, balance, count, first, last, 9999, False))
+                updated.append(record)
+        
+        cursor.executemany('DELETE FROM murf_holders WHERE address = ?', [(address,) for address in removed])
+        cursor.execute('''
+            INSERT INTO ledger_sync (id, last_event, synced_at) VALUES (1, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET last_event = excluded.last_event, synced_at = excluded.synced_at
+        ''', (last_event, datetime.now().isoformat()))
+        conn.commit()
         conn.close()
+        self.holders_db.leaderboard.update_many(
+            updated + [{'address': address, 'current_balance': 0} for address in removed])
         
-        print(f"Processing {len(addresses)} addresses with 10 concurrent threads...")
+        print(f"Synced {len(events)} ledger events: {len(updated)} holders updated, {len(removed)} removed")
+        return len(updated) + len(removed)
+    
+    def refresh_holders_data(self):
+        """Hourly holders refresh: ledger sync + sampled reconciliation"""
+        print("Starting hourly holders refresh...")
         
-        # Process in batches of 50 addresses
-        batch_size = 50
-        updated_holders = []
+        # Ledger balances are kept current by the ingester
+        self.sync_from_ledger()
         
-        for i in range(0, len(addresses), batch_size):
-            batch = addresses[i:i + batch_size]
-            batch_num = (i // batch_size) + 1
-            total_batches = (len(addresses) + batch_size - 1) // batch_size
-            
-            print(f"Processing batch {batch_num}/{total_batches} ({len(batch)} addresses)...")
-            
-            # Get balances for this batch using threading
-            batch_results = self.get_balance_batch(batch)
-            
-            for result in batch_results:
-                updated_holders.append(result)
-                
-                if result['current_balance'] > 0:
-                    print(f"  {result['address'][:50]}... - {result['current_balance']:,} MURF")
-                # Don't print for 0 balance to reduce spam
-            
-            # Small delay between batches to be nice to API
-            time.sleep(0.1)
+        # Update from OTC participants first
+        new_holders = self.update_holders_from_otc()
         
-        # Update database with new balances
-        print("Updating database with new balances...")
-        self.update_holders_balances(updated_holders)
+        # Verify recent/top/sampled balances against the API (not every holder)
+        run = self.reconciler.run()
         
         # Re-rank holders
         print("Re-ranking holders...")
         self.rerank_holders()
         
         self.last_refresh = datetime.now()
-        active_count = len([h for h in updated_holders if h['current_balance'] > 0])
-        print(f"Holders refresh completed at {self.last_refresh}")
+        active_count = self.holders_db.get_holder_statistics()['total_holders']
+        print(f"Holders refresh completed at {self.last_refresh} ({run['drifted']} balances drifted)")
         print(f"Active holders: {active_count}")
         
         return active_count
@@ -259,6 +333,7 @@ class SmartHoldersManager:
         
         conn.commit()
         conn.close()
+        self.holders_db.leaderboard.update_many(updated_holders)
     
     def rerank_holders(self):
         """Re-rank holders by current balance"""
@@ -285,6 +360,8 @@ class SmartHoldersManager:
         
         conn.commit()
         conn.close()
+        # Ranks are derived from leaderboard order; only the file time needs syncing
+        self.holders_db.leaderboard.update_many([])
         
         print(f"Re-ranked {len(holders)} active holders")
     
@@ -300,25 +377,28 @@ class SmartHoldersManager:
         """Get current holders data (with auto-refresh if needed)"""
         if self.should_refresh():
             print("Holders data needs refresh...")
-            # Run refresh in background thread
-            refresh_thread = threading.Thread(target=self.refresh_holders_data)
-            refresh_thread.daemon = True
-            refresh_thread.start()
+            if self.runtime is not None:
+                # Scheduled job runs now (skipped if a refresh is already running)
+                self.runtime.trigger("holders-refresh")
+            else:
+                # Run refresh in background thread
+                refresh_thread = threading.Thread(target=self.refresh_holders_data)
+                refresh_thread.daemon = True
+                refresh_thread.start()
         
         # Return current data from database
         return self.holders_db.get_top_holders(20), self.holders_db.get_holder_statistics()
     
-    def start_background_refresh(self):
-        """Start background refresh thread"""
-        def background_refresh():
-            while True:
-                time.sleep(self.refresh_interval)
-                self.refresh_holders_data()
-        
-        refresh_thread = threading.Thread(target=background_refresh)
-        refresh_thread.daemon = True
-        refresh_thread.start()
+    def start_background_refresh(self, runtime=None):
+        """Register the hourly refresh job (on a new runtime if none is given)"""
+        if runtime is None:
+            runtime = WorkerRuntime("holders-refresh")
+        self.runtime = runtime
+        runtime.register("holders-refresh", self.refresh_holders_data, interval=self.refresh_interval,
+                         timeout=self.refresh_interval, initial_delay=self.refresh_interval)
+        runtime.start()
         print("Background holders refresh started (hourly)")
+        return runtime
 
 def main():
     """Test the smart holders manager"""
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Test Alert Rules - rule compilation and incremental evaluation (offline, no API calls)
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from alert_engine import AlertEngine
+from alert_rules import compile_rule
+from operation_records import MURF_TOKEN, KTA_TOKEN
+
+NEW_ADDRESS = "keeta_aab4anyllhowvsnjhpbynd6fvrdm4rby3xs4aoq5m4ttlhjhnrabtyxiqnmx25y"
+KNOWN_ADDRESS = "keeta_aab7l3uugqfwl53mwluh56n5o7zmn5v2ni7wdmlp6a4wd4aykllq6rhjjjxs6mq"
+
+
+def make_trade(minute, token, amount, from_address=KNOWN_ADDRESS, is_otc=False):
+    return {
+        "timestamp": f"2025-09-29T{minute // 60:02d}:{minute % 60:02d}:00Z",
+        "block_hash": f"B{minute}",
+        "from_address": from_address,
+        "token_id": token,
+        "amount_decimal": amount,
+        "is_otc": is_otc
+    }
+
+
+def rule_alerts(alerts):
+    return [alert['data']['rule'] for alert in alerts if alert['type'] == 'rule']
+
+
+def quiet_engine():
+    engine = AlertEngine()
+    engine.notifier.large_trade_threshold = float('inf')
+    engine.notifier.volume_threshold = float('inf')
+    engine.notifier.price_change_threshold = float('inf')
+    return engine
+
+
+def test_compile_rules():
+    print("Testing rule compilation...")
+    rule = compile_rule("MURF volume 1h > 3x prev 1h")
+    assert rule.kind == 'window'
+    assert rule.metric == ('volume', MURF_TOKEN, 3600)
+    assert rule.reference == ('prev_volume', MURF_TOKEN, 3600, 3600)
+    assert rule.factor == 3.0
+
+    rule = compile_rule("single trade > 5k KTA from new address")
+    assert rule.kind == 'trade' and rule.token == KTA_TOKEN
+    assert rule.value == 5000 and rule.new_address
+
+    assert compile_rule("price change 30m >= 2.5%").metric == ('price_change', 1800)
+    assert compile_rule("trades 10m >= 50").metric == ('trades', None, 600)
+
+    for bad in ("volume > 5", "doge volume 1h > 5", "single trade"):
+        try:
+            compile_rule(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"rule should not compile: {bad}")
+    print("[OK] Rules compiled")
+
+
+def test_volume_vs_previous_window():
+    print("Testing 'murf volume 1h > 3x prev 1h'...")
+    engine = quiet_engine()
+    engine.add_rule("murf volume 1h > 3x prev 1h", name="murf_spike")
+
+    fired = rule_alerts(engine.observe(make_trade(0, MURF_TOKEN, 600)))  # previous hour
+    fired += rule_alerts(engine.observe(make_trade(61, MURF_TOKEN, 1000)))
+    assert fired == []
+    fired += rule_alerts(engine.observe(make_trade(62, MURF_TOKEN, 900)))  # 1900 > 3 x 600
+    assert fired == ["murf_spike"]
+    fired += rule_alerts(engine.observe(make_trade(63, MURF_TOKEN, 50)))
+    assert fired == ["murf_spike"], "window rule fires once while the condition holds"
+    fired += rule_alerts(engine.observe(make_trade(64, KTA_TOKEN, 10 ** 6)))
+    assert fired == ["murf_spike"], "KTA trades do not count towards a MURF rule"
+    print("[OK] Fired once when volume passed 3x the previous hour")
+
+
+def test_single_trade_from_new_address():
+    print("Testing 'single trade > 5000 kta from new address'...")
+    engine = quiet_engine()
+    engine.add_rule("single trade > 5000 kta from new address", name="new_whale")
+
+    assert rule_alerts(engine.observe(make_trade(1, KTA_TOKEN, 9000))) == ["new_whale"]
+    assert rule_alerts(engine.observe(make_trade(2, KTA_TOKEN, 9000))) == [], "address is no longer new"
+    assert rule_alerts(engine.observe(make_trade(3, KTA_TOKEN, 100, NEW_ADDRESS))) == [], "below threshold"
+    assert rule_alerts(engine.observe(make_trade(4, MURF_TOKEN, 9000, "keeta_other"))) == [], "wrong token"
+    print("[OK] Only large KTA trades from first-seen addresses fire")
+
+
+def test_rules_share_state():
+    print("Testing 100 rules share incremental state...")
+    engine = quiet_engine()
+    windows_before = len(engine.windows)
+    for threshold in range(100):
+        engine.add_rule(f"volume 1h > {threshold * 10}")
+    assert len(engine.windows) == windows_before, "all 'volume 1h' rules reuse the built-in window"
+
+    alerts = engine.observe(make_trade(1, MURF_TOKEN, 505))
+    assert len(rule_alerts(alerts)) == 51
+    print(f"[OK] {len(engine.rules)} rules over {len(engine.windows)} windows")
+
+
+def test_warm_start_uses_utc():
+    print("Testing warm start selects trades by UTC block date...")
+    handle, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE trades (timestamp TEXT, from_address TEXT, token_id TEXT, "
+                 "amount_decimal REAL, is_otc INTEGER)")
+    now = datetime.now(timezone.utc)
+    for minutes in (30, 90, 180):
+        timestamp = (now - timedelta(minutes=minutes)).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        conn.execute("INSERT INTO trades VALUES (?, ?, ?, 10, 0)", (timestamp, KNOWN_ADDRESS, MURF_TOKEN))
+    conn.commit()
+    conn.close()
+
+    # The monitor runs in WIB (UTC+7): a local-time cutoff would skip every trade
+    previous_tz = os.environ.get('TZ')
+    os.environ['TZ'] = 'Asia/Jakarta'
+    time.tzset()
+    try:
+        assert quiet_engine().warm_start(db_path, hours=1) == 1
+        assert quiet_engine().warm_start(db_path, hours=2) == 2
+    finally:
+        if previous_tz is None:
+            del os.environ['TZ']
+        else:
+            os.environ['TZ'] = previous_tz
+        time.tzset()
+    print("[OK] Warm start window matches UTC trade timestamps")
+
+
+def test_rules_added_after_warm_start():
+    print("Testing rules added after warm start see known senders and warmed windows...")
+    handle, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE trades (timestamp TEXT, from_address TEXT, token_id TEXT, "
+                 "amount_decimal REAL, is_otc INTEGER)")
+    now = datetime.now(timezone.utc)
+    for hours, amount in ((30, 10), (2.5, 400)):  # both before the default 2h warm-start window
+        timestamp = (now - timedelta(hours=hours)).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        conn.execute("INSERT INTO trades VALUES (?, ?, ?, ?, 0)", (timestamp, KNOWN_ADDRESS, MURF_TOKEN, amount))
+    conn.commit()
+    conn.close()
+
+    engine = quiet_engine()
+    engine.warm_start(db_path)
+    engine.add_rule("single trade > 5000 kta from new address", name="new_whale")
+    engine.add_rule("murf volume 3h > 1000", name="murf_3h")
+
+    def trade(address, token, amount):
+        stamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        return {"timestamp": stamp, "block_hash": "W", "from_address": address,
+                "token_id": token, "amount_decimal": amount, "is_otc": False}
+
+    assert rule_alerts(engine.observe(trade(KNOWN_ADDRESS, KTA_TOKEN, 9000))) == [], "sender seen 30h ago"
+    assert rule_alerts(engine.observe(trade(NEW_ADDRESS, KTA_TOKEN, 9000))) == ["new_whale"]
+    assert rule_alerts(engine.observe(trade(KNOWN_ADDRESS, MURF_TOKEN, 700))) == ["murf_3h"], \
+        "3h window includes the trade from 2.5h ago"
+    print("[OK] Known senders loaded, late window warmed from the database")
+
+
+if __name__ == "__main__":
+    test_compile_rules()
+    test_volume_vs_previous_window()
+    test_single_trade_from_new_address()
+    test_rules_share_state()
+    test_warm_start_uses_utc()
+    test_rules_added_after_warm_start()
+    print("\nAll alert rule tests passed!")
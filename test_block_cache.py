@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Test Block Cache - seen-block LRU and high-water mark (offline)
+"""
+
+import os
+import tempfile
+from datetime import timedelta
+
+from block_cache import SeenBlockCache
+
+
+def temp_db():
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    return path
+
+
+def test_late_block_is_new():
+    print("Testing a late block with an older date is still processed...")
+    db_path = temp_db()
+    cache = SeenBlockCache("test", db_path=db_path, safety_margin=timedelta(hours=1))
+    cache.mark_blocks([{"$hash": "NEW", "date": "2025-09-29T12:00:00.000Z"}])
+
+    assert not cache.is_new("NEW", "2025-09-29T12:00:00.000Z")
+    assert cache.is_new("LATE", "2025-09-29T11:30:00.000Z"), "unseen hash inside the margin"
+    assert not cache.is_new("OLD", "2025-09-29T10:00:00.000Z"), "far behind the high-water mark"
+
+    # After a restart only the high-water mark (and its block) is known
+    restarted = SeenBlockCache("test", db_path=db_path, safety_margin=timedelta(hours=1))
+    assert not restarted.is_new("NEW", "2025-09-29T12:00:00.000Z")
+    assert restarted.is_new("LATE", "2025-09-29T11:30:00.000Z")
+    print("[OK] Late block kept, old blocks skipped")
+
+
+if __name__ == "__main__":
+    test_late_block_is_new()
+    print("\nAll block cache tests passed!")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test Holder Reconciler - reconcile + ledger sync keep holder history (offline, fake API)
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from holder_reconciler import HolderReconciler
+from smart_holders_manager import SmartHoldersManager
+from operation_records import MURF_TOKEN
+
+SCANNED = "keeta_aab4anyllhowvsnjhpbynd6fvrdm4rby3xs4aoq5m4ttlhjhnrabtyxiqnmx25y"
+ACTIVE = "keeta_aab7l3uugqfwl53mwluh56n5o7zmn5v2ni7wdmlp6a4wd4aykllq6rhjjjxs6mq"
+
+
+def holder_row(address):
+    conn = sqlite3.connect("murf_holders.db")
+    row = conn.execute('''
+        SELECT total_received, total_sent, current_balance, tx_count, first_tx_date, last_tx_date
+        FROM murf_holders WHERE address = ?
+    ''', (address,)).fetchone()
+    conn.close()
+    return row
+
+
+def in_temp_dir(check):
+    # The manager and reconciler keep their databases in the working directory
+    previous_cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())
+    try:
+        check()
+    finally:
+        os.chdir(previous_cwd)
+
+
+def add_scanned_holder(address):
+    conn = sqlite3.connect("murf_holders.db")
+    conn.execute('''
+        INSERT INTO murf_holders
+        (address, total_received, total_sent, current_balance, tx_count, first_tx_date, last_tx_date, rank, is_airdrop_recipient)
+        VALUES (?, 5000, 1000, 4000, 7, '2025-09-01T00:00:00', '2025-09-20T00:00:00', 1, 1)
+    ''', (address,))
+    conn.commit()
+    conn.close()
+
+
+def transfer(block_hash, date, to_address, amount):
+    return {"$hash": block_hash, "date": date,
+            "operations": [{"type": 0, "token": MURF_TOKEN, "amount": hex(amount), "to": to_address}]}
+
+
+def test_reconcile_then_sync_keeps_history():
+    in_temp_dir(check_reconcile_then_sync)
+
+
+def test_sync_applies_only_new_events():
+    in_temp_dir(check_sync_applies_only_new_events)
+
+
+def check_reconcile_then_sync():
+    print("Testing reconcile + ledger sync keeps scanned holder history...")
+    manager = SmartHoldersManager()
+    add_scanned_holder(SCANNED)
+
+    # ACTIVE has ledger events; SCANNED is only known from the holder scan
+    manager.ledger.apply_blocks([{
+        "$hash": "BLOCK1", "date": "2025-09-29T23:34:50.504Z",
+        "operations": [{"type": 0, "token": MURF_TOKEN, "amount": "0x64", "to": ACTIVE}]
+    }])
+
+    api = {SCANNED: 4500, ACTIVE: 100}
+    manager.reconciler = HolderReconciler(
+        lambda addresses: [{'address': a, 'current_balance': api[a]} for a in addresses],
+        ledger=manager.ledger)
+    manager.reconciler.run()
+    manager.sync_from_ledger()
+
+    assert holder_row(SCANNED) == (5000, 1000, 4500, 7, '2025-09-01T00:00:00', '2025-09-20T00:00:00'), \
+        holder_row(SCANNED)
+    assert holder_row(ACTIVE) == (100, 0, 100, 1, '2025-09-29T23:34:50.504Z', '2025-09-29T23:34:50.504Z'), \
+        holder_row(ACTIVE)
+
+    # The next hourly sync is a no-op for the history columns as well
+    manager.sync_from_ledger()
+    assert holder_row(SCANNED)[3] == 7
+
+    # The ingester backfills an older op: the verified balance already contains it
+    manager.ledger.apply_blocks([transfer("OLD1", "2025-09-25T00:00:00.000Z", SCANNED, 300)])
+    manager.sync_from_ledger()
+    assert manager.ledger.get_balance(SCANNED)['current_balance'] == 4500
+    assert holder_row(SCANNED)[:4] == (5300, 1000, 4500, 8), holder_row(SCANNED)
+    print(f"[OK] {SCANNED[:20]}... kept received/sent/count/dates, balance now {holder_row(SCANNED)[2]}")
+
+
+def check_sync_applies_only_new_events():
+    print("Testing ledger sync folds in new events as deltas only...")
+    manager = SmartHoldersManager()
+    add_scanned_holder(SCANNED)
+
+    # One recent op for a scanned holder, plus an address that received and sent everything
+    manager.ledger.apply_blocks([
+        transfer("NEW1", "2025-09-29T10:00:00.000Z", SCANNED, 250),
+        transfer("ZERO1", "2025-09-29T11:00:00.000Z", ACTIVE, 40),
+        {"$hash": "ZERO2", "date": "2025-09-29T12:00:00.000Z",
+         "operations": [{"type": 7, "token": MURF_TOKEN, "amount": hex(40), "from": ACTIVE}]}
+    ])
+    manager.sync_from_ledger()
+    assert holder_row(SCANNED) == (5250, 1000, 4250, 8, '2025-09-01T00:00:00', '2025-09-29T10:00:00.000Z'), \
+        holder_row(SCANNED)
+    assert holder_row(ACTIVE) is None, "zero balances stay out of murf_holders"
+
+    # Older history backfilled by the ingester is already in the scanned totals
+    manager.ledger.apply_blocks([transfer("OLD1", "2025-09-10T00:00:00.000Z", SCANNED, 999)])
+    manager.sync_from_ledger()
+    manager.sync_from_ledger()
+    assert holder_row(SCANNED)[2:4] == (4250, 8), holder_row(SCANNED)
+    print("[OK] Scanned history kept, new op applied once, backfill and zero balances skipped")
+
+
+if __name__ == "__main__":
+    test_reconcile_then_sync_keeps_history()
+    test_sync_applies_only_new_events()
+    print("\nAll holder reconciler tests passed!")
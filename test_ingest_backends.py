@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Test Ingest Backends - polling, streaming and long-poll ingestion against a
+local stand-in node that replays pages recorded in a LedgerArchive (offline)
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from adaptive_poller import AdaptivePoller
+from block_cache import SeenBlockCache
+from history_stream import MONITOR_BLOCK_FIELDS
+from ingest_backends import PollingBackend, StreamSubscriber
+from keeta_monitor import KeetaMonitor
+from ledger_archive import LedgerArchive, NETWORK_SCOPE, fetch_history_page
+from operation_records import normalize_blocks, MURF_TOKEN, KTA_TOKEN
+
+SELLER = "keeta_aab4anyllhowvsnjhpbynd6fvrdm4rby3xs4aoq5m4ttlhjhnrabtyxiqnmx25y"
+BUYER = "keeta_aab7l3uugqfwl53mwluh56n5o7zmn5v2ni7wdmlp6a4wd4aykllq6rhjjjxs6mq"
+PAGES = 6
+BLOCKS_PER_PAGE = 2
+
+
+def temp_db():
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    return path
+
+
+def make_block(page, index):
+    return {
+        "$hash": f"P{page:02d}B{index:02d}",
+        "date": f"2025-09-29T23:{page:02d}:{index:02d}.000Z",
+        "account": BUYER,
+        "operations": [
+            {"type": 7, "amount": "0x649D2C967D9500000", "token": KTA_TOKEN, "from": SELLER, "exact": True},
+            {"type": 0, "amount": "0x1C9C380", "token": MURF_TOKEN, "to": SELLER}
+        ]
+    }
+
+
+def record_pages():
+    """Archive PAGES pages the way LedgerIngester stores them (head first, nextKey chain)"""
+    archive = LedgerArchive(temp_db())
+    cursor = None
+    for page in reversed(range(PAGES)):
+        next_key = f"K{page - 1}" if page else None
+        blocks = [make_block(page, index) for index in reversed(range(BLOCKS_PER_PAGE))]
+        archive.store_page(NETWORK_SCOPE, cursor, json.dumps({"blocks": blocks, "nextKey": next_key}))
+        cursor = next_key
+    return archive
+
+
+class ReplayNode:
+    """Stand-in node: publishes archived pages oldest first, serves them as history, stream and long-poll"""
+
+    def __init__(self, archive):
+        self.pages = list(reversed(list(archive.iter_pages())))
+        self.published = []
+        self.published_at = {}
+        self.changed = threading.Condition()
+        self.closing = False
+        self.drop_streams = False
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == "/ledger/history":
+                    self.send_page(node.head())
+                elif url.path == "/ledger/stream":
+                    self.stream()
+                elif url.path == "/ledger/longpoll":
+                    page = node.wait_newer(query.get("after", [None])[0], timeout=2)
+                    if page is None:
+                        self.send_response(204)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                    else:
+                        self.send_page(page)
+                else:
+                    self.send_error(404)
+
+            def send_page(self, page):
+                body = json.dumps(page).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                sent = len(node.published)
+                while not node.closing:
+                    with node.changed:
+                        node.changed.wait_for(lambda: len(node.published) > sent or node.closing, timeout=0.5)
+                        pages = node.published[sent:]
+                    sent += len(pages)
+                    lines = b"".join(json.dumps(page).encode() + b"\n" for page in pages) or b":\n"
+                    self.wfile.write(lines)
+                    self.wfile.flush()
+                    if pages and node.drop_streams:
+                        break
+                self.close_connection = True
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def publish(self):
+        """Make the next recorded page live"""
+        with self.changed:
+            page = self.pages[len(self.published)]
+            self.published.append(page)
+            self.published_at[page["blocks"][0]["$hash"]] = time.time()
+            self.changed.notify_all()
+
+    def head(self):
+        with self.changed:
+            return self.published[-1] if self.published else {"blocks": [], "nextKey": None}
+
+    def wait_newer(self, after, timeout):
+        with self.changed:
+            def newer():
+                return self.published and self.published[-1]["blocks"][0]["$hash"] != after
+            if not self.changed.wait_for(newer, timeout=timeout):
+                return None
+            return self.published[-1]
+
+    def close(self):
+        with self.changed:
+            self.closing = True
+            self.changed.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_monitor():
+    return KeetaMonitor(db_path=temp_db(), block_cache=SeenBlockCache("test", db_path=temp_db()))
+
+
+def stored_trades(monitor):
+    conn = sqlite3.connect(monitor.db_path)
+    count = conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+    conn.close()
+    return count
+
+
+def expected_trades(monitor, node):
+    return sum(len(monitor.parse_block(block)) for page in node.pages
+               for block in normalize_blocks(page["blocks"]))
+
+
+def run_subscriber(path, drop_streams=False):
+    node = ReplayNode(record_pages())
+    node.drop_streams = drop_streams
+    monitor = make_monitor()
+    latencies = []
+
+    def handler(page):
+        monitor.ingest_history(page)
+        published = node.published_at.get(page["blocks"][0]["$hash"]) if page["blocks"] else None
+        if published is not None:
+            latencies.append(time.time() - published)
+
+    def catch_up():
+        return fetch_history_page(f"{node.url}/ledger/history", {"limit": 50}, MONITOR_BLOCK_FIELDS)
+
+    subscriber = StreamSubscriber(f"{node.url}{path}", MONITOR_BLOCK_FIELDS, catch_up=catch_up, idle_timeout=5)
+    subscriber.start(handler)
+    try:
+        time.sleep(0.3)
+        for _ in range(PAGES):
+            node.publish()
+            time.sleep(0.3)
+        deadline = time.time() + 5
+        while stored_trades(monitor) < expected_trades(monitor, node) and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        subscriber.stop()
+        node.close()
+    return monitor, node, subscriber, latencies
+
+
+def test_stream_subscriber():
+    print("Testing streaming subscription (NDJSON) against the replay node...")
+    monitor, node, subscriber, latencies = run_subscriber("/ledger/stream")
+    assert stored_trades(monitor) == expected_trades(monitor, node) == PAGES * BLOCKS_PER_PAGE * 2
+    assert max(latencies) < 1.0, f"page reached the database after {max(latencies):.2f}s"
+    assert subscriber.connects == 1 and subscriber.errors == 0
+    print(f"[OK] {stored_trades(monitor)} trades, worst publish-to-database latency {max(latencies) * 1000:.0f} ms")
+
+
+def test_stream_reconnect_catches_up():
+    print("Testing reconnect after the node drops the stream...")
+    monitor, node, subscriber, latencies = run_subscriber("/ledger/stream", drop_streams=True)
+    assert stored_trades(monitor) == PAGES * BLOCKS_PER_PAGE * 2, "no pages lost across reconnects"
+    assert subscriber.connects > 1
+    print(f"[OK] {subscriber.connects} connections, {stored_trades(monitor)} trades, no duplicates")
+
+
+def test_long_poll_subscriber():
+    print("Testing long-poll subscription against the replay node...")
+    monitor, node, subscriber, latencies = run_subscriber("/ledger/longpoll")
+    assert stored_trades(monitor) == PAGES * BLOCKS_PER_PAGE * 2
+    assert max(latencies) < 1.0, f"page reached the database after {max(latencies):.2f}s"
+    print(f"[OK] {subscriber.connects} requests, worst latency {max(latencies) * 1000:.0f} ms")
+
+
+def test_polling_backend():
+    print("Testing the polling backend feeds the same handler...")
+    node = ReplayNode(record_pages())
+    monitor = make_monitor()
+    poller = AdaptivePoller(10, min_interval=2, max_interval=60)
+    backend = PollingBackend(lambda: fetch_history_page(f"{node.url}/ledger/history", {"limit": 50},
+                                                        MONITOR_BLOCK_FIELDS), poller)
+    backend.handler = lambda page: monitor.ingest_history(page)["inserted"]
+    try:
+        node.publish()
+        assert backend.poll() == 5, "new trades shorten the interval"
+        assert backend.poll() == 10, "an idle poll backs off"
+        node.publish()
+        backend.poll()
+    finally:
+        node.close()
+    assert stored_trades(monitor) == 2 * BLOCKS_PER_PAGE * 2
+    print(f"[OK] {backend.pages} polls, {stored_trades(monitor)} trades")
+
+
+if __name__ == "__main__":
+    # KeetaMonitor keeps its block cache in the working directory
+    os.chdir(tempfile.mkdtemp())
+    test_stream_subscriber()
+    test_stream_reconnect_catches_up()
+    test_long_poll_subscriber()
+    test_polling_backend()
+    print("\nAll ingest backend tests passed!")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test Ledger Ingester - repeated runs against a growing chain keep one archive
+row per page and a replayable chain without duplicates (offline, fake API)
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+
+from account_index import AccountIndex
+from balance_ledger import BalanceLedger
+from ledger_archive import LedgerArchive
+from ledger_ingester import LedgerIngester
+
+
+class FakeIngester(LedgerIngester):
+    """Serves a chain newest first; nextKey is the hash of the first block of the next page"""
+
+    def __init__(self, chain):
+        tmp = tempfile.mkdtemp()
+        super().__init__(LedgerArchive(os.path.join(tmp, "archive.db")),
+                         AccountIndex(os.path.join(tmp, "index.db")),
+                         BalanceLedger(os.path.join(tmp, "ledger.db")))
+        self.chain = chain
+        self.calls = 0
+
+    def fetch_raw_page(self, scope, cursor, limit):
+        self.calls += 1
+        newest = list(reversed(self.chain))
+        start = newest.index(cursor) if cursor else 0
+        blocks = [{"$hash": block_hash, "date": "2025-09-29T23:34:50.504Z", "operations": []}
+                  for block_hash in newest[start:start + limit]]
+        next_key = newest[start + limit] if start + limit < len(newest) else None
+        history = [{"voteStaple": {"blocks": [block]}} for block in blocks]
+        return json.dumps({"history": history, "nextKey": next_key}).encode()
+
+
+def replayed(ingester):
+    return [block['$hash'] for page in ingester.archive.iter_pages() for block in page['blocks']]
+
+
+def archive_rows(ingester):
+    conn = sqlite3.connect(ingester.archive.db_path)
+    count = conn.execute("SELECT COUNT(*) FROM history_pages").fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_growing_chain():
+    print("Testing repeated ingests while new blocks shift the head...")
+    chain = [f"B{i:04d}" for i in range(100)]
+    ingester = FakeIngester(chain)
+
+    ingester.ingest(limit=10, max_pages=3)
+    assert ingester.archive.get_frontier("") == ["B0069"]
+
+    chain.extend(f"N{i}" for i in range(5))
+    for _ in range(4):
+        ingester.ingest(limit=10, max_pages=3)
+    assert ingester.archive.get_frontier("") == []
+
+    blocks = replayed(ingester)
+    assert blocks == list(reversed(chain)), "replay is the whole chain, newest first, once"
+    rows = archive_rows(ingester)
+
+    # Nothing new: one request for the head page, no archive growth
+    ingester.calls = 0
+    for _ in range(3):
+        ingester.ingest(limit=10, max_pages=3)
+    assert ingester.calls == 3
+    assert archive_rows(ingester) <= rows + 1
+
+    chain.extend(f"M{i}" for i in range(25))
+    ingester.ingest(limit=10, max_pages=10)
+    assert replayed(ingester) == list(reversed(chain))
+    print(f"[OK] {len(chain)} blocks replayed in order from {archive_rows(ingester)} archived pages")
+
+
+if __name__ == "__main__":
+    test_growing_chain()
+    print("\nAll ledger ingester tests passed!")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test Notification Dispatcher - outbox, digests, dedup and retry (offline, mock channels)
+"""
+
+import os
+import tempfile
+import time
+
+from notification_dispatcher import NotificationDispatcher, MockChannel, SENT, FAILED, PENDING
+
+
+def make_alert(index, alert_type="otc_trade"):
+    trade = {
+        "block_hash": f"BLOCK{index:04d}",
+        "token_id": "keeta_ao7nitutebhm2pkrfbtniepivaw324hecyb43wsxts5rrhi2p5ckgof37racm",
+        "amount_hex": f"0x{index + 1:X}",
+        "amount_decimal": float(index + 1)
+    }
+    return {"type": alert_type, "data": [trade], "message": f"OTC swap #{index}",
+            "block_hash": trade["block_hash"], "fired_at": "2025-09-29T23:34:50"}
+
+
+def temp_db():
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    return path
+
+
+def test_burst_produces_one_digest():
+    print("Testing a burst of 200 trades produces one digest...")
+    channel = MockChannel()
+    dispatcher = NotificationDispatcher([channel], db_path=temp_db(), digest_window=30)
+
+    new_rows = sum(dispatcher.enqueue(make_alert(i)) for i in range(200))
+    duplicates = sum(dispatcher.enqueue(make_alert(i)) for i in range(0, 200, 10))
+    assert new_rows == 200 and duplicates == 0
+
+    now = time.time()
+    assert dispatcher.deliver_due("mock", now=now) == 0, "digest window still open"
+    assert dispatcher.deliver_due("mock", now=now + 31) == 200
+    assert dispatcher.deliver_due("mock", now=now + 62) == 0
+    assert len(channel.deliveries) == 1
+    subject, body = channel.deliveries[0]
+    assert "200 alerts" in subject and "200 otc trade" in body
+
+    assert dispatcher.enqueue(make_alert(5)) == 0, "already delivered alerts are not queued again"
+    assert dispatcher.get_stats() == {"mock": {SENT: 200}}
+    print(f"[OK] 1 digest, 0 duplicates ({subject})")
+
+
+def test_retry_with_backoff():
+    print("Testing retry with exponential backoff...")
+    channel = MockChannel(fail_times=2)
+    dispatcher = NotificationDispatcher([channel], db_path=temp_db(), digest_window=0,
+                                        base_backoff=10, max_attempts=3)
+    dispatcher.enqueue(make_alert(1))
+
+    now = time.time()
+    assert dispatcher.deliver_due("mock", now=now) == 0          # attempt 1 fails, retry in 10s
+    assert dispatcher.deliver_due("mock", now=now + 5) == 0      # not due yet
+    assert channel.attempts == 1
+    assert dispatcher.deliver_due("mock", now=now + 10) == 0     # attempt 2 fails, retry in 20s
+    assert dispatcher.deliver_due("mock", now=now + 25) == 0
+    assert dispatcher.deliver_due("mock", now=now + 30) == 1     # attempt 3 succeeds
+    assert channel.attempts == 3 and len(channel.deliveries) == 1
+
+    failing = MockChannel(name="broken", fail_times=99)
+    dispatcher = NotificationDispatcher([failing], db_path=temp_db(), digest_window=0,
+                                        base_backoff=1, max_attempts=2)
+    dispatcher.enqueue(make_alert(2))
+    now = time.time()
+    dispatcher.deliver_due("broken", now=now)
+    dispatcher.deliver_due("broken", now=now + 1)
+    assert dispatcher.get_stats() == {"broken": {FAILED: 1}}
+
+    # A digest mixing a retried row and a fresh row: each keeps its own attempt count
+    dispatcher = NotificationDispatcher([failing], db_path=temp_db(), digest_window=0,
+                                        base_backoff=1, max_attempts=3)
+    dispatcher.enqueue(make_alert(3))
+    now = time.time()
+    dispatcher.deliver_due("broken", now=now)
+    dispatcher.deliver_due("broken", now=now + 1)
+    dispatcher.enqueue(make_alert(4))
+    dispatcher.deliver_due("broken", now=now + 3)
+    assert dispatcher.get_stats() == {"broken": {FAILED: 1, PENDING: 1}}, dispatcher.get_stats()
+    print("[OK] Delivered on the third attempt; gave up after max attempts")
+
+
+def test_slow_channel_does_not_block_enqueue():
+    print("Testing a slow channel does not stall ingestion...")
+    slow = MockChannel(name="slow", delay=1.0)
+    fast = MockChannel(name="fast")
+    dispatcher = NotificationDispatcher([slow, fast], db_path=temp_db(), digest_window=0, poll_interval=0.05)
+    dispatcher.start()
+    try:
+        dispatcher.enqueue(make_alert(1))
+        time.sleep(0.3)  # slow worker is now inside send()
+
+        start = time.perf_counter()
+        for i in range(2, 52):
+            dispatcher.enqueue(make_alert(i))
+        elapsed = time.perf_counter() - start
+        assert elapsed < 0.9, f"enqueue blocked for {elapsed:.2f}s"
+
+        time.sleep(0.3)
+        assert dispatcher.get_stats()["fast"] == {SENT: 51}, "fast channel keeps delivering"
+    finally:
+        dispatcher.stop()
+    print(f"[OK] 50 alerts enqueued in {elapsed * 1000:.1f} ms while the slow channel was sending")
+
+
+if __name__ == "__main__":
+    test_burst_produces_one_digest()
+    test_retry_with_backoff()
+    test_slow_channel_does_not_block_enqueue()
+    print("\nAll notification dispatcher tests passed!")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test OTC Engine - leg matching per block (offline, no API calls)
+"""
+
+from operation_records import normalize_block, normalize_blocks, MURF_TOKEN, KTA_TOKEN, MURF_ID, KTA_ID
+from otc_engine import OTCEngine
+
+SELLER = "keeta_aab4anyllhowvsnjhpbynd6fvrdm4rby3xs4aoq5m4ttlhjhnrabtyxiqnmx25y"
+BUYER = "keeta_aab7l3uugqfwl53mwluh56n5o7zmn5v2ni7wdmlp6a4wd4aykllq6rhjjjxs6mq"
+OTHER_TOKEN = "keeta_aabxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx"
+
+
+def make_block(block_hash, operations):
+    return {
+        "$hash": block_hash,
+        "date": "2025-09-29T23:34:50.504Z",
+        "account": BUYER,
+        "operations": operations
+    }
+
+
+def test_kta_to_murf_same_block():
+    print("Testing Type 7 KTA + Type 0 MURF in the same block...")
+    block = normalize_block(make_block("A1", [
+        {"type": 7, "amount": "0x649D2C967D9500000", "token": KTA_TOKEN, "from": SELLER, "exact": True},
+        {"type": 0, "amount": "0x1C9C380", "token": MURF_TOKEN, "to": SELLER}
+    ]))
+
+    matches = OTCEngine().match_block(block)
+    assert len(matches) == 1
+    match = matches[0]
+    assert match.is_kta_seller
+    assert match.counterpart is not None and not match.from_previous
+    assert match.kta_amount == 0x649D2C967D9500000
+    assert match.murf_amount == 30000000
+    print(f"[OK] {match.kta_decimal:.2f} KTA <-> {match.murf_amount:,} MURF")
+
+
+def test_murf_to_kta_same_block():
+    print("Testing Type 7 MURF + Type 0 KTA in the same block...")
+    block = normalize_block(make_block("B1", [
+        {"type": 0, "amount": "0xDE0B6B3A7640000", "token": KTA_TOKEN, "to": SELLER},
+        {"type": 7, "amount": "0x3E8", "token": MURF_TOKEN, "from": SELLER}
+    ]))
+
+    matches = OTCEngine().match_block(block)
+    assert len(matches) == 1
+    assert not matches[0].is_kta_seller
+    assert matches[0].murf_amount == 1000
+    assert matches[0].kta_decimal == 1.0
+    print("[OK] MURF -> KTA matched")
+
+
+def test_previous_block_fallback():
+    print("Testing MURF leg lookup in the previous block...")
+    blocks = normalize_blocks([
+        make_block("C0", [{"type": 0, "amount": "0x64", "token": MURF_TOKEN, "to": SELLER}]),
+        make_block("C1", [{"type": 7, "amount": "0xDE0B6B3A7640000", "token": KTA_TOKEN, "from": SELLER}])
+    ])
+
+    matches = OTCEngine().match_blocks(blocks)
+    assert len(matches) == 1
+    assert matches[0].from_previous
+    assert matches[0].murf_amount == 100
+
+    # Without lookback there is no counterpart
+    matches = OTCEngine().match_blocks(blocks, lookback=False)
+    assert matches[0].counterpart is None and matches[0].murf_amount == 0
+    print("[OK] Previous block fallback works")
+
+
+def test_irrelevant_blocks_skipped():
+    print("Testing blocks without MURF/KTA OTC legs are skipped...")
+    engine = OTCEngine()
+    blocks = normalize_blocks([
+        make_block("D1", [{"type": 0, "amount": "0x1", "token": OTHER_TOKEN, "to": SELLER}]),
+        make_block("D2", [{"type": 0, "amount": "0x1", "token": MURF_TOKEN, "to": SELLER}]),
+        make_block("D3", [])
+    ])
+
+    assert engine.match_blocks(blocks) == []
+    assert engine.blocks_skipped == 3
+    print("[OK] Irrelevant blocks skipped")
+
+
+def test_counterparts_order():
+    print("Testing counterpart lookup keeps block order...")
+    engine = OTCEngine()
+    block = normalize_block(make_block("E1", [
+        {"type": 0, "amount": "0x2", "token": OTHER_TOKEN, "to": BUYER},
+        {"type": 7, "amount": "0x5", "token": KTA_TOKEN, "from": SELLER},
+        {"type": 0, "amount": "0x3", "token": MURF_TOKEN, "to": SELLER},
+        {"type": 0, "amount": "0x4", "token": KTA_TOKEN, "to": BUYER}
+    ]))
+
+    index = engine.index_block(block)
+    related = index.counterparts(block.operations[1])
+    assert [op.amount for op in related] == [2, 3]
+    assert index.first(0, block.operations[2].token).amount == 3
+    print("[OK] Counterparts in block order")
+
+
+def test_unknown_type_kept():
+    print("Testing unknown operation types and raw operations are kept as sent...")
+    engine = OTCEngine()
+    raw = {"type": "TOKEN_ADMIN", "amount": "0x0001C9C380", "token": MURF_TOKEN, "to": SELLER, "memo": "x"}
+    block = normalize_block(make_block("F1", [
+        {"type": 7, "amount": "0x5", "token": KTA_TOKEN, "from": SELLER},
+        raw
+    ]))
+
+    assert block.operations[1].type == "TOKEN_ADMIN", "not coerced to SEND"
+    assert block.raw_operation(block.operations[1]) is raw
+    matches = engine.match_blocks([block])
+    assert len(matches) == 1 and matches[0].counterpart is None, "an unknown type is not the MURF leg"
+    print("[OK] Unknown type not read as SEND; raw operation kept verbatim")
+
+
+def test_symbols_scoped_per_scan():
+    print("Testing symbol tables are per scan and blocks keep only their operations...")
+    source = make_block("G1", [{"type": 0, "amount": "0x1", "token": MURF_TOKEN, "to": SELLER}])
+    first = normalize_blocks([source])
+    second = normalize_blocks([make_block("G2", [{"type": 0, "amount": "0x1", "token": KTA_TOKEN, "to": BUYER}])])
+
+    assert first[0].symbols is not second[0].symbols
+    assert len(second[0].symbols) == 4, "'', MURF, KTA, BUYER: the first scan does not grow it"
+    assert (first[0].operations[0].token, second[0].operations[0].token) == (MURF_ID, KTA_ID)
+    assert first[0].name(first[0].operations[0].to_id) == SELLER
+    assert first[0].raw_operations is source["operations"]
+    assert not hasattr(first[0], "raw"), "the source block dict is not kept"
+    print("[OK] Fixed token IDs, independent address tables")
+
+
+if __name__ == "__main__":
+    test_kta_to_murf_same_block()
+    test_murf_to_kta_same_block()
+    test_previous_block_fallback()
+    test_irrelevant_blocks_skipped()
+    test_counterparts_order()
+    test_unknown_type_kept()
+    test_symbols_scoped_per_scan()
+    print("\nAll OTC engine tests passed!")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test Trade Dedup - trades are unique per (block_hash, op_index) on every save path (offline)
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from block_cache import SeenBlockCache
+from keeta_monitor import KeetaMonitor, _dedupe_trades
+from operation_records import MURF_TOKEN
+
+SELLER = "keeta_aab4anyllhowvsnjhpbynd6fvrdm4rby3xs4aoq5m4ttlhjhnrabtyxiqnmx25y"
+BUYER = "keeta_aab7l3uugqfwl53mwluh56n5o7zmn5v2ni7wdmlp6a4wd4aykllq6rhjjjxs6mq"
+
+
+def temp_db():
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    return path
+
+
+def make_monitor():
+    return KeetaMonitor(db_path=temp_db(), block_cache=SeenBlockCache("test", db_path=temp_db()))
+
+
+def stored(monitor):
+    conn = sqlite3.connect(monitor.db_path)
+    rows = conn.execute("SELECT block_hash, op_index FROM trades ORDER BY id").fetchall()
+    payloads = conn.execute("SELECT COUNT(*) FROM trade_payloads").fetchone()[0]
+    conn.close()
+    return rows, payloads
+
+
+# Two identical transfers in one block are two operations
+BLOCK = {
+    "$hash": "DUPBLOCK", "date": "2025-09-29T23:34:50.504Z", "account": BUYER,
+    "operations": [
+        {"type": 0, "amount": "0x64", "token": MURF_TOKEN, "to": SELLER},
+        {"type": 0, "amount": "0x64", "token": MURF_TOKEN, "to": SELLER}
+    ]
+}
+
+
+def test_save_trade_path_dedupes():
+    print("Testing parse_transaction/save_trade keeps one row per operation...")
+    monitor = make_monitor()
+    for _ in range(3):  # three overlapping polls
+        for operation in BLOCK["operations"]:
+            monitor.save_trade(monitor.parse_transaction(operation, BLOCK))
+    rows, payloads = stored(monitor)
+    assert rows == [("DUPBLOCK", 0), ("DUPBLOCK", 1)], rows
+    assert payloads == 2
+    print("[OK] 2 operations stored once each, payloads linked to their own rows")
+
+
+def test_ingest_path_dedupes():
+    print("Testing page ingestion keeps identical operations apart...")
+    monitor = make_monitor()
+    monitor.ingest_history({"blocks": [BLOCK]})
+    monitor.block_cache = SeenBlockCache("test", db_path=temp_db())  # forget seen blocks
+    counts = monitor.ingest_history({"blocks": [BLOCK]})
+    assert counts["inserted"] == 0 and stored(monitor)[0] == [("DUPBLOCK", 0), ("DUPBLOCK", 1)]
+    print("[OK] Re-ingested block adds no rows")
+
+
+def test_legacy_dedupe_keeps_identical_operations():
+    print("Testing the legacy dedupe migration keeps identical operations in one block...")
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE trades (id INTEGER PRIMARY KEY, block_hash TEXT, token_id TEXT, amount_hex TEXT, "
+                 "operation_type INTEGER, to_address TEXT, from_address TEXT)")
+    conn.execute("CREATE TABLE trade_payloads (trade_id INTEGER PRIMARY KEY, payload BLOB)")
+    legacy_poll = [("B1", "0x64"), ("B1", "0x64"), ("B1", "0x1"), ("B2", "0x5")]
+    for _ in range(3):
+        conn.executemany("INSERT INTO trades (block_hash, token_id, amount_hex, operation_type) VALUES (?, 'T', ?, 0)",
+                         legacy_poll)
+    _dedupe_trades(conn.cursor())
+    rows = conn.execute("SELECT id, block_hash, amount_hex FROM trades ORDER BY id").fetchall()
+    assert rows == [(1, "B1", "0x64"), (2, "B1", "0x64"), (3, "B1", "0x1"), (4, "B2", "0x5")], rows
+    print("[OK] Poll duplicates removed, identical operations kept")
+
+
+if __name__ == "__main__":
+    test_save_trade_path_dedupes()
+    test_ingest_path_dedupes()
+    test_legacy_dedupe_keeps_identical_operations()
+    print("\nAll trade dedup tests passed!")
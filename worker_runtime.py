@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Worker Runtime - One scheduler for the periodic jobs of the monitor processes
+Jobs register with an interval, jitter, timeout and max concurrency. A single
+scheduler thread starts each run on its own daemon thread; a run that is still
+in progress when the next one is due is skipped (never queued), so overrunning
+cycles do not pile up. Jitter spreads jobs over time instead of waking them
+together, and every job reports run time, lag and skip/timeout counts. A job
+that returns a number of seconds picks its own next run (adaptive polling).
+"""
+
+import heapq
+import random
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """A registered periodic job and its run metrics"""
+
+    def __init__(self, name, func, interval, jitter=0.1, timeout=None, max_concurrency=1):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter            # fraction of the interval, applied +/- to every run
+        self.timeout = timeout          # seconds before a run is reported as overrunning
+        self.max_concurrency = max_concurrency
+        self.running = 0
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.timeouts = 0
+        self.last_duration = None
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+        self.last_lag = None
+        self.max_lag = 0.0
+        self.last_error = None
+        self.last_started = None
+        self.next_run = None
+        self.pending = None             # sequence of the queue entry that is current
+        self.starts = {}                # thread ident -> start time of runs in progress
+        self.overdue = set()            # runs already reported as past their timeout
+
+    def delay(self):
+        """Interval with jitter applied"""
+        if not self.jitter:
+            return self.interval
+        spread = self.interval * self.jitter
+        return max(0.0, self.interval + random.uniform(-spread, spread))
+
+    def stats(self, now=None):
+        now = now if now is not None else time.time()
+        oldest = min(self.starts.values(), default=None)
+        return {
+            "interval": self.interval,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "timeouts": self.timeouts,
+            "last_duration": self.last_duration,
+            "avg_duration": self.total_duration / self.runs if self.runs else None,
+            "max_duration": self.max_duration,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+            "current_run_age": now - oldest if oldest is not None else None,
+            "last_error": self.last_error,
+            "next_run_in": self.next_run - now if self.next_run is not None else None
+        }
+
+
+class WorkerRuntime:
+    def __init__(self, name="runtime"):
+        self.name = name
+        self.jobs = {}
+        self.queue = []                 # heap of (due time, sequence, job name); stale entries are skipped
+        self.sequence = 0
+        self.lock = threading.Condition()
+        self.stopping = threading.Event()
+        self.scheduler = None
+        self.workers = set()
+
+    def register(self, name, func, interval, jitter=0.1, timeout=None, max_concurrency=1,
+                 initial_delay=None):
+        """Register a periodic job, return the Job
+
+        The first run happens after `initial_delay` seconds; by default a
+        random fraction of the jitter window, so jobs registered together
+        do not all fire at start-up in the same instant.
+        """
+        if name in self.jobs:
+            raise ValueError(f"Job already registered: {name}")
+        job = Job(name, func, interval, jitter, timeout, max_concurrency)
+        if initial_delay is None:
+            initial_delay = random.uniform(0, interval * jitter) if jitter else 0.0
+        with self.lock:
+            self.jobs[name] = job
+            self._schedule(job, time.time() + initial_delay)
+        return job
+
+    def trigger(self, name):
+        """Run a job now instead of at its next tick (skipped if it is already at max concurrency)"""
+        with self.lock:
+            self._schedule(self.jobs[name], time.time())
+
+    def _schedule(self, job, due):
+        self.sequence += 1
+        job.next_run = due
+        job.pending = self.sequence
+        heapq.heappush(self.queue, (due, self.sequence, job.name))
+        self.lock.notify()
+
+    def _run_loop(self):
+        while not self.stopping.is_set():
+            with self.lock:
+                now = time.time()
+                if not self.queue:
+                    self.lock.wait(timeout=1.0)
+                    continue
+                due, sequence, name = self.queue[0]
+                job = self.jobs[name]
+                if sequence != job.pending:
+                    heapq.heappop(self.queue)  # replaced by a later schedule() / trigger()
+                    continue
+                if due > now:
+                    self.lock.wait(timeout=min(due - now, 1.0))
+                    continue
+                heapq.heappop(self.queue)
+
+                lag = now - due
+                job.last_lag = lag
+                job.max_lag = max(job.max_lag, lag)
+                if job.running >= job.max_concurrency:
+                    job.skipped += 1
+                    logger.debug(f"Job {name} still running, skipping this run (lag {lag:.1f}s)")
+                else:
+                    job.running += 1
+                    worker = threading.Thread(target=self._execute, args=(job,), name=f"job-{name}")
+                    worker.daemon = True
+                    self.workers.add(worker)
+                    worker.start()
+
+                # Next run on the fixed schedule; ticks missed while overrunning are dropped
+                next_due = due + job.delay()
+                if next_due <= now:
+                    next_due = now + job.delay()
+                self._schedule(job, next_due)
+
+            self._check_timeouts()
+
+    def _execute(self, job):
+        started = time.time()
+        ident = threading.get_ident()
+        with self.lock:
+            job.last_started = started
+            job.starts[ident] = started
+        error = None
+        result = None
+        try:
+            result = job.func()
+        except Exception as e:
+            error = e
+            logger.error(f"Job {job.name} failed: {e}")
+        finally:
+            duration = time.time() - started
+            with self.lock:
+                job.running -= 1
+                job.starts.pop(ident, None)
+                job.overdue.discard(ident)
+                job.runs += 1
+                job.last_duration = duration
+                job.total_duration += duration
+                job.max_duration = max(job.max_duration, duration)
+                if error is not None:
+                    job.failures += 1
+                    job.last_error = str(error)
+                elif isinstance(result, (int, float)) and not isinstance(result, bool):
+                    # The job asked for its next run `result` seconds after this one finished
+                    self._schedule(job, time.time() + max(0.0, result))
+                self.workers.discard(threading.current_thread())
+                self.lock.notify_all()
+
+    def _check_timeouts(self):
+        """Report runs that exceeded their timeout (threads cannot be killed; the run keeps its slot)"""
+        now = time.time()
+        with self.lock:
+            for job in self.jobs.values():
+                if not job.timeout:
+                    continue
+                for ident, started in job.starts.items():
+                    if ident not in job.overdue and now - started > job.timeout:
+                        job.timeouts += 1
+                        job.overdue.add(ident)
+                        logger.warning(f"Job {job.name} exceeded its {job.timeout}s timeout")
+
+    def start(self):
+        """Start the scheduler thread"""
+        if self.scheduler is not None:
+            return
+        self.stopping.clear()
+        self.scheduler = threading.Thread(target=self._run_loop, name=f"{self.name}-scheduler")
+        self.scheduler.daemon = True
+        self.scheduler.start()
+        logger.info(f"Worker runtime started: {', '.join(self.jobs) or 'no jobs'}")
+
+    def stop(self, timeout=10):
+        """Stop scheduling and wait up to `timeout` seconds for runs in progress"""
+        self.stopping.set()
+        with self.lock:
+            self.lock.notify_all()
+        if self.scheduler is not None:
+            self.scheduler.join(timeout=2)
+            self.scheduler = None
+
+        deadline = time.time() + timeout
+        with self.lock:
+            while self.workers and time.time() < deadline:
+                self.lock.wait(timeout=deadline - time.time())
+            unfinished = [worker.name for worker in self.workers]
+        if unfinished:
+            logger.warning(f"Worker runtime stopped with runs in progress: {', '.join(unfinished)}")
+
+    def wait(self, seconds):
+        """Sleep that returns early (False) when the runtime is stopping"""
+        return not self.stopping.wait(seconds)
+
+    def run_forever(self):
+        """Start if needed and block until stop() (Ctrl+C stops the runtime)"""
+        self.start()
+        try:
+            while not self.stopping.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            self.stop()
+            raise
+
+    def get_stats(self):
+        """Per-job run time, lag and skip/timeout metrics"""
+        now = time.time()
+        with self.lock:
+            return {name: job.stats(now) for name, job in self.jobs.items()}